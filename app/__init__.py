@@ -17,6 +17,7 @@ load_dotenv()
 def create_app(config_name='default'):
     app = Flask(__name__)
     app.config.from_object(config[config_name])
+    app.config['CONFIG_NAME'] = config_name
     
     # Initialize extensions with app
     db.init_app(app)
@@ -28,6 +29,26 @@ def create_app(config_name='default'):
     from app.core.email import mail
     mail.init_app(app)
     
+    # Initialize caching
+    from app.core.cache import init_cache
+    init_cache(app)
+    
+    # Initialize Jinja bytecode cache
+    from app.core.templates import init_templates
+    init_templates(app)
+    
+    # Initialize reference data cache (settings, categories, roles, authors)
+    from app.core.reference import init_reference
+    init_reference(app)
+    
+    # Initialize write-behind view counter
+    from app.core.view_counter import ViewCounter
+    ViewCounter(app)
+    
+    # Background writer of audit events (AUDIT_LOG_MODE = 'async')
+    from app.core.audit import AuditWriter
+    AuditWriter(app)
+    
     # Configure login manager
     login_manager.login_view = 'auth.login'
     login_manager.login_message = 'Silakan login untuk mengakses halaman ini.'
@@ -38,36 +59,6 @@ def create_app(config_name='default'):
         from app.models.user import User
         return User.query.get(int(user_id))
     
-    # Register context processors
-    @app.context_processor
-    def inject_site_settings():
-        """Make site_settings available to all templates"""
-        from app.models.setting import Setting
-        try:
-            site_settings = Setting.get_public_settings()
-            return {'site_settings': site_settings}
-        except Exception as e:
-            # Return default settings if database is not initialized
-            return {
-                'site_settings': {
-                    'site_name': 'Portal Desa Digital',
-                    'site_description': 'Sistem Informasi dan Layanan Desa',
-                    'contact_email': 'info@desa.go.id',
-                    'contact_phone': '021-12345678',
-                    'address': 'Jl. Raya Desa No. 123'
-                }
-            }
-    
-    @app.context_processor
-    def inject_navigation_categories():
-        """Make navigation categories available to all templates"""
-        from app.models.content import Category
-        try:
-            nav_categories = Category.query.filter_by(is_active=True).order_by(Category.sort_order).all()
-            return {'nav_categories': nav_categories}
-        except Exception:
-            return {'nav_categories': []}
-    
     # Register blueprints
     from app.blueprints.auth import bp as auth_bp
     app.register_blueprint(auth_bp, url_prefix='/auth')
@@ -88,6 +79,50 @@ def create_app(config_name='default'):
     from app.core.helpers import register_template_helpers
     register_template_helpers(app)
     
+    # Full-text search index maintenance
+    from app.core.search import init_search
+    init_search(app)
+    
+    # Related content lists
+    from app.core.related import init_related
+    init_related(app)
+    
+    # Feeds and sitemaps cached on disk
+    from app.core.feeds import init_feeds
+    init_feeds(app)
+    
+    # Pre-rendered copy of the public site
+    from app.core.static_export import init_static_export
+    init_static_export(app)
+    
+    # Content counters behind the dashboards
+    from app.core.counters import init_counters
+    init_counters(app)
+    
+    # Daily rollups behind the analytics pages
+    from app.core.rollups import init_rollups
+    init_rollups(app)
+    
+    # Responsive image helpers for templates
+    from app.core.images import init_images
+    init_images(app)
+    
+    # PostgreSQL-only indexes created with the tables
+    from app.core.indexes import init_indexes
+    init_indexes(app)
+    
+    # Background removal of files left by bulk deletes
+    from app.core.bulk import init_bulk
+    init_bulk(app)
+    
+    # Estimated and cached listing totals
+    from app.core.totals import init_totals
+    init_totals(app)
+    
+    # Register CLI commands
+    from app.core.commands import register_commands
+    register_commands(app)
+    
     # Error handlers
     @app.errorhandler(404)
     def not_found_error(error):
@@ -8,9 +8,22 @@ from app.models.audit import AuditLog
 from app.models.setting import Setting
 from app.core.decorators import admin_required
 from app.core.helpers import save_uploaded_file, delete_uploaded_file
+from app.core.signals import mark_public_content_changed
+from app.core.render import render_content
+from app.core.counters import get_counts, get_status_counts, get_pending_review_count
+from app.core.audit import record_audit
+from app.core.bulk import run_bulk_action, ADMIN_ACTIONS
+from app.core.read_models import ContentRow, project_content
+from app.core.view_counter import record_view
+from app.core.search import apply_search
+from app.core.pagination import keyset_paginate, get_per_page
+from app.core.totals import cached_count, table_total, paginate, wants_exact_total
+from app.core.streaming import render_streamed
+from app.core.reference import get_nav_categories, get_authors, get_roles, get_settings, bump_reference_version
 from app import db
 from datetime import datetime
 from sqlalchemy import func
+from sqlalchemy.orm import joinedload
 from flask_wtf import FlaskForm
 
 class DeleteForm(FlaskForm):
@@ -21,26 +34,18 @@ class DeleteForm(FlaskForm):
 @admin_required
 def dashboard():
     # Get statistics
-    stats = {
-        'total_users': User.query.count(),
-        'total_content': Content.query.count(),
-        'published_content': Content.query.filter_by(status='published').count(),
-        'pending_content': Content.query.filter_by(status='pending_review').count(),
-        'draft_content': Content.query.filter_by(status='draft').count(),
-        'rejected_content': Content.query.filter_by(status='rejected').count(),
-    }
+    stats = get_dashboard_stats()
     
     # Recent content
-    recent_content = Content.query.order_by(Content.created_at.desc()).limit(5).all()
+    recent_content = Content.query_for('list_view').order_by(Content.created_at.desc()).limit(5).all()
     
     # Recent users
-    recent_users = User.query.order_by(User.created_at.desc()).limit(5).all()
+    recent_users = User.query.options(joinedload(User.role)).order_by(User.created_at.desc()).limit(5).all()
     
     # Content by category
-    content_by_category = db.session.query(
-        Category.name,
-        func.count(Content.id).label('count')
-    ).outerjoin(Content).group_by(Category.id, Category.name).all()
+    category_counts = get_counts(('category', None)).by_key('category')
+    content_by_category = [(category.name, category_counts.get(category.id, 0))
+                           for category in Category.query.order_by(Category.sort_order, Category.name)]
     
     return render_template('admin/dashboard.html', 
                          stats=stats,
@@ -48,6 +53,28 @@ def dashboard():
                          recent_users=recent_users,
                          content_by_category=content_by_category)
 
+def get_dashboard_stats():
+    """Dashboard totals from the content counters"""
+    counts = get_status_counts()
+    return {
+        'total_users': User.query.count(),
+        'total_content': sum(counts.values()),
+        'published_content': counts['published'],
+        'pending_content': counts['pending_review'],
+        'draft_content': counts['draft'],
+        'rejected_content': counts['rejected'],
+    }
+
+@bp.route('/api/stats')
+@login_required
+@admin_required
+def api_stats():
+    """Dashboard totals polled by admin.js"""
+    try:
+        return jsonify(get_dashboard_stats())
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @bp.route('/')
 @login_required
 @admin_required
@@ -61,7 +88,6 @@ def index():
 @admin_required
 def content_list():
     """Admin content management - admin has full access to all content"""
-    page = request.args.get('page', 1, type=int)
     status_filter = request.args.get('status', '', type=str)
     category_filter = request.args.get('category', '', type=str)
     author_filter = request.args.get('author', '', type=str)
@@ -80,38 +106,33 @@ def content_list():
         query = query.filter(Content.author_id == author_filter)
     
     if search:
-        query = query.filter(
-            db.or_(
-                Content.title.contains(search),
-                Content.content.contains(search)
-            )
-        )
+        query = apply_search(query, search, rank=False)
     
-    # Apply sorting with explicit join condition for author sorting
+    # Apply sorting with explicit join condition for author sorting;
+    # id breaks ties so the keyset cursor is unambiguous
     if sort == 'oldest':
-        query = query.order_by(Content.created_at.asc())
+        order_by = [Content.created_at.asc(), Content.id.asc()]
     elif sort == 'title':
-        query = query.order_by(Content.title.asc())
+        order_by = [Content.title.asc(), Content.id.asc()]
     elif sort == 'author':
         # Specify explicit join condition to avoid ambiguity
-        query = query.join(User, Content.author_id == User.id).order_by(User.full_name.asc())
+        query = query.join(User, Content.author_id == User.id)
+        order_by = [func.coalesce(User.full_name, '').asc(), Content.id.asc()]
     else:  # newest (default)
-        query = query.order_by(Content.created_at.desc())
+        order_by = [Content.created_at.desc(), Content.id.desc()]
     
-    content = query.paginate(
-        page=page, per_page=20, error_out=False
-    )
+    # Rows are streamed into the page as column-only projections
+    content = keyset_paginate(project_content(query), order_by, per_page=get_per_page(20),
+                              cursor=request.args.get('cursor'), stream=True, row_factory=ContentRow.from_row)
     
     # Get additional data for filters
-    categories = Category.query.filter_by(is_active=True).all()
-    
-    # Get authors with explicit join to avoid ambiguity
-    authors = db.session.query(User).join(Content, Content.author_id == User.id).distinct().all()
+    categories = get_nav_categories()
+    authors = get_authors()
     
     # Get pending count for the review queue button
-    pending_count = Content.query.filter_by(status='pending_review').count()
+    pending_count = get_pending_review_count()
     
-    return render_template('admin/content_list.html', 
+    return render_streamed('admin/content_list.html', 
                          content=content,
                          categories=categories,
                          authors=authors,
@@ -126,11 +147,10 @@ def content_list():
 @login_required
 @admin_required
 def view_content(id):
-    content = Content.query.get_or_404(id)
+    content = Content.query_for('detail_view').get_or_404(id)
 
-    # Increment view count
-    content.view_count += 1
-    db.session.commit()
+    # Buffered view count; written in batches by the view counter
+    record_view(content)
 
     # Get 5 latest revisions safely
     try:
@@ -154,12 +174,10 @@ def create_content():
     form = AdminContentForm()
     
     # Populate category choices
-    categories = Category.query.filter_by(is_active=True).order_by(Category.sort_order, Category.name).all()
-    form.category_id.choices = [(cat.id, cat.name) for cat in categories]
+    form.category_id.choices = [(cat.id, cat.name) for cat in get_nav_categories()]
     
     # Populate author choices (admin can assign content to any user)
-    users = User.query.filter(User.role.has(Role.name.in_(['admin', 'editor', 'publisher']))).order_by(User.full_name).all()
-    form.author_id.choices = [(user.id, user.full_name) for user in users]
+    form.author_id.choices = [(author.id, author.full_name) for author in get_authors()]
     form.author_id.data = current_user.id  # Default to current admin
     
     if form.validate_on_submit():
@@ -185,28 +203,26 @@ def create_content():
                 author_id=form.author_id.data,
                 status=form.status.data
             )
+            render_content(content)
             
             if content.status == 'published':
                 content.published_at = datetime.utcnow()
+                mark_public_content_changed(content)
             
             db.session.add(content)
-            db.session.commit()
             
             # Log content creation
-            try:
-                AuditLog.log_action(
-                    user_id=current_user.id,
-                    action='admin_create_content',
-                    table_name='content',
-                    record_id=content.id,
-                    new_values=content.to_dict(),
-                    ip_address=request.remote_addr,
-                    user_agent=request.user_agent.string
-                )
-                db.session.commit()
-            except Exception as log_error:
-                # Don't fail the content creation if logging fails
-                flash(f'Content created but logging failed: {str(log_error)}', 'warning')
+            db.session.flush()
+            record_audit(
+                user_id=current_user.id,
+                action='admin_create_content',
+                table_name='content',
+                record_id=content.id,
+                new_values=content.to_dict(),
+                ip_address=request.remote_addr,
+                user_agent=request.user_agent.string
+            )
+            db.session.commit()
             
             flash(f'Konten "{content.title}" berhasil dibuat dengan status {content.status}.', 'success')
             return redirect(url_for('admin.content_list'))
@@ -225,12 +241,10 @@ def edit_content(id):
     form = AdminContentForm(obj=content)
     
     # Populate category choices
-    categories = Category.query.filter_by(is_active=True).order_by(Category.sort_order, Category.name).all()
-    form.category_id.choices = [(cat.id, cat.name) for cat in categories]
+    form.category_id.choices = [(cat.id, cat.name) for cat in get_nav_categories()]
     
     # Populate author choices
-    users = User.query.filter(User.role.has(Role.name.in_(['admin', 'editor', 'publisher']))).order_by(User.full_name).all()
-    form.author_id.choices = [(user.id, user.full_name) for user in users]
+    form.author_id.choices = [(author.id, author.full_name) for author in get_authors()]
     
     if form.validate_on_submit():
         try:
@@ -255,6 +269,7 @@ def edit_content(id):
             content.content = form.content.data or ''
             content.category_id = form.category_id.data
             content.youtube_url = form.youtube_url.data.strip() if form.youtube_url.data else None
+            render_content(content)
             content.author_id = form.author_id.data
             content.status = form.status.data
             content.updated_at = datetime.utcnow()
@@ -265,24 +280,22 @@ def edit_content(id):
             elif form.status.data != 'published':
                 content.published_at = None
             
-            db.session.commit()
+            if old_values.get('status') == 'published' or content.status == 'published':
+                mark_public_content_changed(content)
             
             # Log content update
-            try:
-                AuditLog.log_action(
-                    user_id=current_user.id,
-                    action='admin_update_content',
-                    table_name='content',
-                    record_id=content.id,
-                    old_values=old_values,
-                    new_values=content.to_dict(),
-                    ip_address=request.remote_addr,
-                    user_agent=request.user_agent.string
-                )
-                db.session.commit()
-            except Exception as log_error:
-                # Don't fail the content update if logging fails
-                flash(f'Content updated but logging failed: {str(log_error)}', 'warning')
+            db.session.flush()
+            record_audit(
+                user_id=current_user.id,
+                action='admin_update_content',
+                table_name='content',
+                record_id=content.id,
+                old_values=old_values,
+                new_values=content.to_dict(),
+                ip_address=request.remote_addr,
+                user_agent=request.user_agent.string
+            )
+            db.session.commit()
             
             flash(f'Konten "{content.title}" berhasil diperbarui.', 'success')
             return redirect(url_for('admin.content_list'))
@@ -306,24 +319,21 @@ def delete_content(id):
             delete_uploaded_file(content.cover_image)
         
         title = content.title
+        if content.status == 'published':
+            mark_public_content_changed(content.id)
         db.session.delete(content)
-        db.session.commit()
         
         # Log content deletion
-        try:
-            AuditLog.log_action(
-                user_id=current_user.id,
-                action='admin_delete_content',
-                table_name='content',
-                record_id=id,
-                old_values=old_values,
-                ip_address=request.remote_addr,
-                user_agent=request.user_agent.string
-            )
-            db.session.commit()
-        except Exception as log_error:
-            # Don't fail the deletion if logging fails
-            flash(f'Content deleted but logging failed: {str(log_error)}', 'warning')
+        record_audit(
+            user_id=current_user.id,
+            action='admin_delete_content',
+            table_name='content',
+            record_id=id,
+            old_values=old_values,
+            ip_address=request.remote_addr,
+            user_agent=request.user_agent.string
+        )
+        db.session.commit()
         
         flash(f'Konten "{title}" berhasil dihapus.', 'success')
         return redirect(url_for('admin.content_list'))
@@ -345,56 +355,15 @@ def bulk_action():
         if not action or not content_ids:
             return jsonify({'success': False, 'message': 'Data tidak lengkap'})
         
-        contents = Content.query.filter(Content.id.in_(content_ids)).all()
+        if action not in ADMIN_ACTIONS:
+            return jsonify({'success': False, 'message': 'Aksi tidak valid'})
         
-        for content in contents:
-            old_values = content.to_dict()
-            
-            if action == 'publish':
-                content.status = 'published'
-                content.published_at = datetime.utcnow()
-            elif action == 'unpublish':
-                content.status = 'draft'
-                content.published_at = None
-            elif action == 'pending':
-                content.status = 'pending_review'
-            elif action == 'delete':
-                if content.cover_image:
-                    delete_uploaded_file(content.cover_image)
-                db.session.delete(content)
-                
-                # Log deletion
-                try:
-                    AuditLog.log_action(
-                        user_id=current_user.id,
-                        action=f'admin_bulk_delete',
-                        table_name='content',
-                        record_id=content.id,
-                        old_values=old_values,
-                        ip_address=request.remote_addr,
-                        user_agent=request.user_agent.string
-                    )
-                except Exception:
-                    pass  # Continue even if logging fails
-                continue
-            
-            # Log the action for non-delete operations
-            try:
-                AuditLog.log_action(
-                    user_id=current_user.id,
-                    action=f'admin_bulk_{action}',
-                    table_name='content',
-                    record_id=content.id,
-                    old_values=old_values,
-                    new_values=content.to_dict(),
-                    ip_address=request.remote_addr,
-                    user_agent=request.user_agent.string
-                )
-            except Exception:
-                pass  # Continue even if logging fails
-        
-        db.session.commit()
-        return jsonify({'success': True, 'message': f'Berhasil {action} {len(contents)} konten'})
+        results = run_bulk_action(
+            action, content_ids, ADMIN_ACTIONS, current_user, 'admin_bulk_',
+            ip_address=request.remote_addr, user_agent=request.user_agent.string
+        )
+        done = sum(1 for result in results if result['result'] == 'ok')
+        return jsonify({'success': True, 'message': f'Berhasil {action} {done} konten', 'results': results})
         
     except Exception as e:
         db.session.rollback()
@@ -408,7 +377,7 @@ def users():
     search = request.args.get('search', '', type=str)
     role_filter = request.args.get('role', '', type=str)
     
-    query = User.query
+    query = User.query.options(joinedload(User.role))
     
     if search:
         query = query.filter(
@@ -422,11 +391,10 @@ def users():
     if role_filter:
         query = query.join(Role).filter(Role.name == role_filter)
     
-    users = query.order_by(User.created_at.desc()).paginate(
-        page=page, per_page=20, error_out=False
-    )
+    total = cached_count(query, ('users', search, role_filter), exact=wants_exact_total())
+    users = paginate(query.order_by(User.created_at.desc()), page, 20, total)
     
-    roles = Role.query.all()
+    roles = get_roles()
     
     return render_template('admin/users.html', users=users, roles=roles, 
                          search=search, role_filter=role_filter)
@@ -438,8 +406,7 @@ def create_user():
     form = UserForm()
     
     # Populate role choices
-    roles = Role.query.filter_by(is_active=True).all()
-    form.role_id.choices = [(role.id, role.name.title()) for role in roles]
+    form.role_id.choices = [(role.id, role.name.title()) for role in get_roles(active_only=True)]
     
     if form.validate_on_submit():
         try:
@@ -459,22 +426,20 @@ def create_user():
                 user.set_password('password123')
             
             db.session.add(user)
-            db.session.commit()
             
             # Log user creation
-            try:
-                AuditLog.log_action(
-                    user_id=current_user.id,
-                    action='create_user',
-                    table_name='users',
-                    record_id=user.id,
-                    new_values=user.to_dict(),
-                    ip_address=request.remote_addr,
-                    user_agent=request.user_agent.string
-                )
-                db.session.commit()
-            except Exception:
-                pass
+            db.session.flush()
+            record_audit(
+                user_id=current_user.id,
+                action='create_user',
+                table_name='users',
+                record_id=user.id,
+                new_values=user.to_dict(),
+                ip_address=request.remote_addr,
+                user_agent=request.user_agent.string
+            )
+            db.session.commit()
+            bump_reference_version()
             
             flash(f'User {user.username} berhasil dibuat.', 'success')
             return redirect(url_for('admin.users'))
@@ -492,8 +457,7 @@ def edit_user(id):
     form = UserForm(obj=user)
     form._obj = user
     # Populate role choices
-    roles = Role.query.filter_by(is_active=True).all()
-    form.role_id.choices = [(role.id, role.name.title()) for role in roles]
+    form.role_id.choices = [(role.id, role.name.title()) for role in get_roles(active_only=True)]
     
     if form.validate_on_submit():
         try:
@@ -511,23 +475,20 @@ def edit_user(id):
             if form.password.data:
                 user.set_password(form.password.data)
             
-            db.session.commit()
-            
             # Log user update
-            try:
-                AuditLog.log_action(
-                    user_id=current_user.id,
-                    action='update_user',
-                    table_name='users',
-                    record_id=user.id,
-                    old_values=old_values,
-                    new_values=user.to_dict(),
-                    ip_address=request.remote_addr,
-                    user_agent=request.user_agent.string
-                )
-                db.session.commit()
-            except Exception:
-                pass
+            db.session.flush()
+            record_audit(
+                user_id=current_user.id,
+                action='update_user',
+                table_name='users',
+                record_id=user.id,
+                old_values=old_values,
+                new_values=user.to_dict(),
+                ip_address=request.remote_addr,
+                user_agent=request.user_agent.string
+            )
+            db.session.commit()
+            bump_reference_version()
             
             flash(f'User {user.username} berhasil diperbarui.', 'success')
             return redirect(url_for('admin.users'))
@@ -552,22 +513,19 @@ def delete_user(id):
         username = user.username
         
         db.session.delete(user)
-        db.session.commit()
         
         # Log user deletion
-        try:
-            AuditLog.log_action(
-                user_id=current_user.id,
-                action='delete_user',
-                table_name='users',
-                record_id=id,
-                old_values=old_values,
-                ip_address=request.remote_addr,
-                user_agent=request.user_agent.string
-            )
-            db.session.commit()
-        except Exception:
-            pass
+        record_audit(
+            user_id=current_user.id,
+            action='delete_user',
+            table_name='users',
+            record_id=id,
+            old_values=old_values,
+            ip_address=request.remote_addr,
+            user_agent=request.user_agent.string
+        )
+        db.session.commit()
+        bump_reference_version()
         
         return jsonify({'success': True, 'message': f'User {username} berhasil dihapus.'})
     except Exception as e:
@@ -602,6 +560,7 @@ def create_category():
             )
             
             db.session.add(category)
+            mark_public_content_changed()
             db.session.commit()
             
             flash(f'Kategori {category.name} berhasil dibuat.', 'success')
@@ -630,6 +589,7 @@ def edit_category(id):
             category.is_active = form.is_active.data
             category.sort_order = int(form.sort_order.data) if form.sort_order.data else 0
             
+            mark_public_content_changed()
             db.session.commit()
             
             flash(f'Kategori {category.name} berhasil diperbarui.', 'success')
@@ -657,22 +617,19 @@ def delete_category(id):
         category_name = category.name
         
         db.session.delete(category)
-        db.session.commit()
+        mark_public_content_changed()
         
         # Log category deletion
-        try:
-            AuditLog.log_action(
-                user_id=current_user.id,
-                action='delete',
-                table_name='categories',
-                record_id=id,
-                old_values=old_values,
-                ip_address=request.remote_addr,
-                user_agent=request.user_agent.string
-            )
-            db.session.commit()
-        except Exception:
-            pass  # Continue even if logging fails
+        record_audit(
+            user_id=current_user.id,
+            action='delete',
+            table_name='categories',
+            record_id=id,
+            old_values=old_values,
+            ip_address=request.remote_addr,
+            user_agent=request.user_agent.string
+        )
+        db.session.commit()
         
         flash(f'Kategori {category_name} berhasil dihapus.', 'success')
         return redirect(url_for('admin.categories'))
@@ -689,20 +646,23 @@ def settings():
     
     # Load current settings
     if request.method == 'GET':
-        form.site_name.data = Setting.get_value('site_name', 'Portal Desa Digital')
-        form.site_description.data = Setting.get_value('site_description', 'Sistem Informasi dan Layanan Desa')
-        form.contact_email.data = Setting.get_value('contact_email', 'info@desa.go.id')
-        form.contact_phone.data = Setting.get_value('contact_phone', '021-12345678')
-        form.address.data = Setting.get_value('address', 'Jl. Raya Desa No. 123')
+        current = get_settings()
+        form.site_name.data = current.get('site_name', 'Portal Desa Digital')
+        form.site_description.data = current.get('site_description', 'Sistem Informasi dan Layanan Desa')
+        form.contact_email.data = current.get('contact_email', 'info@desa.go.id')
+        form.contact_phone.data = current.get('contact_phone', '021-12345678')
+        form.address.data = current.get('address', 'Jl. Raya Desa No. 123')
     
     if form.validate_on_submit():
         try:
-            # Update settings
-            Setting.set_value('site_name', form.site_name.data, 'string', 'Nama website desa', True)
-            Setting.set_value('site_description', form.site_description.data, 'string', 'Deskripsi website desa', True)
-            Setting.set_value('contact_email', form.contact_email.data, 'string', 'Email kontak desa', True)
-            Setting.set_value('contact_phone', form.contact_phone.data, 'string', 'Nomor telepon desa', True)
-            Setting.set_value('address', form.address.data, 'string', 'Alamat kantor desa', True)
+            # Update settings in one batch
+            Setting.set_values({
+                'site_name': (form.site_name.data, 'string', 'Nama website desa', True),
+                'site_description': (form.site_description.data, 'string', 'Deskripsi website desa', True),
+                'contact_email': (form.contact_email.data, 'string', 'Email kontak desa', True),
+                'contact_phone': (form.contact_phone.data, 'string', 'Nomor telepon desa', True),
+                'address': (form.address.data, 'string', 'Alamat kantor desa', True)
+            })
             
             db.session.commit()
             
@@ -718,7 +678,6 @@ def settings():
 @login_required
 @admin_required
 def audit_logs():
-    page = request.args.get('page', 1, type=int)
     action_filter = request.args.get('action', '', type=str)
     
     query = AuditLog.query
@@ -726,8 +685,14 @@ def audit_logs():
     if action_filter:
         query = query.filter(AuditLog.action == action_filter)
     
-    logs = query.order_by(AuditLog.created_at.desc()).paginate(
-        page=page, per_page=50, error_out=False
-    )
-    
-    return render_template('admin/audit_logs.html', logs=logs, action_filter=action_filter)
\ No newline at end of file
+    # The full log is estimated by PostgreSQL; one action's count is cached briefly
+    if action_filter:
+        total = cached_count(query, ('audit_logs', action_filter), exact=wants_exact_total())
+    else:
+        total = table_total(query, AuditLog.__table__, exact=wants_exact_total())
+    logs = keyset_paginate(query.options(joinedload(AuditLog.user)),
+                           [AuditLog.created_at.desc(), AuditLog.id.desc()],
+                           per_page=get_per_page(50), cursor=request.args.get('cursor'), stream=True,
+                           total=total)
+    
+    return render_streamed('admin/audit_logs.html', logs=logs, action_filter=action_filter)
\ No newline at end of file
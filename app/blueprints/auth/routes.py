@@ -3,6 +3,7 @@ from flask_login import login_user, logout_user, current_user, login_required
 from app.blueprints.auth import bp
 from app.blueprints.auth.forms import LoginForm, ProfileForm, ChangePasswordForm, RegisterForm
 from app.models.user import User
+from app.core.reference import bump_reference_version
 from app import db
 
 @bp.route('/login', methods=['GET', 'POST'])
@@ -73,6 +74,7 @@ def register():
         try:
             db.session.add(user)
             db.session.commit()
+            bump_reference_version()
             flash(f'User {user.username} berhasil didaftarkan', 'success')
             return redirect(url_for('admin.dashboard'))
         except Exception as e:
@@ -101,6 +103,7 @@ def profile():
         
         try:
             db.session.commit()
+            bump_reference_version()
             flash('Profil berhasil diperbarui', 'success')
             return redirect(url_for('auth.profile'))
         except Exception as e:
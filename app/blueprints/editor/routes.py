@@ -3,14 +3,27 @@ from flask_login import login_required, current_user
 from flask_wtf.csrf import validate_csrf, CSRFError
 from app.blueprints.editor import bp
 from app.blueprints.editor.forms import ContentForm, ReviewForm
-from app.models.content import Content, Category
+from app.models.content import Content
 from app.models.user import User
-from app.models.audit import AuditLog
 from app.core.decorators import editor_required
-from app.core.helpers import save_uploaded_file, delete_uploaded_file, make_slug
+from app.core.helpers import save_uploaded_file, delete_uploaded_file
+from app.core.signals import mark_public_content_changed
+from app.core.render import render_content
+from app.core.audit import record_audit
+from app.core.counters import get_counts, get_status_counts, get_pending_review_count
+from app.core.bulk import run_bulk_action, EDITOR_ACTIONS
+from app.core.read_models import ContentRow, project_content
+from app.core.rollups import (get_analytics_days, get_since, get_total_views, get_category_activity,
+                               get_author_activity, get_created_by_month, get_published_count, get_review_count)
+from app.core.view_counter import record_view
+from app.core.search import apply_search
+from app.core.pagination import keyset_paginate, get_per_page
+from app.core.totals import content_total, cached_count, paginate, wants_exact_total
+from app.core.streaming import render_streamed
+from app.core.reference import get_nav_categories, get_authors
 from app import db
 from datetime import datetime, timedelta
-from sqlalchemy import func, and_, or_
+from sqlalchemy import func
 import logging
 
 # Configure detailed logging for debugging
@@ -26,30 +39,25 @@ def dashboard():
         today = datetime.utcnow().date()
         
         # Get editor statistics - FIXED with accurate calculations
+        counts = get_counts(('status', 0), ('reviewer', current_user.id), ('author', current_user.id))
         stats = {
             # Only count content that is actually pending review
-            'pending_review': Content.query.filter_by(status='pending_review').count(),
+            'pending_review': counts.get(status='pending_review'),
             
             # Only count content that was approved (published) today
-            'approved_today': Content.query.filter(
-                Content.status == 'published',
-                func.date(Content.published_at) == today
-            ).count(),
+            'approved_today': get_published_count(today),
             
             # Only count content that is currently published (not rejected/draft)
-            'published_content': Content.query.filter_by(status='published').count(),
+            'published_content': counts.get(status='published'),
             
             # Count reviews done by this editor this month (both approved and rejected)
-            'reviews_this_month': Content.query.filter(
-                Content.reviewer_id == current_user.id,
-                func.date(Content.updated_at) >= datetime.utcnow().replace(day=1).date()
-            ).count(),
+            'reviews_this_month': get_review_count(current_user.id, today.replace(day=1)),
             
             # Total reviews by this editor
-            'my_reviews': Content.query.filter_by(reviewer_id=current_user.id).count(),
+            'my_reviews': counts.get('reviewer', current_user.id),
             
             # Content authored by this editor
-            'my_content': Content.query.filter_by(author_id=current_user.id).count(),
+            'my_content': counts.get('author', current_user.id),
             
             # Total views only from published content
             'total_views': db.session.query(func.sum(Content.view_count)).filter(
@@ -58,27 +66,24 @@ def dashboard():
         }
         
         # Recent content pending review (oldest first for priority)
-        pending_content = Content.query.filter_by(status='pending_review').order_by(
+        pending_content = Content.query_for('list_view').filter_by(status='pending_review').order_by(
             Content.created_at.asc()
         ).limit(5).all()
         
         # Recently published content (newest first)
-        recent_published = Content.query.filter_by(status='published').order_by(
+        recent_published = Content.query_for('list_view').filter_by(status='published').order_by(
             Content.published_at.desc()
         ).limit(5).all()
         
         # Recent activity by this editor (content they reviewed)
-        recent_reviews = Content.query.filter_by(reviewer_id=current_user.id).order_by(
+        recent_reviews = Content.query_for('list_view').filter_by(reviewer_id=current_user.id).order_by(
             Content.updated_at.desc()
         ).limit(5).all()
         
         # Content by category (only published content)
-        content_by_category = db.session.query(
-            Category.name,
-            func.count(Content.id).label('count')
-        ).join(Content).filter(
-            Content.status == 'published'
-        ).group_by(Category.id, Category.name).all()
+        category_counts = get_counts(('category', None)).by_key('category', status='published')
+        content_by_category = [(category.name, category_counts[category.id])
+                               for category in get_nav_categories() if category_counts.get(category.id)]
         
         return render_template('editor/dashboard.html', 
                              stats=stats,
@@ -111,8 +116,7 @@ def dashboard():
 def api_pending_count():
     """API endpoint to get current pending review count"""
     try:
-        count = Content.query.filter_by(status='pending_review').count()
-        return jsonify({'count': count})
+        return jsonify({'count': get_pending_review_count()})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -127,7 +131,6 @@ def index():
 @editor_required
 def review_queue():
     try:
-        page = request.args.get('page', 1, type=int)
         category_filter = request.args.get('category', '', type=str)
         author_filter = request.args.get('author', '', type=str)
         sort = request.args.get('sort', 'oldest', type=str)
@@ -142,20 +145,28 @@ def review_queue():
         if author_filter:
             query = query.filter(Content.author_id == author_filter)
         
-        # Apply sorting
+        # Apply sorting; id breaks ties so the keyset cursor is unambiguous
         if sort == 'newest':
-            query = query.order_by(Content.created_at.desc())
+            order_by = [Content.created_at.desc(), Content.id.desc()]
         elif sort == 'title':
-            query = query.order_by(Content.title.asc())
+            order_by = [Content.title.asc(), Content.id.asc()]
         elif sort == 'author':
-            query = query.join(User, Content.author_id == User.id).order_by(User.full_name.asc())
+            query = query.join(User, Content.author_id == User.id)
+            order_by = [func.coalesce(User.full_name, '').asc(), Content.id.asc()]
         else:  # oldest (default for review queue)
-            query = query.order_by(Content.created_at.asc())
+            order_by = [Content.created_at.asc(), Content.id.asc()]
         
-        content = query.paginate(page=page, per_page=10, error_out=False)
+        # The queue size is shown on the page; the counters hold it unless both filters are set
+        total = content_total('pending_review', category_id=category_filter, author_id=author_filter)
+        if total is None:
+            total = cached_count(query, ('review_queue', category_filter, author_filter),
+                                 exact=wants_exact_total())
+        content = keyset_paginate(project_content(query), order_by, per_page=10,
+                                  cursor=request.args.get('cursor'), total=total,
+                                  row_factory=ContentRow.from_row)
         
         # Get data for filters
-        categories = Category.query.filter_by(is_active=True).all()
+        categories = get_nav_categories()
         authors = db.session.query(User).join(Content, Content.author_id == User.id)\
             .filter(Content.status == 'pending_review').distinct().all()
         
@@ -175,7 +186,6 @@ def review_queue():
 @editor_required
 def content_list():
     try:
-        page = request.args.get('page', 1, type=int)
         status_filter = request.args.get('status', '', type=str)
         category_filter = request.args.get('category', '', type=str)
         author_filter = request.args.get('author', '', type=str)
@@ -196,33 +206,34 @@ def content_list():
             query = query.filter(Content.author_id == author_filter)
         
         if search:
-            query = query.filter(
-                or_(
-                    Content.title.contains(search),
-                    Content.content.contains(search)
-                )
-            )
+            query = apply_search(query, search, rank=False)
         
-        # Apply sorting
+        # Apply sorting; id breaks ties so the keyset cursor is unambiguous
         if sort == 'oldest':
-            query = query.order_by(Content.created_at.asc())
+            order_by = [Content.created_at.asc(), Content.id.asc()]
         elif sort == 'title':
-            query = query.order_by(Content.title.asc())
+            order_by = [Content.title.asc(), Content.id.asc()]
         elif sort == 'author':
-            query = query.join(User, Content.author_id == User.id).order_by(User.full_name.asc())
+            query = query.join(User, Content.author_id == User.id)
+            order_by = [func.coalesce(User.full_name, '').asc(), Content.id.asc()]
         elif sort == 'status':
-            query = query.order_by(Content.status.asc())
+            order_by = [Content.status.asc(), Content.id.asc()]
         else:  # newest (default)
-            query = query.order_by(Content.created_at.desc())
+            order_by = [Content.created_at.desc(), Content.id.desc()]
         
-        content = query.paginate(page=page, per_page=20, error_out=False)
+        # Rows are streamed into the page as column-only projections; the
+        # counters give the total for the filters they cover
+        total = None if search else content_total(status_filter or None, category_filter, author_filter)
+        content = keyset_paginate(project_content(query), order_by, per_page=get_per_page(20),
+                                  cursor=request.args.get('cursor'), stream=True,
+                                  row_factory=ContentRow.from_row, total=total)
         
         # Get additional data for filters
-        categories = Category.query.filter_by(is_active=True).all()
-        authors = db.session.query(User).join(Content, Content.author_id == User.id).distinct().all()
-        pending_count = Content.query.filter_by(status='pending_review').count()
+        categories = get_nav_categories()
+        authors = get_authors()
+        pending_count = get_pending_review_count()
         
-        return render_template('editor/content_list.html', 
+        return render_streamed('editor/content_list.html', 
                              content=content,
                              categories=categories,
                              authors=authors,
@@ -241,11 +252,10 @@ def content_list():
 @editor_required
 def view_content(id):
     try:
-        content = Content.query.get_or_404(id)
+        content = Content.query_for('detail_view').get_or_404(id)
         
-        # Increment view count
-        content.view_count += 1
-        db.session.commit()
+        # Buffered view count; written in batches by the view counter
+        record_view(content)
         
         return render_template('editor/content_detail.html', content=content)
     except Exception as e:
@@ -257,7 +267,7 @@ def view_content(id):
 @editor_required
 def content_review(id):
     try:
-        content = Content.query.get_or_404(id)
+        content = Content.query_for('detail_view').get_or_404(id)
         
         if content.status != 'pending_review':
             flash('Konten ini tidak dalam status menunggu review.', 'error')
@@ -276,7 +286,7 @@ def content_review(id):
                     flash('Konten berhasil disetujui dan dipublikasi.', 'success')
                     
                     # Log approval
-                    AuditLog.log_action(
+                    record_audit(
                         user_id=current_user.id,
                         action='approve_content',
                         table_name='content',
@@ -294,7 +304,7 @@ def content_review(id):
                     flash('Konten berhasil ditolak.', 'info')
                     
                     # Log rejection
-                    AuditLog.log_action(
+                    record_audit(
                         user_id=current_user.id,
                         action='reject_content',
                         table_name='content',
@@ -324,8 +334,7 @@ def create_content():
     
     try:
         # Populate category choices
-        categories = Category.query.filter_by(is_active=True).order_by(Category.sort_order, Category.name).all()
-        form.category_id.choices = [(cat.id, cat.name) for cat in categories]
+        form.category_id.choices = [(cat.id, cat.name) for cat in get_nav_categories()]
         
         if form.validate_on_submit():
             # Handle file upload
@@ -344,30 +353,29 @@ def create_content():
                 author_id=current_user.id,
                 status='published'  # Editor can directly publish
             )
+            render_content(content)
             
             # Generate unique slug
             content.slug = Content.generate_slug_from_title(content.title)
             
             if content.status == 'published':
                 content.published_at = datetime.utcnow()
+                mark_public_content_changed(content)
             
             db.session.add(content)
-            db.session.commit()
             
             # Log content creation
-            try:
-                AuditLog.log_action(
-                    user_id=current_user.id,
-                    action='create_content',
-                    table_name='content',
-                    record_id=content.id,
-                    new_values=content.to_dict(),
-                    ip_address=request.remote_addr,
-                    user_agent=request.user_agent.string
-                )
-                db.session.commit()
-            except Exception:
-                pass
+            db.session.flush()
+            record_audit(
+                user_id=current_user.id,
+                action='create_content',
+                table_name='content',
+                record_id=content.id,
+                new_values=content.to_dict(),
+                ip_address=request.remote_addr,
+                user_agent=request.user_agent.string
+            )
+            db.session.commit()
             
             flash('Konten berhasil dibuat dan dipublikasi.', 'success')
             return redirect(url_for('editor.content_list'))
@@ -387,8 +395,7 @@ def edit_content(id):
         form = ContentForm(obj=content)
         
         # Populate category choices
-        categories = Category.query.filter_by(is_active=True).order_by(Category.sort_order, Category.name).all()
-        form.category_id.choices = [(cat.id, cat.name) for cat in categories]
+        form.category_id.choices = [(cat.id, cat.name) for cat in get_nav_categories()]
         
         if form.validate_on_submit():
             old_values = content.to_dict()
@@ -409,24 +416,24 @@ def edit_content(id):
             content.category_id = form.category_id.data
             content.youtube_url = form.youtube_url.data.strip() if form.youtube_url.data else None
             content.updated_at = datetime.utcnow()
+            render_content(content)
             
-            db.session.commit()
+            if content.status == 'published':
+                mark_public_content_changed(content)
             
             # Log content update
-            try:
-                AuditLog.log_action(
-                    user_id=current_user.id,
-                    action='update_content',
-                    table_name='content',
-                    record_id=content.id,
-                    old_values=old_values,
-                    new_values=content.to_dict(),
-                    ip_address=request.remote_addr,
-                    user_agent=request.user_agent.string
-                )
-                db.session.commit()
-            except Exception:
-                pass
+            db.session.flush()
+            record_audit(
+                user_id=current_user.id,
+                action='update_content',
+                table_name='content',
+                record_id=content.id,
+                old_values=old_values,
+                new_values=content.to_dict(),
+                ip_address=request.remote_addr,
+                user_agent=request.user_agent.string
+            )
+            db.session.commit()
             
             flash('Konten berhasil diperbarui.', 'success')
             return redirect(url_for('editor.content_list'))
@@ -558,25 +565,22 @@ def delete_content(id):
                 logger.warning(f"Could not delete cover image {content.cover_image}: {str(e)}")
         
         # Delete content from database
+        if content.status == 'published':
+            mark_public_content_changed(content.id)
         db.session.delete(content)
-        db.session.commit()
-        logger.debug("Content deleted from database")
         
         # Log content deletion
-        try:
-            AuditLog.log_action(
-                user_id=current_user.id,
-                action='delete_content',
-                table_name='content',
-                record_id=id,
-                old_values=old_values,
-                ip_address=request.remote_addr,
-                user_agent=request.user_agent.string
-            )
-            db.session.commit()
-            logger.debug("Audit log created")
-        except Exception as e:
-            logger.warning(f"Could not create audit log: {str(e)}")
+        record_audit(
+            user_id=current_user.id,
+            action='delete_content',
+            table_name='content',
+            record_id=id,
+            old_values=old_values,
+            ip_address=request.remote_addr,
+            user_agent=request.user_agent.string
+        )
+        db.session.commit()
+        logger.debug("Content deleted from database")
         
         logger.debug("=== DELETE CONTENT SUCCESS ===")
         return jsonify({
@@ -612,24 +616,21 @@ def publish_content(id):
             content.status = 'published'
             content.published_at = datetime.utcnow()
             content.reviewer_id = current_user.id
-            
-            db.session.commit()
+            mark_public_content_changed(content)
             
             # Log publishing
-            try:
-                AuditLog.log_action(
-                    user_id=current_user.id,
-                    action='publish_content',
-                    table_name='content',
-                    record_id=content.id,
-                    old_values=old_values,
-                    new_values=content.to_dict(),
-                    ip_address=request.remote_addr,
-                    user_agent=request.user_agent.string
-                )
-                db.session.commit()
-            except Exception:
-                pass
+            db.session.flush()
+            record_audit(
+                user_id=current_user.id,
+                action='publish_content',
+                table_name='content',
+                record_id=content.id,
+                old_values=old_values,
+                new_values=content.to_dict(),
+                ip_address=request.remote_addr,
+                user_agent=request.user_agent.string
+            )
+            db.session.commit()
             
             return jsonify({'success': True, 'message': f'Konten "{content.title}" berhasil dipublikasi.'})
         else:
@@ -649,24 +650,21 @@ def unpublish_content(id):
         if content.status == 'published':
             content.status = 'draft'
             content.published_at = None
-            
-            db.session.commit()
+            mark_public_content_changed(content)
             
             # Log unpublishing
-            try:
-                AuditLog.log_action(
-                    user_id=current_user.id,
-                    action='unpublish_content',
-                    table_name='content',
-                    record_id=content.id,
-                    old_values=old_values,
-                    new_values=content.to_dict(),
-                    ip_address=request.remote_addr,
-                    user_agent=request.user_agent.string
-                )
-                db.session.commit()
-            except Exception:
-                pass
+            db.session.flush()
+            record_audit(
+                user_id=current_user.id,
+                action='unpublish_content',
+                table_name='content',
+                record_id=content.id,
+                old_values=old_values,
+                new_values=content.to_dict(),
+                ip_address=request.remote_addr,
+                user_agent=request.user_agent.string
+            )
+            db.session.commit()
             
             return jsonify({'success': True, 'message': f'Konten "{content.title}" berhasil di-unpublish.'})
         else:
@@ -696,54 +694,16 @@ def bulk_action():
         if not action or not content_ids:
             return jsonify({'success': False, 'message': 'Data tidak lengkap'})
         
-        contents = Content.query.filter(Content.id.in_(content_ids)).all()
-        success_count = 0
+        if action not in EDITOR_ACTIONS:
+            return jsonify({'success': False, 'message': 'Aksi tidak valid'})
         
-        for content in contents:
-            old_values = content.to_dict()
-            
-            if action == 'publish':
-                if content.status in ['draft', 'rejected', 'pending_review']:
-                    content.status = 'published'
-                    content.published_at = datetime.utcnow()
-                    content.reviewer_id = current_user.id
-                    success_count += 1
-            elif action == 'unpublish':
-                if content.status == 'published':
-                    content.status = 'draft'
-                    content.published_at = None
-                    success_count += 1
-            elif action == 'delete':
-                if content.cover_image:
-                    try:
-                        delete_uploaded_file(content.cover_image)
-                    except Exception:
-                        pass  # Continue with deletion even if file removal fails
-                db.session.delete(content)
-                success_count += 1
-                continue
-            elif action == 'pending':
-                if content.status in ['draft', 'rejected']:
-                    content.status = 'pending_review'
-                    success_count += 1
-            
-            # Log the action
-            try:
-                AuditLog.log_action(
-                    user_id=current_user.id,
-                    action=f'bulk_{action}',
-                    table_name='content',
-                    record_id=content.id,
-                    old_values=old_values,
-                    new_values=content.to_dict() if action != 'delete' else None,
-                    ip_address=request.remote_addr,
-                    user_agent=request.user_agent.string
-                )
-            except Exception:
-                pass
-        
-        db.session.commit()
-        return jsonify({'success': True, 'message': f'Berhasil memproses {success_count} konten'})
+        results = run_bulk_action(
+            action, content_ids, EDITOR_ACTIONS, current_user, 'bulk_', set_reviewer=True,
+            ip_address=request.remote_addr, user_agent=request.user_agent.string
+        )
+        success_count = sum(1 for result in results if result['result'] == 'ok')
+        return jsonify({'success': True, 'message': f'Berhasil memproses {success_count} konten',
+                        'results': results})
         
     except Exception as e:
         db.session.rollback()
@@ -756,20 +716,19 @@ def review_history():
     try:
         page = request.args.get('page', 1, type=int)
         
-        # Get content reviewed by this editor
-        reviewed_content = Content.query.filter_by(reviewer_id=current_user.id).order_by(
-            Content.updated_at.desc()
-        ).paginate(page=page, per_page=20, error_out=False)
+        # Get content reviewed by this editor; the reviewer's counters give the total
+        reviewed_content = paginate(project_content(
+            Content.query.filter_by(reviewer_id=current_user.id).order_by(Content.updated_at.desc())
+        ), page, 20, content_total(reviewer_id=current_user.id))
+        reviewed_content.items = [ContentRow.from_row(row) for row in reviewed_content.items]
         
         # Calculate statistics for the template
+        counts = get_counts(('reviewer', current_user.id))
         stats = {
-            'approved': Content.query.filter_by(reviewer_id=current_user.id, status='published').count(),
-            'rejected': Content.query.filter_by(reviewer_id=current_user.id, status='rejected').count(),
-            'this_month': Content.query.filter(
-                Content.reviewer_id == current_user.id,
-                func.date(Content.updated_at) >= datetime.utcnow().replace(day=1).date()
-            ).count(),
-            'total': Content.query.filter_by(reviewer_id=current_user.id).count()
+            'approved': counts.get('reviewer', current_user.id, 'published'),
+            'rejected': counts.get('reviewer', current_user.id, 'rejected'),
+            'this_month': get_review_count(current_user.id, datetime.utcnow().date().replace(day=1)),
+            'total': counts.get('reviewer', current_user.id)
         }
         
         return render_template('editor/review_history.html', 
@@ -784,39 +743,27 @@ def review_history():
 @editor_required
 def analytics():
     try:
-        # Get comprehensive analytics for editors
-        total_content = Content.query.count()
-        total_views = db.session.query(func.sum(Content.view_count)).scalar() or 0
+        # Range queries over the daily rollups (see app.core.rollups)
+        days = get_analytics_days()
+        since = get_since(days)
+        status_counts = get_status_counts()
+        total_content = sum(status_counts.values())
+        total_views = get_total_views(since)
         
         # Content by status
-        status_stats = db.session.query(
-            Content.status,
-            func.count(Content.id).label('count')
-        ).group_by(Content.status).all()
+        status_stats = [(status, count) for status, count in status_counts.items() if count]
         
         # Content by category
-        category_stats = db.session.query(
-            Category.name,
-            func.count(Content.id).label('count'),
-            func.sum(Content.view_count).label('total_views')
-        ).join(Content).group_by(Category.id, Category.name).all()
+        category_stats = get_category_activity(since)
         
         # Top authors
-        author_stats = db.session.query(
-            User.full_name,
-            func.count(Content.id).label('content_count'),
-            func.sum(Content.view_count).label('total_views')
-        ).join(Content, Content.author_id == User.id)\
-        .group_by(User.id, User.full_name)\
-        .order_by(func.count(Content.id).desc()).limit(10).all()
+        author_stats = get_author_activity(since, limit=10)
         
         # Monthly content statistics
-        monthly_stats = db.session.query(
-            func.date_format(Content.created_at, '%Y-%m').label('month'),
-            func.count(Content.id).label('count')
-        ).group_by('month').order_by('month').all()
+        monthly_stats = get_created_by_month(since)
         
         return render_template('editor/analytics.html',
+                             days=days,
                              total_content=total_content,
                              total_views=total_views,
                              status_stats=status_stats,
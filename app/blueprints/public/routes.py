@@ -1,39 +1,30 @@
-from flask import render_template, request, flash, redirect, url_for, abort, current_app
+from flask import render_template, request, flash, redirect, url_for, abort, current_app, g, jsonify
 from app.blueprints.public import bp
 from app.blueprints.public.forms import ContactForm, SearchForm
 from app.models.content import Content, Category
-from app.models.setting import Setting
 from app.core.email import send_contact_email, send_auto_reply_email
-from app import db
-from sqlalchemy import or_
+from app.core.cache import cache_page, memoize, get_content_version
+from app.core.http_cache import conditional
+from app.core.reference import get_nav_categories
+from app.core.view_counter import record_view
+from app.core.static_export import is_static_export
+from app.core import feeds
+from app.core.feeds import cached_response
+from app.core.search import apply_search, category_facets, highlight
+from app.core.suggest import get_suggestions
+from app.core.totals import cached_count, paginate
+from app import db, csrf
+import hashlib
+import json
 
 @bp.route('/')
+@cache_page()
 def index():
-    # Get featured/latest content
-    featured_content = Content.query.filter_by(status='published').order_by(
-        Content.published_at.desc()
-    ).limit(6).all()
+    # Featured/latest content and latest content per category in a single query;
+    # site_settings comes from the context processor
+    homepage = Content.get_homepage_content(featured_limit=6, per_category=3)
     
-    # Get content by categories
-    categories = Category.query.filter_by(is_active=True).order_by(
-        Category.sort_order, Category.name
-    ).all()
-    
-    content_by_category = {}
-    for category in categories:
-        content_by_category[category.slug] = Content.query.filter_by(
-            category_id=category.id, 
-            status='published'
-        ).order_by(Content.published_at.desc()).limit(3).all()
-    
-    # Get site settings
-    site_settings = Setting.get_public_settings()
-    
-    return render_template('public/index.html', 
-                         featured_content=featured_content,
-                         categories=categories,
-                         content_by_category=content_by_category,
-                         site_settings=site_settings)
+    return render_template('public/index.html', **homepage)
 
 @bp.route('/berita')
 def berita():
@@ -51,48 +42,85 @@ def pengumuman():
 def layanan():
     return category_content('layanan')
 
+@memoize(timeout=60.0)
+def category_state(slug, version):
+    """Keyed on the content version, so any publish event invalidates it in every worker"""
+    return Content.get_category_state(slug)
+
+def category_validators(slug):
+    state = category_state(slug, get_content_version())
+    if state is None:
+        return None
+    category_id, latest_updated, latest_published, count = state
+    latest = max([t for t in (latest_updated, latest_published) if t is not None], default=None)
+    return (category_id, latest_updated, latest_published, count), latest
+
 @bp.route('/category/<slug>')
+@conditional(category_validators)
+@cache_page()
 def category_content(slug):
     category = Category.query.filter_by(slug=slug, is_active=True).first_or_404()
     
-    page = request.args.get('page', 1, type=int)
-    
-    content = Content.query.filter_by(
-        category_id=category.id, 
-        status='published'
-    ).order_by(Content.published_at.desc()).paginate(
-        page=page, per_page=10, error_out=False
-    )
+    # Seek on (published_at, id) so deep pages cost the same as the first
+    content = Content.get_category_page(category.id, cursor=request.args.get('cursor'))
     
     return render_template('public/category.html', 
                          category=category, 
                          content=content)
 
+def record_content_view(meta, slug):
+    """Count a view served from the page cache"""
+    content_id = meta.get('content_id')
+    if content_id:
+        current_app.extensions['view_counter'].increment(content_id)
+
+@memoize(timeout=60.0)
+def content_detail_state(slug, version):
+    return Content.get_detail_state(slug)
+
+def content_detail_validators(slug):
+    state = content_detail_state(slug, get_content_version())
+    if state is None:
+        return None
+    g.page_cache_meta = {'content_id': state.id}
+    latest = max([t for t in (state.updated_at, state.published_at) if t is not None], default=None)
+    return tuple(state), latest
+
 @bp.route('/content/<slug>')
+@conditional(content_detail_validators, on_not_modified=record_content_view)
+@cache_page(on_hit=record_content_view)
 def content_detail(slug):
     content = Content.query.filter_by(slug=slug, status='published').first_or_404()
+    g.page_cache_meta = {'content_id': content.id}
     
-    # Increment view count
-    content.view_count += 1
-    db.session.commit()
+    # Buffered view count; written in batches by the view counter.
+    # Pre-rendered copies count views with a beacon instead
+    if not is_static_export():
+        record_view(content)
     
-    # Get related content from same category
-    related_content = Content.query.filter(
-        Content.category_id == content.category_id,
-        Content.id != content.id,
-        Content.status == 'published'
-    ).order_by(Content.published_at.desc()).limit(3).all()
+    # Neighbours by text similarity, precomputed by app.core.related
+    related_content = content.get_related(limit=3)
     
     return render_template('public/content_detail.html', 
                          content=content,
                          related_content=related_content)
 
+@bp.route('/api/content-views/<int:id>', methods=['POST'])
+@csrf.exempt
+def content_view_beacon(id):
+    """View count of pre-rendered article pages, sent with navigator.sendBeacon"""
+    published = db.session.query(Content.id).filter_by(id=id, status='published').first()
+    if published is None:
+        abort(404)
+    current_app.extensions['view_counter'].increment(id)
+    return '', 204
+
 @bp.route('/search')
 def search():
     form = SearchForm()
     
     # Populate category choices
-    categories = Category.query.filter_by(is_active=True).order_by(Category.name).all()
+    categories = sorted(get_nav_categories(), key=lambda cat: cat.name)
     form.category.choices = [(0, 'Semua Kategori')] + [(cat.id, cat.name) for cat in categories]
     
     query = request.args.get('query', '', type=str)
@@ -100,38 +128,100 @@ def search():
     page = request.args.get('page', 1, type=int)
     
     content = None
+    facets = []
+    snippets = {}
     if query:
-        content_query = Content.query.filter(
-            Content.status == 'published',
-            or_(
-                Content.title.contains(query),
-                Content.content.contains(query),
-                Content.excerpt.contains(query)
-            )
-        )
+        content_query = apply_search(Content.query.filter(Content.status == 'published'), query)
+        
+        # Facet counts ignore the selected category so visitors can switch between them
+        facets = category_facets(query)
         
         if category_id > 0:
             content_query = content_query.filter(Content.category_id == category_id)
         
-        content = content_query.order_by(Content.published_at.desc()).paginate(
-            page=page, per_page=10, error_out=False
-        )
+        # Repeated searches (paging through results) reuse the count for a while
+        total = cached_count(content_query, ('search', query, category_id))
+        content = paginate(content_query, page, 10, total)
+        snippets = {item.id: highlight(item.content or item.excerpt, query) for item in content.items}
     
     return render_template('public/search.html', 
                          form=form,
                          content=content,
+                         facets=facets,
+                         snippets=snippets,
                          query=query,
                          category_id=category_id)
 
+@bp.route('/api/search-suggestions')
+def search_suggestions():
+    """Title and category suggestions while typing in the search box"""
+    query = request.args.get('q', '').strip()[:100]
+    try:
+        suggestions = get_suggestions(query, limit=8) if len(query) >= 2 else []
+    except Exception as e:
+        current_app.logger.error(f'Search suggestions failed: {str(e)}')
+        suggestions = []
+    
+    response = jsonify({'suggestions': suggestions})
+    # Short-lived so browsers and nginx absorb repeated prefixes while typing
+    response.headers['Cache-Control'] = f"public, max-age={current_app.config.get('SEARCH_SUGGESTIONS_MAX_AGE', 60)}"
+    return response
+
+@memoize(timeout=1.0)
+def latest_content_etag(limit):
+    """ETag for /api/latest-content; hits the database at most once a second per worker"""
+    latest_published, latest_updated, count = Content.get_published_state()
+    token = f'{latest_published}|{latest_updated}|{count}|{limit}'
+    return hashlib.sha1(token.encode('utf-8')).hexdigest()
+
+@memoize(timeout=60.0)
+def latest_content_body(etag, limit):
+    return json.dumps({'latest': Content.get_latest_summaries(limit)})
+
+@bp.route('/api/latest-content')
+def latest_content():
+    """Newest published items for the homepage polling loop"""
+    limit = max(1, min(request.args.get('limit', 10, type=int), 20))
+    etag = latest_content_etag(limit)
+    if request.if_none_match.contains(etag):
+        response = current_app.response_class(status=304)
+    else:
+        response = current_app.response_class(latest_content_body(etag, limit), mimetype='application/json')
+    response.set_etag(etag)
+    # Browsers must revalidate each poll, which an unchanged ETag answers with an empty 304
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+@bp.route('/feed.xml')
+def feed():
+    return cached_response('feed.xml', feeds.feed(), 'application/rss+xml')
+
+@bp.route('/category/<slug>/feed.xml')
+def category_feed(slug):
+    category = Category.query.filter_by(slug=slug, is_active=True).first_or_404()
+    return cached_response(f'feed-{category.slug}.xml', feeds.feed(category), 'application/rss+xml')
+
+@bp.route('/sitemap.xml')
+def sitemap():
+    """Sitemap index: shard 0 lists the site pages, shards 1..N articles by id range"""
+    return cached_response('sitemap.xml', feeds.sitemap_index, 'application/xml')
+
+@bp.route('/sitemap-<int:shard>.xml')
+def sitemap_shard(shard):
+    if shard == 0:
+        return cached_response('sitemap-0.xml', feeds.sitemap_pages, 'application/xml')
+    if shard > feeds.sitemap_shard_count():
+        abort(404)
+    return cached_response(f'sitemap-{shard}.xml', feeds.sitemap_articles(shard), 'application/xml')
+
 @bp.route('/about')
+@cache_page()
 def about():
-    site_settings = Setting.get_public_settings()
-    return render_template('public/about.html', site_settings=site_settings)
+    return render_template('public/about.html')
 
 @bp.route('/contact', methods=['GET', 'POST'])
 def contact():
     form = ContactForm()
-    site_settings = Setting.get_public_settings()
     
     if form.validate_on_submit():
         try:
@@ -167,20 +257,4 @@ def contact():
         
         return redirect(url_for('public.contact'))
     
-    return render_template('public/contact.html', 
-                         form=form, 
-                         site_settings=site_settings)
-
-@bp.context_processor
-def inject_global_vars():
-    """Inject global variables into all templates"""
-    categories = Category.query.filter_by(is_active=True).order_by(
-        Category.sort_order, Category.name
-    ).all()
-    
-    site_settings = Setting.get_public_settings()
-    
-    return dict(
-        nav_categories=categories,
-        site_settings=site_settings
-    )
\ No newline at end of file
+    return render_template('public/contact.html', form=form)
@@ -3,35 +3,47 @@ from flask_login import login_required, current_user
 from app.blueprints.publisher import bp
 from app.blueprints.publisher.forms import ContentForm
 from app.models.content import Content, Category
-from app.models.audit import AuditLog
 from app.core.decorators import publisher_required
-from app.core.helpers import save_uploaded_file, delete_uploaded_file, make_slug
+from app.core.helpers import save_uploaded_file, delete_uploaded_file
+from app.core.render import render_content
+from app.core.audit import record_audit
+from app.core.counters import get_counts
+from app.core.rollups import get_analytics_days, get_since, get_total_views, get_category_activity, get_created_by_month
+from app.core.search import apply_search
+from app.core.pagination import keyset_paginate
+from app.core.read_models import ContentRow, project_content
+from app.core.reference import get_nav_categories
 from app import db
 from datetime import datetime
 from sqlalchemy import func
 
+def _author_stats():
+    """Content counts and views of the current publisher, shown on the dashboard and lists"""
+    counts = get_counts(('author', current_user.id))
+    return {
+        'draft_count': counts.get('author', current_user.id, 'draft'),
+        'pending_count': counts.get('author', current_user.id, 'pending_review'),
+        'published_count': counts.get('author', current_user.id, 'published'),
+        'rejected_count': counts.get('author', current_user.id, 'rejected'),
+        'total_views': db.session.query(func.sum(Content.view_count))\
+            .filter_by(author_id=current_user.id).scalar() or 0
+    }
+
 @bp.route('/dashboard')
 @login_required
 @publisher_required
 def dashboard():
     try:
         # Get publisher statistics
-        stats = {
-            'draft_count': Content.query.filter_by(author_id=current_user.id, status='draft').count(),
-            'pending_count': Content.query.filter_by(author_id=current_user.id, status='pending_review').count(),
-            'published_count': Content.query.filter_by(author_id=current_user.id, status='published').count(),
-            'rejected_count': Content.query.filter_by(author_id=current_user.id, status='rejected').count(),
-            'total_views': db.session.query(func.sum(Content.view_count))\
-                .filter_by(author_id=current_user.id).scalar() or 0
-        }
+        stats = _author_stats()
         
         # Recent content by this publisher
-        recent_content = Content.query.filter_by(author_id=current_user.id).order_by(
+        recent_content = Content.query_for('list_view').filter_by(author_id=current_user.id).order_by(
             Content.created_at.desc()
         ).limit(5).all()
         
         # Recent published content (all publishers)
-        recent_published = Content.query.filter_by(status='published').order_by(
+        recent_published = Content.query_for('list_view').filter_by(status='published').order_by(
             Content.published_at.desc()
         ).limit(5).all()
         
@@ -68,20 +80,18 @@ def index():
 def drafts():
     """Show publisher's draft content"""
     try:
-        page = request.args.get('page', 1, type=int)
-        
-        content = Content.query.filter_by(
-            author_id=current_user.id, 
-            status='draft'
-        ).order_by(Content.created_at.desc()).paginate(
-            page=page, per_page=10, error_out=False
+        content = keyset_paginate(
+            project_content(Content.query.filter_by(author_id=current_user.id, status='draft')),
+            [Content.created_at.desc(), Content.id.desc()],
+            per_page=10, cursor=request.args.get('cursor'), row_factory=ContentRow.from_row
         )
         
         # Get categories for filter dropdown
-        categories = Category.query.filter_by(is_active=True).order_by(Category.name).all()
+        categories = sorted(get_nav_categories(), key=lambda cat: cat.name)
         
         return render_template('publisher/content_list.html', 
                              content=content,
+                             stats=_author_stats(),
                              categories=categories,
                              title='Draft Konten',
                              status_filter='draft')
@@ -95,20 +105,18 @@ def drafts():
 def pending():
     """Show publisher's pending review content"""
     try:
-        page = request.args.get('page', 1, type=int)
-        
-        content = Content.query.filter_by(
-            author_id=current_user.id, 
-            status='pending_review'
-        ).order_by(Content.created_at.desc()).paginate(
-            page=page, per_page=10, error_out=False
+        content = keyset_paginate(
+            project_content(Content.query.filter_by(author_id=current_user.id, status='pending_review')),
+            [Content.created_at.desc(), Content.id.desc()],
+            per_page=10, cursor=request.args.get('cursor'), row_factory=ContentRow.from_row
         )
         
         # Get categories for filter dropdown
-        categories = Category.query.filter_by(is_active=True).order_by(Category.name).all()
+        categories = sorted(get_nav_categories(), key=lambda cat: cat.name)
         
         return render_template('publisher/content_list.html', 
                              content=content,
+                             stats=_author_stats(),
                              categories=categories,
                              title='Konten Menunggu Review',
                              status_filter='pending_review')
@@ -122,20 +130,18 @@ def pending():
 def published():
     """Show publisher's published content"""
     try:
-        page = request.args.get('page', 1, type=int)
-        
-        content = Content.query.filter_by(
-            author_id=current_user.id, 
-            status='published'
-        ).order_by(Content.published_at.desc()).paginate(
-            page=page, per_page=10, error_out=False
+        content = keyset_paginate(
+            project_content(Content.query.filter_by(author_id=current_user.id, status='published')),
+            [Content.published_at.desc(), Content.id.desc()],
+            per_page=10, cursor=request.args.get('cursor'), row_factory=ContentRow.from_row
         )
         
         # Get categories for filter dropdown
-        categories = Category.query.filter_by(is_active=True).order_by(Category.name).all()
+        categories = sorted(get_nav_categories(), key=lambda cat: cat.name)
         
         return render_template('publisher/content_list.html', 
                              content=content,
+                             stats=_author_stats(),
                              categories=categories,
                              title='Konten Dipublikasi',
                              status_filter='published')
@@ -149,20 +155,18 @@ def published():
 def rejected():
     """Show publisher's rejected content"""
     try:
-        page = request.args.get('page', 1, type=int)
-        
-        content = Content.query.filter_by(
-            author_id=current_user.id, 
-            status='rejected'
-        ).order_by(Content.updated_at.desc()).paginate(
-            page=page, per_page=10, error_out=False
+        content = keyset_paginate(
+            project_content(Content.query.filter_by(author_id=current_user.id, status='rejected')),
+            [Content.updated_at.desc(), Content.id.desc()],
+            per_page=10, cursor=request.args.get('cursor'), row_factory=ContentRow.from_row
         )
         
         # Get categories for filter dropdown
-        categories = Category.query.filter_by(is_active=True).order_by(Category.name).all()
+        categories = sorted(get_nav_categories(), key=lambda cat: cat.name)
         
         return render_template('publisher/content_list.html', 
                              content=content,
+                             stats=_author_stats(),
                              categories=categories,
                              title='Konten Ditolak',
                              status_filter='rejected')
@@ -175,7 +179,6 @@ def rejected():
 @publisher_required
 def content_list():
     try:
-        page = request.args.get('page', 1, type=int)
         status_filter = request.args.get('status', '', type=str)
         category_filter = request.args.get('category', '', type=str)
         search = request.args.get('search', '', type=str)
@@ -192,30 +195,27 @@ def content_list():
             query = query.filter(Content.category_id == category_filter)
         
         if search:
-            query = query.filter(
-                db.or_(
-                    Content.title.contains(search),
-                    Content.content.contains(search)
-                )
-            )
+            query = apply_search(query, search, rank=False)
         
-        # Apply sorting
+        # Apply sorting; id breaks ties so the keyset cursor is unambiguous
         if sort == 'oldest':
-            query = query.order_by(Content.created_at.asc())
+            order_by = [Content.created_at.asc(), Content.id.asc()]
         elif sort == 'title':
-            query = query.order_by(Content.title.asc())
+            order_by = [Content.title.asc(), Content.id.asc()]
         elif sort == 'status':
-            query = query.order_by(Content.status.asc())
+            order_by = [Content.status.asc(), Content.id.asc()]
         else:  # newest (default)
-            query = query.order_by(Content.created_at.desc())
+            order_by = [Content.created_at.desc(), Content.id.desc()]
         
-        content = query.paginate(page=page, per_page=10, error_out=False)
+        content = keyset_paginate(project_content(query), order_by, per_page=10,
+                                  cursor=request.args.get('cursor'), row_factory=ContentRow.from_row)
         
         # Get categories for filter dropdown
-        categories = Category.query.filter_by(is_active=True).order_by(Category.name).all()
+        categories = sorted(get_nav_categories(), key=lambda cat: cat.name)
         
         return render_template('publisher/content_list.html', 
                              content=content,
+                             stats=_author_stats(),
                              categories=categories,
                              status_filter=status_filter,
                              category_filter=category_filter,
@@ -234,7 +234,7 @@ def create_content():
     
     try:
         # Populate category choices
-        categories = Category.query.filter_by(is_active=True).order_by(Category.sort_order, Category.name).all()
+        categories = get_nav_categories()
         form.category_id.choices = [(cat.id, cat.name) for cat in categories]
         
         if form.validate_on_submit():
@@ -259,27 +259,25 @@ def create_content():
                 author_id=current_user.id,
                 status=status
             )
+            render_content(content)
             
             # Generate unique slug
             content.slug = Content.generate_slug_from_title(content.title)
             
             db.session.add(content)
-            db.session.commit()
             
             # Log content creation
-            try:
-                AuditLog.log_action(
-                    user_id=current_user.id,
-                    action='create_content',
-                    table_name='content',
-                    record_id=content.id,
-                    new_values=content.to_dict(),
-                    ip_address=request.remote_addr,
-                    user_agent=request.user_agent.string
-                )
-                db.session.commit()
-            except Exception:
-                pass
+            db.session.flush()
+            record_audit(
+                user_id=current_user.id,
+                action='create_content',
+                table_name='content',
+                record_id=content.id,
+                new_values=content.to_dict(),
+                ip_address=request.remote_addr,
+                user_agent=request.user_agent.string
+            )
+            db.session.commit()
             
             if status == 'draft':
                 flash('Konten berhasil disimpan sebagai draft.', 'success')
@@ -314,7 +312,7 @@ def edit_content(id):
     
     try:
         # Populate category choices
-        categories = Category.query.filter_by(is_active=True).order_by(Category.sort_order, Category.name).all()
+        categories = get_nav_categories()
         form.category_id.choices = [(cat.id, cat.name) for cat in categories]
         
         if form.validate_on_submit():
@@ -334,29 +332,26 @@ def edit_content(id):
             content.category_id = form.category_id.data
             content.youtube_url = form.youtube_url.data.strip() if form.youtube_url.data else None
             content.updated_at = datetime.utcnow()
+            render_content(content)
             
             # Handle status change
             if 'submit_review' in request.form and content.status in ['draft', 'rejected']:
                 content.status = 'pending_review'
                 content.review_comment = None  # Clear previous review comments
             
-            db.session.commit()
-            
             # Log content update
-            try:
-                AuditLog.log_action(
-                    user_id=current_user.id,
-                    action='update_content',
-                    table_name='content',
-                    record_id=content.id,
-                    old_values=old_values,
-                    new_values=content.to_dict(),
-                    ip_address=request.remote_addr,
-                    user_agent=request.user_agent.string
-                )
-                db.session.commit()
-            except Exception:
-                pass
+            db.session.flush()
+            record_audit(
+                user_id=current_user.id,
+                action='update_content',
+                table_name='content',
+                record_id=content.id,
+                old_values=old_values,
+                new_values=content.to_dict(),
+                ip_address=request.remote_addr,
+                user_agent=request.user_agent.string
+            )
+            db.session.commit()
             
             if content.status == 'pending_review':
                 flash('Konten berhasil diperbarui dan dikirim untuk review.', 'success')
@@ -375,7 +370,7 @@ def edit_content(id):
 @login_required
 @publisher_required
 def view_content(id):
-    content = Content.query.get_or_404(id)
+    content = Content.query_for('detail_view').get_or_404(id)
     
     # Check ownership
     if content.author_id != current_user.id:
@@ -388,7 +383,7 @@ def view_content(id):
 @login_required
 @publisher_required
 def preview_content(id):
-    content = Content.query.get_or_404(id)
+    content = Content.query_for('detail_view').get_or_404(id)
     
     # Check ownership
     if content.author_id != current_user.id:
@@ -420,22 +415,18 @@ def delete_content(id):
             delete_uploaded_file(content.cover_image)
         
         db.session.delete(content)
-        db.session.commit()
         
         # Log content deletion
-        try:
-            AuditLog.log_action(
-                user_id=current_user.id,
-                action='delete_content',
-                table_name='content',
-                record_id=id,
-                old_values=old_values,
-                ip_address=request.remote_addr,
-                user_agent=request.user_agent.string
-            )
-            db.session.commit()
-        except Exception:
-            pass
+        record_audit(
+            user_id=current_user.id,
+            action='delete_content',
+            table_name='content',
+            record_id=id,
+            old_values=old_values,
+            ip_address=request.remote_addr,
+            user_agent=request.user_agent.string
+        )
+        db.session.commit()
         
         return jsonify({'success': True, 'message': f'Konten "{title}" berhasil dihapus.'})
     except Exception as e:
@@ -462,23 +453,19 @@ def submit_for_review(id):
         content.review_comment = None  # Clear previous review comments
         content.updated_at = datetime.utcnow()
         
-        db.session.commit()
-        
         # Log status change
-        try:
-            AuditLog.log_action(
-                user_id=current_user.id,
-                action='submit_for_review',
-                table_name='content',
-                record_id=content.id,
-                old_values=old_values,
-                new_values=content.to_dict(),
-                ip_address=request.remote_addr,
-                user_agent=request.user_agent.string
-            )
-            db.session.commit()
-        except Exception:
-            pass
+        db.session.flush()
+        record_audit(
+            user_id=current_user.id,
+            action='submit_for_review',
+            table_name='content',
+            record_id=content.id,
+            old_values=old_values,
+            new_values=content.to_dict(),
+            ip_address=request.remote_addr,
+            user_agent=request.user_agent.string
+        )
+        db.session.commit()
         
         return jsonify({'success': True, 'message': 'Konten berhasil dikirim untuk review.'})
     except Exception as e:
@@ -490,33 +477,26 @@ def submit_for_review(id):
 @publisher_required
 def analytics():
     try:
-        # Get analytics data for publisher's content
-        total_content = Content.query.filter_by(author_id=current_user.id).count()
-        total_views = db.session.query(func.sum(Content.view_count))\
-            .filter_by(author_id=current_user.id).scalar() or 0
+        # Range queries over the daily rollups (see app.core.rollups)
+        days = get_analytics_days()
+        since = get_since(days)
+        counts = get_counts(('author', current_user.id))
+        total_content = counts.get('author', current_user.id)
+        total_views = get_total_views(since, author_id=current_user.id)
         
         # Content by status
-        status_stats = db.session.query(
-            Content.status,
-            func.count(Content.id).label('count')
-        ).filter_by(author_id=current_user.id).group_by(Content.status).all()
+        status_stats = [(status, counts.get('author', current_user.id, status))
+                        for status in ('draft', 'pending_review', 'published', 'rejected')
+                        if counts.get('author', current_user.id, status)]
         
         # Content by category
-        category_stats = db.session.query(
-            Category.name,
-            func.count(Content.id).label('count'),
-            func.sum(Content.view_count).label('total_views')
-        ).join(Content).filter(
-            Content.author_id == current_user.id
-        ).group_by(Category.id, Category.name).all()
+        category_stats = get_category_activity(since, author_id=current_user.id)
         
         # Monthly content creation
-        monthly_stats = db.session.query(
-            func.date_format(Content.created_at, '%Y-%m').label('month'),
-            func.count(Content.id).label('count')
-        ).filter_by(author_id=current_user.id).group_by('month').order_by('month').all()
+        monthly_stats = get_created_by_month(since, author_id=current_user.id)
         
         return render_template('publisher/analytics.html',
+                             days=days,
                              total_content=total_content,
                              total_views=total_views,
                              status_stats=status_stats,
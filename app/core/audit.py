@@ -0,0 +1,188 @@
+from datetime import datetime
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+import atexit
+import gc
+import queue
+import threading
+import weakref
+
+# Routes record audit events with record_audit() before they commit their
+# change. With AUDIT_LOG_MODE = 'transaction' the row is added to the same
+# session, so the change and its audit row commit (or roll back) together.
+# With 'async' the event waits in session.info until the commit succeeds and
+# then goes to a bounded in-process queue; a background thread writes it in
+# multi-row INSERTs. A full queue or a stopped writer falls back to writing
+# synchronously, and whatever is queued is written when the worker shuts down.
+
+_PENDING_KEY = 'audit_events'
+
+# Writers of every app in this process, shut down by one exit handler
+_writers = weakref.WeakSet()
+
+class AuditWriter:
+    """Background writer of queued audit events"""
+
+    def __init__(self, app=None):
+        self.app = None
+        self._queue = queue.Queue()
+        self._flush_lock = threading.Lock()
+        self._thread_lock = threading.Lock()
+        self._thread = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._stopped = False
+        self.batch_size = 200
+        self.flush_interval = 2
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self._queue = queue.Queue(maxsize=app.config.get('AUDIT_LOG_QUEUE_SIZE', 10000))
+        self.batch_size = app.config.get('AUDIT_LOG_BATCH_SIZE', 200)
+        self.flush_interval = app.config.get('AUDIT_LOG_FLUSH_INTERVAL', 2)
+        app.extensions['audit_writer'] = self
+        _writers.add(self)
+
+    def submit(self, entries):
+        """Queue committed audit entries; those that do not fit are written right away"""
+        overflow = []
+        for entry in entries:
+            if self._stopped:
+                overflow.append(entry)
+                continue
+            try:
+                self._queue.put_nowait(entry)
+            except queue.Full:
+                overflow.append(entry)
+        if overflow:
+            self._write(overflow)
+        if self._queue.qsize() >= self.batch_size:
+            self._wake.set()
+        if not self._stopped:
+            self._ensure_thread()
+
+    def pending(self):
+        """Events queued but not written yet"""
+        return self._queue.qsize()
+
+    def flush(self):
+        """Write everything queued, batch_size rows per INSERT; returns rows written"""
+        written = 0
+        with self._flush_lock:
+            while True:
+                batch = []
+                while len(batch) < self.batch_size:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                if not batch:
+                    return written
+                written += self._write(batch)
+
+    def shutdown(self):
+        """Stop the writer thread and write whatever is left"""
+        self._stopped = True
+        self._stop.set()
+        self._wake.set()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=5)
+        if self.pending():
+            self.flush()
+
+    def _write(self, entries):
+        from app import db
+        from app.models.audit import AuditLog
+        app = self.app
+        try:
+            with app.app_context():
+                with db.engine.begin() as connection:
+                    connection.execute(AuditLog.__table__.insert(), AuditLog.audit_rows(entries))
+            return len(entries)
+        except Exception as e:
+            app.logger.error(f'Audit log batch of {len(entries)} failed: {str(e)}')
+
+        # One bad row must not cost the others their audit trail
+        written = 0
+        with app.app_context():
+            for entry in entries:
+                try:
+                    with db.engine.begin() as connection:
+                        connection.execute(AuditLog.__table__.insert(), AuditLog.audit_rows([entry]))
+                    written += 1
+                except Exception as e:
+                    app.logger.error(f"Audit log entry lost ({entry.get('action')} on "
+                                     f"{entry.get('table_name')} {entry.get('record_id')}): {str(e)}")
+        return written
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._thread_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=_run, args=(weakref.ref(self), self._wake, self._stop),
+                                            name='audit-log-writer', daemon=True)
+            self._thread.start()
+
+def _run(writer_ref, wake, stop):
+    # Only a weak reference while waiting, so the thread ends with its writer
+    while not stop.is_set():
+        writer = writer_ref()
+        if writer is None:
+            return
+        interval = writer.flush_interval
+        del writer
+        wake.wait(interval)
+        wake.clear()
+        writer = writer_ref()
+        if writer is None or stop.is_set():
+            return
+        writer.flush()
+        del writer
+
+@atexit.register
+def _shutdown_writers():
+    # Apps dropped without their reference cycles collected yet are gone too
+    gc.collect()
+    for writer in list(_writers):
+        writer.shutdown()
+
+def record_audit(user_id, action, table_name, record_id=None, old_values=None, new_values=None,
+                 ip_address=None, user_agent=None, session=None):
+    """Record an audit event for the change about to be committed on the session.
+
+    Call it before the commit; nothing is written if the transaction rolls
+    back. ``record_id`` must be known, so flush new rows first.
+    """
+    if session is None:
+        from app import db
+        session = db.session
+
+    entry = dict(user_id=user_id, action=action, table_name=table_name, record_id=record_id,
+                 old_values=old_values, new_values=new_values, ip_address=ip_address, user_agent=user_agent)
+    if current_app.config.get('AUDIT_LOG_MODE', 'async') != 'async':
+        from app.models.audit import AuditLog
+        return AuditLog.log_action(session=session, **entry)
+    entry['created_at'] = datetime.utcnow()
+    session.info.setdefault(_PENDING_KEY, []).append(entry)
+
+@event.listens_for(Session, 'after_commit')
+def _submit_pending_events(session):
+    entries = session.info.pop(_PENDING_KEY, None)
+    if not entries or not has_app_context():
+        return
+    try:
+        current_app.extensions['audit_writer'].submit(entries)
+    except Exception as e:
+        # The change is committed; a failing audit queue must not break the request
+        current_app.logger.error(f'Audit events could not be queued: {str(e)}')
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_pending_events(session):
+    session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,538 @@
+from flask import current_app
+from sqlalchemy.sql import operators
+from collections import defaultdict, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from array import array
+import bisect
+import fcntl
+import heapq
+import json
+import math
+import mmap
+import os
+import struct
+import sys
+import threading
+
+from app.core.search import analyze, tokenize, LikeSearchBackend
+
+MAGIC = b'BM25IDX1'
+TITLE_WEIGHT = 2
+
+def document_terms(content):
+    """Term frequencies and length of a Content document (title counted TITLE_WEIGHT times)"""
+    tokens = analyze(content.title) * TITLE_WEIGHT
+    tokens += analyze(' '.join(filter(None, [content.excerpt, content.content])))
+    frequencies = defaultdict(int)
+    for token in tokens:
+        frequencies[sys.intern(token)] += 1
+    return dict(frequencies), len(tokens)
+
+class Segment:
+    """Immutable index segment read through a shared read-only memory map.
+
+    Layout after the header: sorted doc ids, doc lengths, per-term posting
+    offsets and the concatenated posting lists (doc index, term frequency),
+    all as native unsigned 32-bit arrays, so every worker mapping the file
+    shares the same page-cache pages. Only the term dictionary is decoded
+    into each worker.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.generation = 0
+        self.total_length = 0
+        self.terms = {}
+        empty = array('I').tobytes()
+        self.doc_ids = self.doc_lengths = self.posting_docs = self.posting_tfs = memoryview(empty).cast('I')
+        self.term_offsets = memoryview(array('I', [0]).tobytes()).cast('I')
+        if path and os.path.exists(path):
+            self._load(path)
+
+    def _load(self, path):
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        data = memoryview(self._mmap)
+        if bytes(data[:8]) != MAGIC:
+            raise ValueError(f'{path} is not a BM25 index')
+        header_length = struct.unpack('<I', data[8:12])[0]
+        header = json.loads(bytes(data[12:12 + header_length]).decode('utf-8'))
+
+        def section(name, count):
+            start = header['sections'][name]
+            return data[start:start + 4 * count].cast('I')
+
+        self.generation = header['generation']
+        self.total_length = header['total_length']
+        self.doc_ids = section('doc_ids', header['doc_count'])
+        self.doc_lengths = section('doc_lengths', header['doc_count'])
+        self.term_offsets = section('term_offsets', header['term_count'] + 1)
+        self.posting_docs = section('posting_docs', header['posting_count'])
+        self.posting_tfs = section('posting_tfs', header['posting_count'])
+        start = header['sections']['terms']
+        blob = bytes(data[start:start + header['terms_length']]).decode('utf-8')
+        self.terms = {sys.intern(term): i for i, term in enumerate(blob.split('\n'))} if blob else {}
+
+    @property
+    def doc_count(self):
+        return len(self.doc_ids)
+
+    def postings(self, term):
+        """(start, end) slice of the posting arrays for term"""
+        index = self.terms.get(term)
+        if index is None:
+            return 0, 0
+        return self.term_offsets[index], self.term_offsets[index + 1]
+
+    def merged(self, delta, delta_postings, deleted):
+        """Segment arrays of this segment with a journal delta applied.
+
+        Works on the posting arrays directly: kept postings are renumbered
+        to their new doc positions and the delta's postings merged in,
+        without rebuilding per-document term maps.
+        """
+        doc_ids = array('I', heapq.merge((doc_id for doc_id in self.doc_ids if doc_id not in deleted),
+                                         sorted(delta)))
+        new_index = {doc_id: i for i, doc_id in enumerate(doc_ids)}
+        # Old position -> new position, or -1 for documents that are gone
+        renumber = array('i', (new_index.get(doc_id, -1) if doc_id not in deleted else -1
+                               for doc_id in self.doc_ids))
+        doc_lengths = array('I', (delta[doc_id][1] if doc_id in delta else 0 for doc_id in doc_ids))
+        for position, doc_id in enumerate(self.doc_ids):
+            if renumber[position] >= 0:
+                doc_lengths[renumber[position]] = self.doc_lengths[position]
+
+        term_offsets = array('I', [0])
+        posting_docs = array('I')
+        posting_tfs = array('I')
+        terms = []
+        for term in sorted(set(self.terms) | {term for term, docs in delta_postings.items() if docs}):
+            start, end = self.postings(term)
+            postings = [(renumber[index], tf) for index, tf
+                        in zip(self.posting_docs[start:end], self.posting_tfs[start:end]) if renumber[index] >= 0]
+            added = delta_postings.get(term)
+            if added:
+                postings = list(heapq.merge(postings, sorted((new_index[doc_id], tf) for doc_id, tf in added.items())))
+            if not postings:
+                continue
+            terms.append(term)
+            for index, tf in postings:
+                posting_docs.append(index)
+                posting_tfs.append(min(tf, 0xFFFFFFFF))
+            term_offsets.append(len(posting_docs))
+        return doc_ids, doc_lengths, terms, term_offsets, posting_docs, posting_tfs
+
+    @staticmethod
+    def write(path, documents, generation):
+        """Write {doc_id: (frequencies, length)} as a segment file (atomically)"""
+        doc_ids = array('I', sorted(documents))
+        doc_index = {doc_id: i for i, doc_id in enumerate(doc_ids)}
+        doc_lengths = array('I', (documents[doc_id][1] for doc_id in doc_ids))
+
+        postings = defaultdict(list)
+        for doc_id in doc_ids:
+            for term, frequency in documents[doc_id][0].items():
+                postings[term].append((doc_index[doc_id], frequency))
+        terms = sorted(postings)
+
+        term_offsets = array('I', [0])
+        posting_docs = array('I')
+        posting_tfs = array('I')
+        for term in terms:
+            for index, frequency in postings[term]:
+                posting_docs.append(index)
+                posting_tfs.append(min(frequency, 0xFFFFFFFF))
+            term_offsets.append(len(posting_docs))
+        Segment.write_arrays(path, generation, doc_ids, doc_lengths, terms, term_offsets, posting_docs, posting_tfs)
+
+    @staticmethod
+    def write_arrays(path, generation, doc_ids, doc_lengths, terms, term_offsets, posting_docs, posting_tfs):
+        """Write prepared segment arrays as a segment file (atomically)"""
+        terms_blob = '\n'.join(terms).encode('utf-8')
+
+        blocks = [('doc_ids', doc_ids.tobytes()), ('doc_lengths', doc_lengths.tobytes()),
+                  ('term_offsets', term_offsets.tobytes()), ('posting_docs', posting_docs.tobytes()),
+                  ('posting_tfs', posting_tfs.tobytes()), ('terms', terms_blob)]
+        header = {
+            'generation': generation,
+            'doc_count': len(doc_ids),
+            'term_count': len(terms),
+            'posting_count': len(posting_docs),
+            'total_length': sum(doc_lengths),
+            'terms_length': len(terms_blob),
+            'sections': {}
+        }
+        # Section offsets depend on the header size, so reserve room for their digits first
+        header['sections'] = {name: 0 for name, _ in blocks}
+        reserved = len(json.dumps(header)) + 16 * len(blocks)
+        offset = 12 + reserved
+        for name, block in blocks:
+            offset += -offset % 4
+            header['sections'][name] = offset
+            offset += len(block)
+        header_bytes = json.dumps(header).encode('utf-8').ljust(reserved)
+
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(MAGIC + struct.pack('<I', len(header_bytes)) + header_bytes)
+            for name, block in blocks:
+                f.write(b'\0' * (header['sections'][name] - f.tell()))
+                f.write(block)
+        os.replace(tmp_path, path)
+
+class BM25Index:
+    """BM25 index over published content: a shared on-disk segment plus a journal.
+
+    Updates are appended to a journal file that every worker replays into a
+    small in-memory delta. Once the journal passes ``compact_threshold``
+    entries ``needs_compaction`` turns true and compact() (run off the
+    request thread, see schedule_compaction) merges the delta into a new
+    segment generation.
+    """
+
+    def __init__(self, directory, k1=1.2, b=0.75, compact_threshold=1000):
+        self.directory = directory
+        self.k1 = k1
+        self.b = b
+        self.compact_threshold = compact_threshold
+        self.segment_path = os.path.join(directory, 'bm25.idx')
+        self.journal_path = os.path.join(directory, 'bm25.journal')
+        self.lock_path = os.path.join(directory, 'bm25.lock')
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.RLock()
+        self._segment = Segment()
+        self._segment_mtime = None
+        self.compaction_queued = False
+        self._reset_delta()
+
+    def _reset_delta(self):
+        self._delta = {}
+        self._delta_postings = defaultdict(dict)
+        self._deleted = set()
+        self._journal_offset = 0
+        self._journal_entries = 0
+        self._results = OrderedDict()
+        self._deleted_index = None
+
+    # -- cross-process coordination -----------------------------------------
+
+    def _file_lock(self, exclusive):
+        lock_file = open(self.lock_path, 'a')
+        fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        return lock_file
+
+    def refresh(self):
+        """Pick up a new segment generation and replay unseen journal entries"""
+        with self._lock:
+            lock_file = self._file_lock(exclusive=False)
+            try:
+                self._refresh_locked()
+            finally:
+                lock_file.close()
+
+    def _refresh_locked(self):
+        try:
+            mtime = os.stat(self.segment_path).st_mtime_ns
+        except OSError:
+            mtime = None
+        if mtime != self._segment_mtime:
+            self._segment = Segment(self.segment_path)
+            self._segment_mtime = mtime
+            self._reset_delta()
+
+        try:
+            size = os.path.getsize(self.journal_path)
+        except OSError:
+            size = 0
+        if size < self._journal_offset:
+            # Journal was truncated by a compaction we have not seen yet
+            self._segment = Segment(self.segment_path)
+            self._reset_delta()
+        if size == self._journal_offset:
+            return
+        with open(self.journal_path, 'rb') as f:
+            f.seek(self._journal_offset)
+            data = f.read()
+        complete = data.rfind(b'\n') + 1
+        for line in data[:complete].splitlines():
+            self._apply(json.loads(line))
+        self._journal_offset += complete
+        self._results.clear()
+
+    def _apply(self, entry):
+        doc_id = entry['id']
+        old = self._delta.pop(doc_id, None)
+        if old is not None:
+            for term in old[0]:
+                self._delta_postings[term].pop(doc_id, None)
+        self._deleted.add(doc_id)
+        self._deleted_index = None
+        if entry['op'] == 'upsert':
+            frequencies = {sys.intern(t): f for t, f in entry['terms'].items()}
+            self._delta[doc_id] = (frequencies, entry['length'])
+            for term, frequency in frequencies.items():
+                self._delta_postings[term][doc_id] = frequency
+        self._journal_entries += 1
+
+    # -- updates ------------------------------------------------------------
+
+    @property
+    def needs_compaction(self):
+        return self._journal_entries >= self.compact_threshold
+
+    def update(self, upserts=(), deletes=()):
+        """Journal new/changed documents ({doc_id: (frequencies, length)}) and deleted ids"""
+        lines = [json.dumps({'op': 'upsert', 'id': doc_id, 'terms': frequencies, 'length': length})
+                 for doc_id, (frequencies, length) in dict(upserts).items()]
+        lines += [json.dumps({'op': 'delete', 'id': doc_id}) for doc_id in deletes]
+        if not lines:
+            return
+        with self._lock:
+            lock_file = self._file_lock(exclusive=True)
+            try:
+                with open(self.journal_path, 'ab') as f:
+                    f.write(('\n'.join(lines) + '\n').encode('utf-8'))
+                self._refresh_locked()
+            finally:
+                lock_file.close()
+
+    def build(self, documents):
+        """Replace the index with {doc_id: (frequencies, length)}"""
+        with self._lock:
+            lock_file = self._file_lock(exclusive=True)
+            try:
+                Segment.write(self.segment_path, documents, self._segment.generation + 1)
+                open(self.journal_path, 'wb').close()
+                self._segment_mtime = None
+                self._refresh_locked()
+            finally:
+                lock_file.close()
+
+    def compact(self):
+        """Merge the journal into a new segment generation; returns journal entries merged.
+
+        The merge is built from a snapshot without holding the file lock; only
+        swapping in the new segment (and the journal entries written since
+        the snapshot) takes the exclusive lock.
+        """
+        with self._lock:
+            self.refresh()
+            segment, segment_mtime = self._segment, self._segment_mtime
+            delta = dict(self._delta)
+            delta_postings = {term: dict(docs) for term, docs in self._delta_postings.items() if docs}
+            deleted = set(self._deleted)
+            journal_offset, entries = self._journal_offset, self._journal_entries
+        if not entries:
+            return 0
+
+        staging_path = f'{self.segment_path}.next'
+        Segment.write_arrays(staging_path, segment.generation + 1,
+                             *segment.merged(delta, delta_postings, deleted))
+
+        with self._lock:
+            lock_file = self._file_lock(exclusive=True)
+            try:
+                try:
+                    current_mtime = os.stat(self.segment_path).st_mtime_ns
+                except OSError:
+                    current_mtime = None
+                if current_mtime != segment_mtime:
+                    # Another worker compacted or rebuilt meanwhile
+                    os.remove(staging_path)
+                    return 0
+                with open(self.journal_path, 'rb') as f:
+                    f.seek(journal_offset)
+                    tail = f.read()
+                tmp_journal = f'{self.journal_path}.{os.getpid()}.tmp'
+                with open(tmp_journal, 'wb') as f:
+                    f.write(tail)
+                os.replace(staging_path, self.segment_path)
+                os.replace(tmp_journal, self.journal_path)
+                self._segment_mtime = None
+                self._refresh_locked()
+            finally:
+                lock_file.close()
+        return entries
+
+    # -- queries ------------------------------------------------------------
+
+    def _deleted_positions(self):
+        """Segment positions of documents replaced or removed by the journal"""
+        if self._deleted_index is None:
+            doc_ids = self._segment.doc_ids
+            positions = []
+            for doc_id in self._deleted:
+                position = bisect.bisect_left(doc_ids, doc_id)
+                if position < len(doc_ids) and doc_ids[position] == doc_id:
+                    positions.append(position)
+            self._deleted_index = positions
+        return self._deleted_index
+
+    @property
+    def doc_count(self):
+        base = self._segment.doc_count - sum(1 for d in self._deleted if d not in self._delta)
+        return max(base, 0) + len(self._delta)
+
+    def search(self, query, limit=100):
+        """[(doc_id, score)] best first"""
+        self.refresh()
+        terms = list(dict.fromkeys(analyze(query)))
+        if not terms:
+            return []
+
+        with self._lock:
+            # A page view searches twice (count and rows); reuse until the index changes
+            key = (tuple(terms), limit)
+            if key in self._results:
+                self._results.move_to_end(key)
+                return self._results[key]
+            segment = self._segment
+            doc_count = max(self.doc_count, 1)
+            total_length = segment.total_length + sum(length for _, length in self._delta.values())
+            average_length = total_length / doc_count or 1.0
+            k1, b = self.k1, self.b
+            constant = k1 * (1 - b)
+            per_length = k1 * b / average_length
+            # Segment scores are keyed by position in the segment, journal scores by doc id
+            scores = defaultdict(float)
+            delta_scores = defaultdict(float)
+
+            for term in terms:
+                start, end = segment.postings(term)
+                delta_postings = self._delta_postings.get(term, {})
+                df = (end - start) + len(delta_postings)
+                if not df:
+                    continue
+                # score = idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * length / average_length))
+                weight = math.log(1 + (doc_count - df + 0.5) / (df + 0.5)) * (k1 + 1)
+
+                doc_lengths = segment.doc_lengths
+                for index, tf in zip(segment.posting_docs[start:end], segment.posting_tfs[start:end]):
+                    scores[index] += weight * tf / (tf + constant + per_length * doc_lengths[index])
+
+                for doc_id, tf in delta_postings.items():
+                    delta_scores[doc_id] += weight * tf / (tf + constant + per_length * self._delta[doc_id][1])
+
+            for index in self._deleted_positions():
+                scores.pop(index, None)
+            doc_ids = segment.doc_ids
+            results = [(doc_ids[index], score) for index, score
+                       in heapq.nlargest(limit, scores.items(), key=lambda item: item[1])]
+            results = heapq.nlargest(limit, results + list(delta_scores.items()), key=lambda item: item[1])
+            self._results[key] = results
+            while len(self._results) > 64:
+                self._results.popitem(last=False)
+            return results
+
+def _published_only(query):
+    """True when the query already filters on Content.status == 'published'"""
+    from app.models.content import Content
+    criteria = query.whereclause
+    if criteria is None:
+        return False
+    for clause in getattr(criteria, 'clauses', [criteria]):
+        left, right = getattr(clause, 'left', None), getattr(clause, 'right', None)
+        if getattr(left, 'table', None) is Content.__table__ and left.name == 'status' \
+                and clause.operator is operators.eq and getattr(right, 'value', None) == 'published':
+            return True
+    return False
+
+class Bm25SearchBackend(LikeSearchBackend):
+    """Pure-Python BM25 for published content; unpublished rows fall back to LIKE"""
+
+    name = 'bm25'
+
+    def apply(self, query, search, rank=True):
+        from app import db
+        from app.models.content import Content
+        results = get_index().search(search, limit=current_app.config.get('BM25_MAX_RESULTS', 200))
+        ids = [doc_id for doc_id, _ in results]
+
+        if _published_only(query):
+            query = query.filter(Content.id.in_(ids))
+        else:
+            like_clauses = [db.or_(Content.title.contains(token), Content.content.contains(token),
+                                   Content.excerpt.contains(token)) for token in tokenize(search)]
+            unpublished = db.and_(Content.status != 'published', *like_clauses) if like_clauses else db.false()
+            query = query.filter(db.or_(Content.id.in_(ids), unpublished) if ids else unpublished)
+        if rank and ids:
+            ranking = db.case({doc_id: position for position, doc_id in enumerate(ids)},
+                              value=Content.id, else_=len(ids))
+            query = query.order_by(None).order_by(ranking, Content.published_at.desc())
+        return query
+
+    def rebuild(self, batch_size=500):
+        from app.models.content import Content
+        from app import db
+        documents = {}
+        last_id = 0
+        while True:
+            batch = Content.query.filter(Content.status == 'published', Content.id > last_id)\
+                .order_by(Content.id).limit(batch_size).all()
+            if not batch:
+                break
+            for content in batch:
+                documents[content.id] = document_terms(content)
+            last_id = batch[-1].id
+            db.session.expunge_all()
+        get_index().build(documents)
+        return len(documents)
+
+def get_index(app=None):
+    """The BM25 index of this worker (created on first use)"""
+    app = app or current_app._get_current_object()
+    index = app.extensions.get('bm25_index')
+    if index is None:
+        directory = app.config.get('BM25_INDEX_DIR') or os.path.join(app.config['CACHE_DIR'], 'bm25')
+        index = BM25Index(directory, compact_threshold=app.config.get('BM25_COMPACT_THRESHOLD', 1000))
+        app.extensions['bm25_index'] = index
+    return index
+
+def _on_public_content_changed(sender, content_ids=(), **kwargs):
+    if sender is None or sender.config.get('SEARCH_BACKEND') != 'bm25' or not content_ids:
+        return
+    from app import db
+    from app.models.content import Content
+    table = Content.__table__
+    # Runs from after_commit, where the committing session cannot emit SQL
+    with db.engine.connect() as connection:
+        rows = connection.execute(
+            db.select(table.c.id, table.c.title, table.c.excerpt, table.c.content)
+            .where(table.c.id.in_(content_ids), table.c.status == 'published')
+        ).all()
+    upserts = {row.id: document_terms(row) for row in rows}
+    deletes = set(content_ids) - set(upserts)
+    index = get_index(sender)
+    index.update(upserts=upserts, deletes=deletes)
+    if index.needs_compaction:
+        schedule_compaction(sender)
+
+_compaction_lock = threading.Lock()
+
+def schedule_compaction(app):
+    """Compact this worker's index on the background executor (once at a time)"""
+    index = get_index(app)
+    with _compaction_lock:
+        if index.compaction_queued:
+            return
+        index.compaction_queued = True
+
+    def run():
+        try:
+            index.compact()
+        except Exception as e:
+            app.logger.error(f'BM25 compaction failed: {str(e)}')
+        finally:
+            index.compaction_queued = False
+
+    if app.config.get('BM25_COMPACT_ASYNC', True):
+        app.extensions['bm25_compact_executor'].submit(run)
+    else:
+        run()
+
+def init_bm25(app):
+    from app.core.signals import public_content_changed
+    app.extensions['bm25_compact_executor'] = ThreadPoolExecutor(
+        max_workers=1, thread_name_prefix='bm25-compact'
+    )
+    public_content_changed.connect(_on_public_content_changed, weak=False)
@@ -0,0 +1,177 @@
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+# Bulk actions on the content lists run as one UPDATE/DELETE per chunk of
+# ids, guarded by the statuses the action may start from, instead of loading
+# and flushing every row as an ORM object. Those statements bypass the mapper
+# events, so the counters, rollups and public change signal are fed here from
+# a light select of the rows, and audit rows go in with a single INSERT.
+
+# action -> (new status, statuses it may be applied to; None for any)
+ADMIN_ACTIONS = {
+    'publish': ('published', ('draft', 'pending_review', 'rejected')),
+    'unpublish': ('draft', ('published',)),
+    'pending': ('pending_review', ('draft', 'rejected', 'published')),
+    'delete': (None, None),
+}
+EDITOR_ACTIONS = {
+    'publish': ('published', ('draft', 'rejected', 'pending_review')),
+    'unpublish': ('draft', ('published',)),
+    'pending': ('pending_review', ('draft', 'rejected')),
+    'delete': (None, None),
+}
+
+def _result(content_id, result, message):
+    return {'id': content_id, 'result': result, 'message': message}
+
+def _parse_ids(content_ids):
+    ids = []
+    for value in content_ids or []:
+        try:
+            value = int(value)
+        except (TypeError, ValueError):
+            continue
+        if value not in ids:
+            ids.append(value)
+    return ids
+
+def _iso(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+def run_bulk_action(action, content_ids, actions, user, audit_prefix, set_reviewer=False,
+                    ip_address=None, user_agent=None):
+    """Apply a bulk action chunk by chunk and commit each chunk.
+
+    Returns one {'id', 'result', 'message'} per requested id, where result
+    is 'ok', 'skipped' (status does not allow the action), 'not_found' or
+    'error' (the chunk failed and was rolled back).
+    """
+    from flask import current_app
+    from app import db
+    from app.core.counters import adjust_counters, counter_keys
+    from app.core.rollups import record_status_changes
+    from app.core.signals import mark_public_content_changed
+    from app.models.audit import AuditLog
+    from app.models.content import ContentRevision
+
+    new_status, allowed = actions[action]
+    content = db.Model.metadata.tables['content']
+    revisions = ContentRevision.__table__
+    chunk_size = current_app.config.get('BULK_ACTION_CHUNK_SIZE', 500)
+    ids = _parse_ids(content_ids)
+    results = {}
+
+    for start in range(0, len(ids), chunk_size):
+        chunk = ids[start:start + chunk_size]
+        try:
+            # Lock the rows so their status cannot change between this read and the write
+            rows = db.session.execute(
+                db.select(content.c.id, content.c.title, content.c.slug, content.c.status,
+                          content.c.category_id, content.c.author_id, content.c.reviewer_id,
+                          content.c.published_at, content.c.cover_image)
+                .where(content.c.id.in_(chunk)).with_for_update()
+            ).all()
+            found = {row.id: row for row in rows}
+            eligible = [row for row in rows if allowed is None or row.status in allowed]
+            for content_id in chunk:
+                if content_id not in found:
+                    results[content_id] = _result(content_id, 'not_found', 'Konten tidak ditemukan')
+                elif allowed is not None and found[content_id].status not in allowed:
+                    results[content_id] = _result(
+                        content_id, 'skipped',
+                        f'Status "{found[content_id].status}" tidak dapat di-{action}')
+            if not eligible:
+                db.session.commit()
+                continue
+
+            eligible_ids = [row.id for row in eligible]
+            now = datetime.utcnow()
+            counters = Counter()
+            rollups = []
+            audit = []
+            if action == 'delete':
+                db.session.execute(revisions.delete().where(revisions.c.content_id.in_(eligible_ids)))
+                db.session.execute(content.delete().where(content.c.id.in_(eligible_ids)))
+                for row in eligible:
+                    counters.subtract(counter_keys(row.status, row.category_id, row.author_id, row.reviewer_id))
+                    audit.append((row.id, {'title': row.title, 'slug': row.slug, 'status': row.status}, None))
+            else:
+                values = {'status': new_status}
+                if new_status == 'published':
+                    values['published_at'] = now
+                    if set_reviewer:
+                        values['reviewer_id'] = user.id
+                elif action == 'unpublish':
+                    values['published_at'] = None
+                db.session.execute(
+                    content.update()
+                    .where(content.c.id.in_(eligible_ids), content.c.status.in_(allowed))
+                    .values(updated_at=now, **values)
+                )
+                for row in eligible:
+                    reviewer_id = values.get('reviewer_id', row.reviewer_id)
+                    counters.update(counter_keys(new_status, row.category_id, row.author_id, reviewer_id))
+                    counters.subtract(counter_keys(row.status, row.category_id, row.author_id, row.reviewer_id))
+                    rollups.append((new_status, row.category_id, row.author_id, reviewer_id))
+                    # Only the fields this action changed on this row
+                    old = {name: _iso(getattr(row, name)) for name in values
+                           if getattr(row, name) != values[name]}
+                    audit.append((row.id, old, {name: _iso(values[name]) for name in old}))
+
+            connection = db.session.connection()
+            adjust_counters(connection, counters)
+            record_status_changes(connection, rollups, now.date())
+            AuditLog.log_actions([
+                dict(user_id=user.id, action=f'{audit_prefix}{action}', table_name='content',
+                     record_id=record_id, old_values=old, new_values=new,
+                     ip_address=ip_address, user_agent=user_agent)
+                for record_id, old, new in audit
+            ])
+            mark_public_content_changed([
+                row.id for row in eligible if 'published' in (row.status, new_status)
+            ])
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f'Bulk {action} failed: {str(e)}')
+            for content_id in chunk:
+                if content_id not in results:
+                    results[content_id] = _result(content_id, 'error', f'Gagal memproses konten: {str(e)}')
+            continue
+
+        for row in eligible:
+            results[row.id] = _result(row.id, 'ok', 'Berhasil')
+        if action == 'delete':
+            queue_file_deletions([row.cover_image for row in eligible if row.cover_image])
+
+    return [results[content_id] for content_id in ids]
+
+# ---------------------------------------------------------------------------
+# File cleanup
+# ---------------------------------------------------------------------------
+
+def queue_file_deletions(filenames):
+    """Remove uploaded files (and their image derivatives) off the request thread"""
+    from flask import current_app
+    from app.core.helpers import delete_uploaded_file
+    filenames = [name for name in filenames if name]
+    if not filenames:
+        return
+    app = current_app._get_current_object()
+
+    def run():
+        with app.app_context():
+            for filename in filenames:
+                delete_uploaded_file(filename)
+
+    if app.config.get('FILE_CLEANUP_ASYNC', True):
+        app.extensions['file_cleanup_executor'].submit(run)
+    else:
+        run()
+
+def init_bulk(app):
+    """Start the background queue that removes files of deleted content"""
+    app.extensions['file_cleanup_executor'] = ThreadPoolExecutor(
+        max_workers=1, thread_name_prefix='file-cleanup'
+    )
@@ -0,0 +1,264 @@
+from functools import wraps
+from collections import OrderedDict
+from flask import current_app, request, session, make_response, g
+from flask_login import current_user
+from sqlalchemy.exc import DBAPIError, TimeoutError as PoolTimeoutError
+import os
+import threading
+import time
+import secrets
+
+class ContentVersion:
+    """Site-wide content version shared by all workers through a small file.
+
+    Every bump writes a fresh random token, so two workers bumping at the same
+    time can never end up back on a version an old page was cached under.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._cached = None
+        self._cached_mtime = None
+
+    def get(self):
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return self.bump()
+
+        with self._lock:
+            if mtime == self._cached_mtime and self._cached is not None:
+                return self._cached
+        try:
+            with open(self.path) as f:
+                version = f.read().strip()
+        except OSError:
+            return self.bump()
+
+        with self._lock:
+            self._cached = version
+            self._cached_mtime = mtime
+        return version
+
+    def modified_at(self):
+        """Unix time of the last bump, or None"""
+        try:
+            return os.stat(self.path).st_mtime
+        except OSError:
+            return None
+
+    def bump(self):
+        version = f'{time.time_ns():x}-{secrets.token_hex(4)}'
+        directory = os.path.dirname(self.path)
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = f'{self.path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write(version)
+        os.replace(tmp_path, self.path)
+        with self._lock:
+            self._cached = None
+            self._cached_mtime = None
+        return version
+
+class PageCache:
+    """Per-worker LRU of rendered responses keyed by (path, query string, version)"""
+
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._latest = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, version, timeout):
+        with self._lock:
+            entry = self._entries.get((key, version))
+            if entry is None or time.time() - entry['created_at'] > timeout:
+                self.misses += 1
+                return None
+            self._entries.move_to_end((key, version))
+            self.hits += 1
+            return entry
+
+    def get_stale(self, key, max_age):
+        """Return the most recent entry for key regardless of version"""
+        with self._lock:
+            entry = self._latest.get(key)
+            if entry is None or time.time() - entry['created_at'] > max_age:
+                return None
+            return entry
+
+    def set(self, key, version, entry):
+        entry['created_at'] = time.time()
+        with self._lock:
+            self._entries[(key, version)] = entry
+            self._entries.move_to_end((key, version))
+            self._latest[key] = entry
+            while len(self._entries) > self.max_entries:
+                (old_key, _old_version), old_entry = self._entries.popitem(last=False)
+                if self._latest.get(old_key) is old_entry:
+                    del self._latest[old_key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._latest.clear()
+
+class MemoCache:
+    """Per-worker LRU of memoized results, each kept for its function's timeout"""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, timeout):
+        """(True, value) for a fresh entry, else (False, None)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry[0] >= timeout:
+                return False, None
+            self._entries.move_to_end(key)
+            return True, entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+def memoize(timeout=1.0):
+    """Per-worker, per-app memo of a function's result for ``timeout`` seconds"""
+    def decorator(f):
+        key_prefix = f'{f.__module__}.{f.__qualname__}'
+        
+        @wraps(f)
+        def decorated_function(*args):
+            memo = current_app.extensions['memo']
+            key = (key_prefix, args)
+            found, value = memo.get(key, timeout)
+            if found:
+                return value
+            value = f(*args)
+            memo.set(key, value)
+            return value
+        return decorated_function
+    return decorator
+
+def get_content_version():
+    """Current site-wide content version"""
+    return current_app.extensions['content_version'].get()
+
+def bump_content_version():
+    """Invalidate every cached public page in all workers"""
+    return current_app.extensions['content_version'].bump()
+
+def get_settings_version():
+    """Version of site-wide page parts (settings, navigation categories)"""
+    return current_app.extensions['settings_version'].get()
+
+def _on_public_content_changed(sender, content_ids=(), settings_changed=False, **kwargs):
+    if sender is not None and 'content_version' in sender.extensions:
+        sender.extensions['content_version'].bump()
+        # Changes not tied to an article (settings, categories) show up on every page
+        if settings_changed or not content_ids:
+            sender.extensions['settings_version'].bump()
+
+def init_cache(app):
+    """Set up the content version and page cache for this app"""
+    from app.core.signals import public_content_changed
+
+    cache_dir = app.config.get('CACHE_DIR') or os.path.join(app.instance_path, 'cache')
+    app.config['CACHE_DIR'] = cache_dir
+    app.extensions['content_version'] = ContentVersion(os.path.join(cache_dir, 'content_version'))
+    app.extensions['settings_version'] = ContentVersion(os.path.join(cache_dir, 'settings_version'))
+    app.extensions['page_cache'] = PageCache(app.config.get('PUBLIC_PAGE_CACHE_MAX_ENTRIES', 512))
+    app.extensions['memo'] = MemoCache(app.config.get('MEMO_MAX_ENTRIES', 1024))
+    public_content_changed.connect(_on_public_content_changed, weak=False)
+
+def _is_cacheable_request():
+    if request.method != 'GET':
+        return False
+    # Static export renders pages that differ slightly (view beacon)
+    if request.environ.get('cms.static_export'):
+        return False
+    if current_user.is_authenticated:
+        return False
+    # Pages carrying flashed messages are per-visitor
+    if '_flashes' in session:
+        return False
+    return True
+
+def _build_response(entry, cache_status):
+    response = make_response(entry['body'], entry['status'])
+    for name, value in entry['headers']:
+        response.headers[name] = value
+    response.headers['X-Page-Cache'] = cache_status
+    return response
+
+def cache_page(on_hit=None):
+    """Cache the full response of an anonymous GET view.
+
+    ``on_hit`` is called with the metadata the view stored in
+    ``g.page_cache_meta`` and the view arguments when a cached response is
+    served, for side effects the view would otherwise perform (view counts).
+    The cache is opt-in through the PUBLIC_PAGE_CACHE setting.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if not current_app.config.get('PUBLIC_PAGE_CACHE') or not _is_cacheable_request():
+                return f(*args, **kwargs)
+
+            page_cache = current_app.extensions['page_cache']
+            key = (request.path, request.query_string.decode('utf-8', errors='ignore'))
+
+            try:
+                version = get_content_version()
+            except OSError:
+                return f(*args, **kwargs)
+
+            entry = page_cache.get(key, version, current_app.config.get('PUBLIC_PAGE_CACHE_TIMEOUT', 300))
+            if entry is not None:
+                if on_hit is not None:
+                    try:
+                        on_hit(entry.get('meta') or {}, **kwargs)
+                    except Exception as e:
+                        current_app.logger.warning(f'Page cache hit callback failed: {str(e)}')
+                return _build_response(entry, 'HIT')
+
+            try:
+                response = make_response(f(*args, **kwargs))
+            except (DBAPIError, PoolTimeoutError) as e:
+                # Serve stale-if-error while the database is slow or unavailable
+                stale = page_cache.get_stale(key, current_app.config.get('PUBLIC_PAGE_CACHE_STALE_TIMEOUT', 3600))
+                if stale is None:
+                    raise
+                current_app.logger.warning(f'Serving stale page for {request.path}: {str(e)}')
+                from app import db
+                db.session.rollback()
+                return _build_response(stale, 'STALE')
+
+            if response.status_code == 200 and not response.direct_passthrough and 'Set-Cookie' not in response.headers:
+                headers = [(name, value) for name, value in response.headers.items()
+                           if name.lower() not in ('content-length', 'set-cookie', 'x-page-cache')]
+                page_cache.set(key, version, {
+                    'body': response.get_data(),
+                    'status': response.status_code,
+                    'headers': headers,
+                    'meta': g.get('page_cache_meta')
+                })
+                response.headers['X-Page-Cache'] = 'MISS'
+            return response
+        return decorated_function
+    return decorator
@@ -0,0 +1,101 @@
+import click
+
+def register_commands(app):
+    """Register maintenance CLI commands"""
+    
+    @app.cli.command('search-reindex')
+    @click.option('--batch-size', default=500, show_default=True, help='Rows per indexing batch.')
+    def search_reindex(batch_size):
+        """Create the full-text index and reindex all content."""
+        from app.core.search import rebuild_index, get_backend
+        indexed = rebuild_index(batch_size=batch_size)
+        click.echo(f'Indexed {indexed} content rows ({get_backend().name}).')
+
+    @app.cli.command('search-compact')
+    def search_compact():
+        """Merge the BM25 journal into a new index segment."""
+        from app.core.bm25 import get_index
+        merged = get_index(app).compact()
+        click.echo(f'Merged {merged} journal entries into the BM25 index.')
+
+    @app.cli.command('related-rebuild')
+    @click.option('--batch-size', default=1000, show_default=True, help='Rows per write batch.')
+    @click.option('--processes', default=None, type=int, help='Worker processes for MinHash (default: CPU count).')
+    def related_rebuild(batch_size, processes):
+        """Recompute related content for all published articles."""
+        from app.core.related import rebuild_related
+        computed = rebuild_related(batch_size=batch_size, processes=processes)
+        click.echo(f'Computed related content for {computed} articles.')
+
+    @app.cli.command('export-static')
+    @click.option('--output', default=None, help='Output directory (default: STATIC_EXPORT_DIR).')
+    @click.option('--processes', default=None, type=int, help='Render processes (default: CPU count).')
+    def export_static(output, processes):
+        """Pre-render the public site for nginx to serve directly."""
+        from app.core.static_export import export_site, get_export_dir
+        written = export_site(directory=output, processes=processes)
+        click.echo(f'Exported {written} pages to {output or get_export_dir()}.')
+
+    @app.cli.command('templates-compile')
+    def templates_compile():
+        """Compile all templates into the bytecode cache."""
+        from app.core.templates import prewarm_templates, get_bytecode_cache_dir
+        compiled, seconds = prewarm_templates(app)
+        click.echo(f'Compiled {compiled} templates in {seconds:.2f}s into {get_bytecode_cache_dir(app)}.')
+
+    @app.cli.command('images-reprocess')
+    @click.option('--processes', default=None, type=int, help='Worker processes (default: CPU count).')
+    @click.option('--force', is_flag=True, help='Also redo images that already have derivatives.')
+    def images_reprocess(processes, force):
+        """Create resized JPEG/WebP derivatives of uploaded images."""
+        from app.core.images import reprocess_all
+        processed, failed = reprocess_all(processes=processes, force=force)
+        click.echo(f'Processed {processed} images, {failed} failed.')
+
+    @app.cli.command('rerender')
+    @click.option('--batch-size', default=500, show_default=True, help='Rows per batch.')
+    @click.option('--processes', default=None, type=int, help='Render processes (default: CPU count).')
+    @click.option('--force', is_flag=True, help='Also redo rows whose stored render is current.')
+    def rerender(batch_size, processes, force):
+        """Re-run the content render pipeline, e.g. after sanitizer rules change."""
+        from app.core.render import rerender_all
+        updated = rerender_all(batch_size=batch_size, processes=processes, force=force)
+        click.echo(f'Re-rendered {updated} content rows.')
+
+    @app.cli.command('counters-reconcile')
+    def counters_reconcile():
+        """Recount content per status and repair the dashboard counters."""
+        from app.core.counters import reconcile_counters
+        corrected = reconcile_counters()
+        click.echo(f'Corrected {corrected} content counters.')
+
+    @app.cli.command('rollups-backfill')
+    @click.option('--batch-size', default=1000, show_default=True, help='Content rows per batch.')
+    def rollups_backfill(batch_size):
+        """Rebuild the daily analytics rollups from existing content."""
+        from app.core.rollups import rebuild_rollups
+        processed = rebuild_rollups(batch_size=batch_size)
+        click.echo(f'Rebuilt rollups from {processed} content rows.')
+
+    @app.cli.command('indexes-create')
+    def indexes_create():
+        """Add the secondary indexes an existing database is missing."""
+        from app.core.indexes import ensure_indexes
+        created = ensure_indexes()
+        click.echo(f'Created {len(created)} indexes{": " + ", ".join(created) if created else ""}.')
+
+    @app.cli.command('indexes-check')
+    def indexes_check():
+        """EXPLAIN the key queries and fail if one needs a sequential scan."""
+        from app import db
+        from app.core.indexes import check_query_plans
+        problems = check_query_plans()
+        if problems is None:
+            click.echo(f'Query plans cannot be checked on {db.engine.dialect.name}; '
+                       'supported are PostgreSQL, MySQL/MariaDB and SQLite.')
+            return
+        for name, tables in problems.items():
+            click.echo(f'{name}: sequential scan on {", ".join(tables)}')
+        if problems:
+            raise SystemExit(1)
+        click.echo('All key queries use an index.')
@@ -0,0 +1,221 @@
+from collections import Counter
+from sqlalchemy import event, inspect, tuple_
+
+# Content counts per status, overall and per category, author and reviewer,
+# live in the content_counters table. Mapper events on Content adjust them on
+# the flush's own connection, so they commit or roll back with the change.
+# Writes that bypass the ORM unit of work (bulk UPDATE/DELETE statements) must
+# call adjust_counters themselves; `flask counters-reconcile` repairs drift.
+SCOPES = ('status', 'category', 'author', 'reviewer')
+_KEY_COLUMNS = {'category': 'category_id', 'author': 'author_id', 'reviewer': 'reviewer_id'}
+_TRACKED = ('status',) + tuple(_KEY_COLUMNS.values())
+
+def counter_keys(status, category_id=None, author_id=None, reviewer_id=None):
+    """(scope, key_id, status) counters a content row with these values counts towards"""
+    if not status:
+        return []
+    keys = [('status', 0, status)]
+    for scope, key_id in (('category', category_id), ('author', author_id), ('reviewer', reviewer_id)):
+        if key_id is not None:
+            keys.append((scope, key_id, status))
+    return keys
+
+def _table():
+    from app.models.counter import ContentCounter
+    return ContentCounter.__table__
+
+def increment_rows(connection, table, key_columns, rows):
+    """Add each row's non-key values to the matching row of table, inserting it if missing"""
+    if not rows:
+        return
+    value_columns = [name for name in rows[0] if name not in key_columns]
+    dialect = connection.dialect.name
+    if dialect in ('postgresql', 'sqlite'):
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        statement = insert(table)
+        connection.execute(statement.on_conflict_do_update(
+            index_elements=[table.c[name] for name in key_columns],
+            set_={name: table.c[name] + statement.excluded[name] for name in value_columns}
+        ), rows)
+        return
+    if dialect in ('mysql', 'mariadb'):
+        from sqlalchemy.dialects.mysql import insert
+        statement = insert(table)
+        connection.execute(statement.on_duplicate_key_update(
+            {name: table.c[name] + statement.inserted[name] for name in value_columns}
+        ), rows)
+        return
+    _increment_by_update(connection, table, key_columns, value_columns, rows)
+
+def _increment_by_update(connection, table, key_columns, value_columns, rows):
+    # No upsert statement: UPDATE, else INSERT in a savepoint. When another
+    # transaction inserts the same key in between, the INSERT hits the unique
+    # key and the UPDATE is run again, now finding its row.
+    from sqlalchemy import bindparam
+    from sqlalchemy.exc import IntegrityError
+    update = table.update().where(
+        *[table.c[name] == bindparam(f'_{name}') for name in key_columns]
+    ).values({name: table.c[name] + bindparam(f'_{name}') for name in value_columns})
+    for row in rows:
+        params = {f'_{name}': value for name, value in row.items()}
+        if connection.execute(update, params).rowcount:
+            continue
+        try:
+            with connection.begin_nested():
+                connection.execute(table.insert(), row)
+        except IntegrityError:
+            connection.execute(update, params)
+
+def adjust_counters(connection, deltas):
+    """Add {(scope, key_id, status): delta} to the counters on the given connection"""
+    rows = [{'scope': scope, 'key_id': key_id, 'status': status, 'count': delta}
+            for (scope, key_id, status), delta in deltas.items() if delta]
+    increment_rows(connection, _table(), ('scope', 'key_id', 'status'), rows)
+
+def _values(target, old=False):
+    state = inspect(target)
+    values = {}
+    for name in _TRACKED:
+        history = state.attrs[name].history
+        if old and history.deleted:
+            values[name] = history.deleted[0]
+        else:
+            values[name] = getattr(target, name)
+    return values
+
+def _after_insert(mapper, connection, target):
+    adjust_counters(connection, Counter(counter_keys(**_values(target))))
+
+def _after_update(mapper, connection, target):
+    old, new = _values(target, old=True), _values(target)
+    if old == new:
+        return
+    deltas = Counter(counter_keys(**new))
+    deltas.subtract(counter_keys(**old))
+    adjust_counters(connection, deltas)
+
+def _before_delete(mapper, connection, target):
+    # Before the DELETE, while expired attributes can still be loaded
+    deltas = Counter()
+    deltas.subtract(counter_keys(**_values(target, old=True)))
+    adjust_counters(connection, deltas)
+
+def _register_events():
+    from app.models.content import Content
+    if event.contains(Content, 'after_insert', _after_insert):
+        return
+    event.listen(Content, 'after_insert', _after_insert)
+    event.listen(Content, 'after_update', _after_update)
+    event.listen(Content, 'before_delete', _before_delete)
+    # Load the previous value when one of these is assigned on an expired
+    # object, so after_update can tell which counter to decrement
+    for name in _TRACKED:
+        event.listen(getattr(Content, name), 'set', _keep_history, active_history=True)
+
+def _keep_history(target, value, oldvalue, initiator):
+    return value
+
+# ---------------------------------------------------------------------------
+# Reading
+# ---------------------------------------------------------------------------
+
+class CounterSnapshot:
+    """Counter rows fetched by get_counts"""
+
+    def __init__(self, rows):
+        self._counts = {}
+        for scope, key_id, status, count in rows:
+            self._counts.setdefault((scope, key_id), {})[status] = count
+
+    def get(self, scope='status', key_id=0, status=None):
+        """Count of one key, for one status or all of them"""
+        counts = self._counts.get((scope, key_id), {})
+        if status is None:
+            return sum(counts.values())
+        return counts.get(status, 0)
+
+    def by_key(self, scope, status=None):
+        """{key_id: count} over every fetched key of a scope"""
+        return {key_id: self.get(scope, key_id, status)
+                for (key_scope, key_id) in self._counts if key_scope == scope}
+
+def get_counts(*keys):
+    """Fetch counters in one indexed query.
+
+    Each key is a (scope, key_id) pair; a key_id of None fetches every key
+    of that scope, e.g. get_counts(('status', 0), ('author', user.id)).
+    """
+    from app import db
+    table = _table()
+    exact = [(scope, key_id) for scope, key_id in keys if key_id is not None]
+    whole = [scope for scope, key_id in keys if key_id is None]
+    conditions = []
+    if exact:
+        conditions.append(tuple_(table.c.scope, table.c.key_id).in_(exact))
+    if whole:
+        conditions.append(table.c.scope.in_(whole))
+    if not conditions:
+        return CounterSnapshot([])
+    rows = db.session.execute(
+        db.select(table.c.scope, table.c.key_id, table.c.status, table.c.count).where(db.or_(*conditions))
+    ).all()
+    return CounterSnapshot(rows)
+
+def get_status_counts():
+    """{status: count} over all content"""
+    snapshot = get_counts(('status', 0))
+    return {status: snapshot.get(status=status) for status in ('draft', 'pending_review', 'published', 'rejected')}
+
+def get_pending_review_count():
+    return get_counts(('status', 0)).get(status='pending_review')
+
+# ---------------------------------------------------------------------------
+# Repair
+# ---------------------------------------------------------------------------
+
+def _actual_counts(connection):
+    from app import db
+    content = db.Model.metadata.tables['content']
+    actual = Counter()
+    for scope in SCOPES:
+        column = content.c[_KEY_COLUMNS[scope]] if scope in _KEY_COLUMNS else None
+        columns = [column] if column is not None else []
+        statement = db.select(*columns, content.c.status, db.func.count()).group_by(*columns, content.c.status)
+        if column is not None:
+            statement = statement.where(column.isnot(None))
+        for row in connection.execute(statement):
+            key_id = row[0] if column is not None else 0
+            status = row[-2]
+            if status:
+                actual[(scope, key_id, status)] = row[-1]
+    return actual
+
+def reconcile_counters():
+    """Recount from the content table and fix counters that drifted; returns rows corrected"""
+    from app import db
+    table = _table()
+    with db.engine.begin() as connection:
+        if connection.dialect.name == 'postgresql':
+            # Hold off content writes while counting so no change falls between count and fix
+            connection.exec_driver_sql('LOCK TABLE content IN SHARE MODE')
+        actual = _actual_counts(connection)
+        stored = {(row.scope, row.key_id, row.status): row.count
+                  for row in connection.execute(db.select(table))}
+
+        deltas = Counter()
+        for key in set(actual) | set(stored):
+            difference = actual.get(key, 0) - stored.get(key, 0)
+            if difference:
+                deltas[key] = difference
+        adjust_counters(connection, deltas)
+        # Keys with nothing left in them are noise
+        connection.execute(table.delete().where(table.c.count == 0))
+    return len(deltas)
+
+def init_counters(app):
+    """Maintain content counters and expose the pending review count to templates"""
+    _register_events()
+    app.add_template_global(get_pending_review_count)
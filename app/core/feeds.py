@@ -0,0 +1,215 @@
+from datetime import timezone
+from email.utils import format_datetime
+from xml.sax.saxutils import escape
+from flask import current_app, url_for, send_file, stream_with_context
+import glob
+import os
+import threading
+
+def _cache_dir():
+    directory = os.path.join(current_app.config['CACHE_DIR'], 'feeds')
+    os.makedirs(directory, exist_ok=True)
+    return directory
+
+def _shard_size():
+    return current_app.config.get('SITEMAP_SHARD_SIZE', 10000)
+
+def _w3c(value):
+    return value.replace(tzinfo=timezone.utc).isoformat(timespec='seconds')
+
+def _rfc822(value):
+    return format_datetime(value.replace(tzinfo=timezone.utc), usegmt=True)
+
+def _content_table():
+    from app.models.content import Content
+    return Content.__table__
+
+def _stream(statement):
+    """Rows of a Core select, fetched in batches instead of all at once"""
+    from app import db
+    return db.session.execute(statement.execution_options(yield_per=1000))
+
+# ---------------------------------------------------------------------------
+# Disk cache
+# ---------------------------------------------------------------------------
+
+def cached_response(name, chunks, mimetype):
+    """Serve name from the disk cache, or stream it while writing the cache file.
+
+    ``chunks(seen)`` yields text and calls ``seen(timestamp)`` for every row
+    it writes; the newest timestamp becomes the file's mtime and so the
+    Last-Modified header crawlers revalidate against.
+    """
+    from app.core.cache import get_content_version
+    path = os.path.join(_cache_dir(), name)
+    if os.path.exists(path):
+        return send_file(path, mimetype=mimetype, conditional=True)
+
+    version = get_content_version()
+
+    def generate():
+        latest = []
+        def seen(value):
+            if value is not None and (not latest or value > latest[0]):
+                latest[:] = [value]
+
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        try:
+            with open(tmp_path, 'wb') as f:
+                for chunk in chunks(seen):
+                    data = chunk.encode('utf-8')
+                    f.write(data)
+                    yield data
+            if latest:
+                timestamp = latest[0].replace(tzinfo=timezone.utc).timestamp()
+                os.utime(tmp_path, (timestamp, timestamp))
+            # Content published while streaming: the file may be stale, don't keep it
+            if get_content_version() == version:
+                os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    return current_app.response_class(stream_with_context(generate()), mimetype=mimetype)
+
+def invalidate(content_ids=None):
+    """Drop cached files that may list the given articles (all files when None)"""
+    directory = _cache_dir()
+    if content_ids is None:
+        names = [os.path.basename(path) for path in glob.glob(os.path.join(directory, '*.xml'))]
+    else:
+        shards = {(content_id - 1) // _shard_size() + 1 for content_id in content_ids}
+        names = ['sitemap.xml', 'feed.xml'] + [f'sitemap-{shard}.xml' for shard in shards]
+        names += [os.path.basename(path) for path in glob.glob(os.path.join(directory, 'feed-*.xml'))]
+    for name in names:
+        try:
+            os.remove(os.path.join(directory, name))
+        except OSError:
+            pass
+
+def _on_public_content_changed(sender, content_ids=(), settings_changed=False, **kwargs):
+    if sender is None:
+        return
+    with sender.app_context():
+        try:
+            invalidate(None if settings_changed or not content_ids else content_ids)
+        except OSError as e:
+            sender.logger.error(f'Feed cache invalidation failed: {str(e)}')
+
+def init_feeds(app):
+    """Invalidate cached feeds and sitemaps on publish events"""
+    from app.core.signals import public_content_changed
+    public_content_changed.connect(_on_public_content_changed, weak=False)
+
+# ---------------------------------------------------------------------------
+# Sitemaps
+# ---------------------------------------------------------------------------
+
+def sitemap_shard_count():
+    """Article shards by id range, so publishing only changes the shard of that id"""
+    from app import db
+    table = _content_table()
+    max_id = db.session.execute(
+        db.select(db.func.max(table.c.id)).where(table.c.status == 'published')
+    ).scalar()
+    return ((max_id or 0) - 1) // _shard_size() + 1 if max_id else 0
+
+def _shard_range(shard):
+    size = _shard_size()
+    return (shard - 1) * size + 1, shard * size
+
+def sitemap_index(seen):
+    from app import db
+    table = _content_table()
+    yield '<?xml version="1.0" encoding="UTF-8"?>\n'
+    yield '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+    yield f'<sitemap><loc>{escape(url_for("public.sitemap_shard", shard=0, _external=True))}</loc></sitemap>\n'
+    for shard in range(1, sitemap_shard_count() + 1):
+        first, last = _shard_range(shard)
+        lastmod = db.session.execute(
+            db.select(db.func.max(table.c.updated_at))
+            .where(table.c.status == 'published', table.c.id.between(first, last))
+        ).scalar()
+        seen(lastmod)
+        yield f'<sitemap><loc>{escape(url_for("public.sitemap_shard", shard=shard, _external=True))}</loc>'
+        yield f'<lastmod>{_w3c(lastmod)}</lastmod></sitemap>\n' if lastmod else '</sitemap>\n'
+    yield '</sitemapindex>\n'
+
+def _urlset(entries):
+    yield '<?xml version="1.0" encoding="UTF-8"?>\n'
+    yield '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+    for loc, lastmod in entries:
+        lastmod_tag = f'<lastmod>{_w3c(lastmod)}</lastmod>' if lastmod else ''
+        yield f'<url><loc>{escape(loc)}</loc>{lastmod_tag}</url>\n'
+    yield '</urlset>\n'
+
+def sitemap_pages(seen):
+    """Shard 0: homepage, static pages and category listings"""
+    from app.core.reference import get_nav_categories
+    def entries():
+        for endpoint in ('public.index', 'public.about', 'public.contact'):
+            yield url_for(endpoint, _external=True), None
+        for category in get_nav_categories():
+            yield url_for('public.category_content', slug=category.slug, _external=True), None
+    return _urlset(entries())
+
+def sitemap_articles(shard):
+    def chunks(seen):
+        from app import db
+        table = _content_table()
+        first, last = _shard_range(shard)
+        rows = _stream(
+            db.select(table.c.slug, table.c.updated_at)
+            .where(table.c.status == 'published', table.c.id.between(first, last))
+            .order_by(table.c.id)
+        )
+        def entries():
+            for row in rows:
+                seen(row.updated_at)
+                yield url_for('public.content_detail', slug=row.slug, _external=True), row.updated_at
+        return _urlset(entries())
+    return chunks
+
+# ---------------------------------------------------------------------------
+# Feeds
+# ---------------------------------------------------------------------------
+
+def feed(category=None):
+    """RSS 2.0 feed of the newest published articles, optionally of one category"""
+    def chunks(seen):
+        from app import db
+        from app.core.reference import get_public_settings
+        table = _content_table()
+        settings = get_public_settings()
+        site_name = settings.get('site_name') or 'Portal Desa Digital'
+        if category is not None:
+            title = f'{category.name} - {site_name}'
+            link = url_for('public.category_content', slug=category.slug, _external=True)
+            self_link = url_for('public.category_feed', slug=category.slug, _external=True)
+        else:
+            title = site_name
+            link = url_for('public.index', _external=True)
+            self_link = url_for('public.feed', _external=True)
+
+        statement = db.select(
+            table.c.title, table.c.slug, table.c.excerpt, table.c.excerpt_text, table.c.published_at, table.c.updated_at
+        ).where(table.c.status == 'published')
+        if category is not None:
+            statement = statement.where(table.c.category_id == category.id)
+        rows = _stream(statement.order_by(table.c.published_at.desc(), table.c.id.desc())
+                       .limit(current_app.config.get('FEED_SIZE', 20)))
+
+        yield '<?xml version="1.0" encoding="UTF-8"?>\n'
+        yield '<rss version="2.0" xmlns:atom="http://www.w3.org/2005/Atom"><channel>\n'
+        yield f'<title>{escape(title)}</title><link>{escape(link)}</link>'
+        yield f'<description>{escape(settings.get("site_description") or title)}</description>'
+        yield f'<language>id</language><atom:link href="{escape(self_link)}" rel="self" type="application/rss+xml"/>\n'
+        for row in rows:
+            seen(row.updated_at)
+            url = escape(url_for('public.content_detail', slug=row.slug, _external=True))
+            yield f'<item><title>{escape(row.title)}</title><link>{url}</link><guid isPermaLink="true">{url}</guid>'
+            if row.published_at:
+                yield f'<pubDate>{_rfc822(row.published_at)}</pubDate>'
+            yield f'<description>{escape(row.excerpt_text or row.excerpt or "")}</description></item>\n'
+        yield '</channel></rss>\n'
+    return chunks
@@ -1,4 +1,4 @@
-from flask import current_app, request, url_for
+from flask import current_app, request, url_for, flash
 from werkzeug.utils import secure_filename
 import os
 import re
@@ -167,12 +167,18 @@ def register_template_helpers(app):
         return None
     
     @app.template_global()
-    def url_for_other_page(page):
-        """Generate URL for pagination"""
+    def url_for_other_page(page=None, cursor=None, **extra):
+        """Generate URL for pagination (page number or keyset cursor)"""
         from flask import request, url_for
         args = request.view_args.copy()
         args.update(request.args.to_dict())
-        args['page'] = page
+        args.update(extra)
+        args.pop('page', None)
+        args.pop('cursor', None)
+        if cursor:
+            args['cursor'] = cursor
+        elif page is not None:
+            args['page'] = page
         return url_for(request.endpoint, **args)
     
     @app.template_global()
@@ -367,13 +373,36 @@ def save_uploaded_file(file, folder='covers'):
             
             filename = str(uuid.uuid4()) + '.' + extension
             
+            from app.core.images import is_image, validate_image, save_original, schedule_processing, ImageRejected
+            if is_image(filename):
+                # Reject bombs and broken files before anything is written
+                try:
+                    validate_image(file.stream, current_app.config.get('IMAGE_MAX_PIXELS', 40_000_000),
+                                   current_app.config.get('IMAGE_MAX_BYTES'))
+                except ImageRejected as e:
+                    flash(f'Gambar tidak dapat digunakan: {str(e)}', 'error')
+                    return None
+            
             # Create upload directory if it doesn't exist
             upload_path = os.path.join(current_app.config['UPLOAD_FOLDER'], folder)
             os.makedirs(upload_path, exist_ok=True)
             
-            # Save file
+            # Save file; images are re-encoded so their EXIF (GPS position,
+            # camera serial) never reaches the public uploads folder
             file_path = os.path.join(upload_path, filename)
-            file.save(file_path)
+            if is_image(filename):
+                try:
+                    save_original(file.stream, file_path, current_app.config.get('IMAGE_MAX_PIXELS', 40_000_000),
+                                  current_app.config.get('IMAGE_ORIGINAL_QUALITY', 90))
+                except ImageRejected as e:
+                    flash(f'Gambar tidak dapat digunakan: {str(e)}', 'error')
+                    return None
+            else:
+                file.save(file_path)
+            
+            if is_image(filename):
+                # Derivatives are made in the background; pages use the original until then
+                schedule_processing(f"{folder}/{filename}")
             
             return f"{folder}/{filename}"
     except Exception as e:
@@ -392,6 +421,10 @@ def delete_uploaded_file(filename):
         file_path = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
         if os.path.exists(file_path):
             os.remove(file_path)
+        
+        from app.core.images import is_image, delete_derivatives
+        if is_image(filename):
+            delete_derivatives(filename)
     except Exception as e:
         # Log the error but don't crash the application
         print(f"Error deleting file {filename}: {str(e)}")
@@ -0,0 +1,92 @@
+from functools import wraps
+from datetime import datetime, timezone
+from flask import current_app, request, session, make_response, g
+from flask_login import current_user
+from sqlalchemy.exc import DBAPIError, TimeoutError as PoolTimeoutError
+import hashlib
+
+def _as_utc(value):
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return datetime.fromtimestamp(int(value), timezone.utc)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.replace(microsecond=0)
+
+def _policy(private):
+    if private:
+        return current_app.config.get('STAFF_CACHE_CONTROL', 'private, no-cache')
+    return current_app.config.get('PUBLIC_CACHE_CONTROL', 'public, no-cache')
+
+def _not_modified(etag, last_modified):
+    if request.if_none_match:
+        # If-None-Match wins over If-Modified-Since when both are sent
+        return request.if_none_match.contains_weak(etag)
+    if request.if_modified_since and last_modified is not None:
+        return last_modified <= request.if_modified_since
+    return False
+
+def conditional(validators, private=False, on_not_modified=None):
+    """Answer If-None-Match/If-Modified-Since with 304 before the view renders.
+
+    ``validators`` is called with the view arguments and returns
+    ``(tokens, last_modified)`` describing everything the page depends on,
+    or None to let the view handle the request (e.g. a 404). The tokens are
+    hashed into a weak ETag together with the settings version, the query
+    string and, for ``private`` pages, the current user. ``on_not_modified``
+    gets ``g.page_cache_meta`` and the view arguments, like ``cache_page``'s
+    ``on_hit``. Responses get the route's Cache-Control policy.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if request.method not in ('GET', 'HEAD') or '_flashes' in session:
+                return f(*args, **kwargs)
+            if not private and current_user.is_authenticated:
+                # Staff see extra navigation on public pages; keep those uncached
+                response = make_response(f(*args, **kwargs))
+                response.headers['Cache-Control'] = 'private, no-cache'
+                return response
+
+            try:
+                state = validators(*args, **kwargs)
+                settings_version = current_app.extensions['settings_version']
+                version = settings_version.get()
+            except (DBAPIError, PoolTimeoutError, OSError) as e:
+                # Let the view (and the page cache's stale-if-error) deal with it
+                current_app.logger.warning(f'Skipping conditional request for {request.path}: {str(e)}')
+                from app import db
+                db.session.rollback()
+                return f(*args, **kwargs)
+            if state is None:
+                return f(*args, **kwargs)
+
+            tokens, last_modified = state
+            parts = [version, request.query_string.decode('utf-8', errors='ignore')]
+            parts += [str(token) for token in tokens]
+            if private:
+                parts.append(str(current_user.get_id()))
+            etag = hashlib.sha1('|'.join(parts).encode('utf-8')).hexdigest()
+            timestamps = [_as_utc(last_modified), _as_utc(settings_version.modified_at())]
+            last_modified = max([t for t in timestamps if t is not None], default=None)
+
+            if _not_modified(etag, last_modified):
+                if on_not_modified is not None:
+                    try:
+                        on_not_modified(g.get('page_cache_meta') or {}, **kwargs)
+                    except Exception as e:
+                        current_app.logger.warning(f'Not-modified callback failed: {str(e)}')
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag, weak=True)
+            if last_modified is not None:
+                response.last_modified = last_modified
+            response.headers['Cache-Control'] = _policy(private)
+            return response
+        return decorated_function
+    return decorator
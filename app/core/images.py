@@ -0,0 +1,306 @@
+from concurrent.futures import ProcessPoolExecutor
+from flask import current_app
+from markupsafe import Markup
+import json
+import multiprocessing
+import os
+
+# Cover images get fixed-width derivatives next to the original:
+# covers/<name>-card.jpg/.webp, -hero.jpg/.webp and a cropped -og.jpg for
+# link previews, plus covers/<name>.json listing what was written. Until the
+# manifest exists templates keep using the original.
+IMAGE_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
+IMAGE_FORMATS = ('JPEG', 'PNG', 'GIF', 'WEBP')
+EXTENSION_FORMATS = {'jpg': 'JPEG', 'jpeg': 'JPEG', 'png': 'PNG', 'gif': 'GIF', 'webp': 'WEBP'}
+DERIVATIVE_NAMES = ('card', 'hero', 'og')
+
+class ImageRejected(ValueError):
+    """Upload is not an image we are willing to decode"""
+
+def is_image(filename):
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in IMAGE_EXTENSIONS
+
+def _stem(filename):
+    return filename.rsplit('.', 1)[0]
+
+def derivative_name(filename, name, extension):
+    return f'{_stem(filename)}-{name}.{extension}'
+
+def manifest_name(filename):
+    return f'{_stem(filename)}.json'
+
+def is_derivative(filename):
+    """True for files the pipeline wrote (derivatives and manifests), not uploads"""
+    stem, _, extension = filename.rpartition('.')
+    return extension == 'json' or any(stem.endswith(f'-{name}') for name in DERIVATIVE_NAMES)
+
+# ---------------------------------------------------------------------------
+# Processing (runs in the image worker processes; no app context)
+# ---------------------------------------------------------------------------
+
+def _open(path, max_pixels):
+    """Open an image after checking its header, before any pixel is decoded"""
+    from PIL import Image
+    Image.MAX_IMAGE_PIXELS = max_pixels
+    try:
+        image = Image.open(path, formats=IMAGE_FORMATS)
+    except (Image.DecompressionBombError, OSError, SyntaxError) as e:
+        raise ImageRejected(f'Bukan gambar yang valid: {str(e)}')
+    if image.width * image.height > max_pixels:
+        image.close()
+        raise ImageRejected(f'Gambar terlalu besar ({image.width}x{image.height} piksel)')
+    return image
+
+def validate_image(stream, max_pixels, max_bytes=None):
+    """Check size, format, dimensions and integrity of an uploaded image stream"""
+    position = stream.tell()
+    stream.seek(0, os.SEEK_END)
+    size = stream.tell() - position
+    stream.seek(position)
+    if max_bytes and size > max_bytes:
+        raise ImageRejected(f'Ukuran gambar melebihi {max_bytes // (1024 * 1024)} MB')
+    try:
+        with _open(stream, max_pixels) as image:
+            image.verify()
+    except ImageRejected:
+        raise
+    except Exception as e:
+        raise ImageRejected(f'Gambar rusak: {str(e)}')
+    finally:
+        stream.seek(position)
+
+def _save(image, path, format, quality, **options):
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    options['quality'] = quality
+    if format == 'JPEG':
+        options.update(optimize=True, progressive=True)
+    elif format == 'WEBP':
+        options['method'] = 4
+    # No exif= argument: the metadata (GPS position, camera serial) is dropped
+    image.save(tmp_path, format, **options)
+    os.replace(tmp_path, path)
+
+def _flatten(image):
+    """RGB copy for JPEG; transparent areas become white"""
+    from PIL import Image
+    if image.mode == 'RGB':
+        return image
+    if image.mode in ('RGBA', 'LA', 'P'):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+def save_original(stream, path, max_pixels, quality=90):
+    """Write an uploaded image to path re-encoded, without its EXIF and other metadata.
+
+    The format follows the extension of path. Orientation is applied to the
+    pixels since the tag that carried it is dropped; animations keep their
+    frames.
+    """
+    from PIL import ImageOps
+    format = EXTENSION_FORMATS[path.rsplit('.', 1)[1].lower()]
+    with _open(stream, max_pixels) as image:
+        options = {}
+        if image.info.get('icc_profile'):
+            options['icc_profile'] = image.info['icc_profile']
+        if getattr(image, 'is_animated', False) and format in ('GIF', 'WEBP'):
+            # Saving every frame copies the first frame's metadata unless it is overridden
+            options.update(save_all=True, loop=image.info.get('loop', 0), comment=b'', exif=b'', xmp=b'')
+            _save(image, path, format, quality, **options)
+            return
+        try:
+            image = ImageOps.exif_transpose(image)
+        except (OSError, SyntaxError) as e:
+            raise ImageRejected(f'Gambar rusak: {str(e)}')
+        if format == 'JPEG':
+            image = _flatten(image)
+        elif image.mode == 'CMYK':
+            image = image.convert('RGB')
+        _save(image, path, format, quality, **options)
+
+def process_image(path, widths, og_size, max_pixels, quality=82):
+    """Write the derivatives and manifest of the image at path; returns the manifest"""
+    from PIL import Image, ImageOps
+    with _open(path, max_pixels) as image:
+        # JPEGs can be decoded at 1/2, 1/4 or 1/8 scale straight from the DCT
+        image.draft('RGB', (max(max(widths.values()), og_size[0]), og_size[1]))
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if image.mode in ('LA', 'PA') or 'transparency' in image.info else 'RGB')
+
+        directory = os.path.dirname(path)
+        filename = os.path.basename(path)
+        manifest = {'width': image.width, 'height': image.height, 'sizes': {}}
+        for name, width in widths.items():
+            # Never upscale; small originals get a same-size copy
+            width = min(width, image.width)
+            height = max(1, round(image.height * width / image.width))
+            resized = image.resize((width, height), Image.LANCZOS, reducing_gap=3.0)
+            _save(resized, os.path.join(directory, derivative_name(filename, name, 'webp')), 'WEBP', quality)
+            _save(_flatten(resized), os.path.join(directory, derivative_name(filename, name, 'jpg')), 'JPEG', quality)
+            manifest['sizes'][name] = width
+
+        og = ImageOps.fit(_flatten(image), og_size, Image.LANCZOS)
+        _save(og, os.path.join(directory, derivative_name(filename, 'og', 'jpg')), 'JPEG', quality)
+        manifest['og'] = list(og_size)
+
+    manifest_path = os.path.join(directory, manifest_name(filename))
+    tmp_path = f'{manifest_path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, manifest_path)
+    return manifest
+
+def _process_job(job):
+    """process_image for one file; returns (path, error or None)"""
+    path, widths, og_size, max_pixels, quality = job
+    try:
+        process_image(path, widths, og_size, max_pixels, quality)
+        return path, None
+    except Exception as e:
+        return path, str(e)
+
+# ---------------------------------------------------------------------------
+# App side
+# ---------------------------------------------------------------------------
+
+def _job(app, filename):
+    return (
+        os.path.join(app.config['UPLOAD_FOLDER'], filename),
+        app.config.get('IMAGE_WIDTHS', {'card': 480, 'hero': 1280}),
+        tuple(app.config.get('IMAGE_OG_SIZE', (1200, 630))),
+        app.config.get('IMAGE_MAX_PIXELS', 40_000_000),
+        app.config.get('IMAGE_QUALITY', 82)
+    )
+
+def _executor(app):
+    executor = app.extensions.get('image_executor')
+    if executor is None:
+        # Spawned, not forked: the web worker has threads of its own
+        executor = ProcessPoolExecutor(
+            max_workers=app.config.get('IMAGE_PROCESSES') or 2,
+            mp_context=multiprocessing.get_context('spawn')
+        )
+        app.extensions['image_executor'] = executor
+    return executor
+
+def schedule_processing(filename):
+    """Create the derivatives of an uploaded image without holding up the request"""
+    app = current_app._get_current_object()
+    job = _job(app, filename)
+    if not app.config.get('IMAGE_PROCESSING_ASYNC', True):
+        _, error = _process_job(job)
+        if error:
+            app.logger.error(f'Image processing failed for {filename}: {error}')
+        return
+
+    def done(future):
+        try:
+            _, error = future.result()
+        except Exception as e:
+            error = str(e)
+        if error:
+            app.logger.error(f'Image processing failed for {filename}: {error}')
+
+    _executor(app).submit(_process_job, job).add_done_callback(done)
+
+def reprocess_all(processes=None, force=False):
+    """Create derivatives for every uploaded image; returns (processed, failed)"""
+    app = current_app._get_current_object()
+    root = app.config['UPLOAD_FOLDER']
+    jobs = []
+    for directory, _dirs, files in os.walk(root):
+        for name in files:
+            if not is_image(name) or is_derivative(name):
+                continue
+            filename = os.path.relpath(os.path.join(directory, name), root)
+            if not force and os.path.exists(os.path.join(root, manifest_name(filename))):
+                continue
+            jobs.append(_job(app, filename))
+
+    processed = failed = 0
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        for path, error in executor.map(_process_job, jobs, chunksize=4):
+            if error:
+                failed += 1
+                app.logger.error(f'Image processing failed for {path}: {error}')
+            else:
+                processed += 1
+    return processed, failed
+
+def delete_derivatives(filename):
+    root = current_app.config['UPLOAD_FOLDER']
+    names = [manifest_name(filename)] + [derivative_name(filename, name, extension)
+                                         for name in DERIVATIVE_NAMES for extension in ('jpg', 'webp')]
+    for name in names:
+        try:
+            os.remove(os.path.join(root, name))
+        except OSError:
+            pass
+
+# ---------------------------------------------------------------------------
+# Templates
+# ---------------------------------------------------------------------------
+
+_manifests = {}
+
+def get_manifest(filename):
+    """Derivative manifest of an upload, or None while it is being processed"""
+    path = os.path.join(current_app.config['UPLOAD_FOLDER'], manifest_name(filename))
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+    cached = _manifests.get(path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    try:
+        with open(path) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    _manifests[path] = (mtime, manifest)
+    return manifest
+
+def _url(filename):
+    return f'/static/uploads/{filename}'
+
+def responsive_image(content, sizes='(max-width: 768px) 100vw, 33vw', css_class='', style='', alt=None,
+                     loading='lazy'):
+    """<picture> with WebP and JPEG srcsets of a content's cover image"""
+    filename = content.cover_image
+    if not filename:
+        return Markup('')
+    alt = content.title if alt is None else alt
+    attributes = Markup(' class="{}"').format(css_class) if css_class else Markup('')
+    if style:
+        attributes += Markup(' style="{}"').format(style)
+
+    manifest = get_manifest(filename)
+    if not manifest or not manifest.get('sizes'):
+        return Markup('<img src="{}" alt="{}" loading="{}"{}>').format(_url(filename), alt, loading, attributes)
+
+    widths = sorted(manifest['sizes'].items(), key=lambda item: item[1])
+    def srcset(extension):
+        return ', '.join(f'{_url(derivative_name(filename, name, extension))} {width}w' for name, width in widths)
+    smallest = derivative_name(filename, widths[0][0], 'jpg')
+    return Markup(
+        '<picture><source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" alt="{}" loading="{}"{}></picture>'
+    ).format(srcset('webp'), sizes, _url(smallest), srcset('jpg'), sizes, alt, loading, attributes)
+
+def og_image_url(content):
+    """Absolute-path URL of the 1200x630 link preview image, or the original"""
+    if not content.cover_image:
+        return None
+    manifest = get_manifest(content.cover_image)
+    if manifest and manifest.get('og'):
+        return _url(derivative_name(content.cover_image, 'og', 'jpg'))
+    return _url(content.cover_image)
+
+def init_images(app):
+    """Register the responsive image template helpers"""
+    app.add_template_global(responsive_image)
+    app.add_template_global(og_image_url)
@@ -0,0 +1,146 @@
+import re
+from sqlalchemy import event, inspect, text
+
+# Composite indexes for the hot queries are declared on the models
+# (__table_args__), so create_all builds them; `flask indexes-create` adds the
+# ones an existing database is missing. On PostgreSQL the user search, a
+# substring LIKE that no b-tree can serve, also gets trigram indexes.
+# `flask indexes-check` (and the query plan tests) EXPLAIN the key queries
+# and report any that fall back to a sequential scan.
+
+TRIGRAM_INDEXES = (
+    ('ix_users_username_trgm', 'users', 'username'),
+    ('ix_users_full_name_trgm', 'users', 'full_name'),
+    ('ix_users_email_trgm', 'users', 'email'),
+)
+
+def _create_trigram_indexes(connection, existing=()):
+    created = []
+    if connection.dialect.name != 'postgresql':
+        return created
+    connection.execute(text('CREATE EXTENSION IF NOT EXISTS pg_trgm'))
+    for name, table, column in TRIGRAM_INDEXES:
+        if name not in existing:
+            connection.execute(text(f'CREATE INDEX IF NOT EXISTS {name} ON {table} USING gin ({column} gin_trgm_ops)'))
+            created.append(name)
+    return created
+
+def _after_users_create(target, connection, **kwargs):
+    _create_trigram_indexes(connection)
+
+def ensure_indexes():
+    """Create the declared indexes an existing database lacks; returns their names"""
+    from app import db
+    created = []
+    with db.engine.begin() as connection:
+        inspector = inspect(connection)
+        for table in db.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {index['name'] for index in inspector.get_indexes(table.name)}
+            for index in sorted(table.indexes, key=lambda index: index.name):
+                if index.name not in existing:
+                    index.create(connection)
+                    created.append(index.name)
+            if table.name == 'users':
+                created += _create_trigram_indexes(connection, existing)
+    return created
+
+# ---------------------------------------------------------------------------
+# Query plans
+# ---------------------------------------------------------------------------
+
+def key_queries():
+    """{name: (statement, dialects it must use an index on, or None for all)} of the hot queries"""
+    from app import db
+    from app.models.content import Content
+    from app.models.audit import AuditLog
+    from app.models.user import User
+    newest = (Content.published_at.desc(), Content.id.desc())
+    return {
+        'public_latest': (db.select(Content.id).where(Content.status == 'published')
+                          .order_by(*newest).limit(10), None),
+        'category_page': (db.select(Content.id).where(Content.category_id == 1, Content.status == 'published')
+                          .order_by(*newest).limit(10), None),
+        'publisher_drafts': (db.select(Content.id).where(Content.author_id == 1, Content.status == 'draft')
+                             .order_by(Content.created_at.desc()).limit(10), None),
+        'review_history': (db.select(Content.id).where(Content.reviewer_id == 1)
+                           .order_by(Content.updated_at.desc()).limit(20), None),
+        'review_queue': (db.select(Content.id).where(Content.status == 'pending_review')
+                         .order_by(Content.created_at.asc(), Content.id.asc()).limit(10), None),
+        'staff_listing': (db.select(Content.id).order_by(Content.created_at.desc(), Content.id.desc())
+                          .limit(20), None),
+        'audit_by_action': (db.select(AuditLog.id).where(AuditLog.action == 'login')
+                            .order_by(AuditLog.created_at.desc(), AuditLog.id.desc()).limit(50), None),
+        'audit_listing': (db.select(AuditLog.id).order_by(AuditLog.created_at.desc(), AuditLog.id.desc())
+                          .limit(50), None),
+        # LIKE '%term%' only has an index to use on PostgreSQL (pg_trgm)
+        'user_search': (db.select(User.id).where(User.username.contains('desa')), ('postgresql',)),
+    }
+
+_SQLITE_SCAN = re.compile(r'^SCAN (\w+)(?: AS \w+)?$')
+PLAN_DIALECTS = ('postgresql', 'mysql', 'sqlite')
+
+def _plan_nodes(node):
+    yield node
+    for child in node.get('Plans', ()):
+        yield from _plan_nodes(child)
+
+def sequential_scans(statement, connection):
+    """Tables a statement reads with a full sequential scan on this connection's database.
+
+    On PostgreSQL sequential scans are disabled for the EXPLAIN, and on
+    MySQL/MariaDB the optimizer is told index lookups are cheap, so one only
+    shows up when no index can answer the query at all, whatever the table
+    size or statistics. Returns None on databases without a plan check.
+    """
+    compiled = statement.compile(dialect=connection.dialect)
+    params = compiled.construct_params()
+    if compiled.positional:
+        params = tuple(params[name] for name in compiled.positiontup)
+    dialect = connection.dialect.name
+    if dialect == 'sqlite':
+        rows = connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {compiled.string}', params).all()
+        return [match.group(1) for match in (_SQLITE_SCAN.match(row[-1]) for row in rows) if match]
+    if dialect == 'postgresql':
+        connection.exec_driver_sql('SET enable_seqscan = off')
+        try:
+            plan = connection.exec_driver_sql(f'EXPLAIN (FORMAT JSON) {compiled.string}', params).scalar()
+        finally:
+            connection.exec_driver_sql('RESET enable_seqscan')
+        return [node['Relation Name'] for node in _plan_nodes(plan[0]['Plan']) if node['Node Type'] == 'Seq Scan']
+    if dialect == 'mysql':
+        # MariaDB has no FORMAT=TRADITIONAL; MySQL 8.3+ may default to TREE without it
+        explain = 'EXPLAIN' if getattr(connection.dialect, 'is_mariadb', False) else 'EXPLAIN FORMAT=TRADITIONAL'
+        connection.exec_driver_sql('SET SESSION max_seeks_for_key = 1')
+        try:
+            rows = connection.exec_driver_sql(f'{explain} {compiled.string}', params).mappings().all()
+        finally:
+            connection.exec_driver_sql('SET SESSION max_seeks_for_key = DEFAULT')
+        # type ALL is a full table scan; 'index' walks an index in order and is fine with a LIMIT
+        return [row['table'] for row in rows if row['type'] == 'ALL']
+    return None
+
+def check_query_plans():
+    """{query name: [tables scanned sequentially]} of the key queries that miss an index.
+
+    None when the database is not one of PLAN_DIALECTS.
+    """
+    from app import db
+    problems = {}
+    with db.engine.connect() as connection:
+        if connection.dialect.name not in PLAN_DIALECTS:
+            return None
+        for name, (statement, dialects) in key_queries().items():
+            if dialects is not None and connection.dialect.name not in dialects:
+                continue
+            scans = sequential_scans(statement, connection)
+            if scans:
+                problems[name] = scans
+    return problems
+
+def init_indexes(app):
+    """Add the PostgreSQL trigram indexes whenever the users table is created"""
+    from app.models.user import User
+    if not event.contains(User.__table__, 'after_create', _after_users_create):
+        event.listen(User.__table__, 'after_create', _after_users_create)
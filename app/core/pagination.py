@@ -0,0 +1,235 @@
+from flask import current_app, request
+from itsdangerous import URLSafeSerializer, BadSignature
+from sqlalchemy import and_, or_
+from sqlalchemy.sql import operators
+from datetime import datetime
+import itertools
+import zlib
+
+class KeysetPage:
+    """One page of a keyset-paginated listing.
+
+    Templates use ``items``, ``has_prev``/``has_next`` and the opaque
+    ``prev_cursor``/``next_cursor`` tokens; ``total`` is only filled in when
+    the caller asked for it.
+    """
+
+    is_keyset = True
+
+    def __init__(self, items, per_page, prev_cursor=None, next_cursor=None, total=None, is_first=True):
+        self.items = items
+        self.is_first = is_first
+        self.per_page = per_page
+        self.prev_cursor = prev_cursor
+        self.next_cursor = next_cursor
+        self.total = total
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+class KeysetStream(KeysetPage):
+    """Forward keyset page read from a server-side cursor while the template renders.
+
+    ``items`` yields rows as they are fetched instead of holding the page in
+    memory; looping over it a second time runs the query again. The cursors
+    are only known once the rows have been read, so render the pagination
+    links after the list (reading them earlier reads the page first).
+    """
+
+    def __init__(self, query, per_page, make_token, total=None, is_first=True, batch_size=100,
+                 row_factory=None):
+        self._query = query
+        self._make_token = make_token
+        self._row_factory = row_factory or _first_column
+        self._batch_size = batch_size
+        self._reader = None
+        self._head = []
+        self._consumed = False
+        self._done = False
+        self._first = self._last = None
+        self._count = 0
+        self._more = False
+        self.is_first = is_first
+        self.per_page = per_page
+        self.total = total
+
+    @property
+    def items(self):
+        return self
+
+    @property
+    def prev_cursor(self):
+        self._finish()
+        if self.is_first or self._first is None:
+            return None
+        return self._make_token(self._first, 'p')
+
+    @property
+    def next_cursor(self):
+        self._finish()
+        return self._make_token(self._last, 'n') if self._more else None
+
+    def _read(self, track):
+        count = 0
+        # The query fetches one extra row that only tells whether a next page exists
+        for row in self._query.yield_per(self._batch_size):
+            count += 1
+            if count > self.per_page:
+                if track:
+                    self._more = True
+                continue
+            if track:
+                if self._first is None:
+                    self._first = row
+                self._last = row
+                self._count = count
+            yield self._row_factory(row)
+        if track:
+            self._done = True
+
+    def _start(self):
+        if self._reader is None:
+            self._reader = self._read(track=True)
+            self._head = list(itertools.islice(self._reader, 1))
+
+    def _finish(self):
+        self._start()
+        if not self._done:
+            self._consumed = True
+            self._head = []
+            for _ in self._reader:
+                pass
+
+    def __iter__(self):
+        self._start()
+        if self._consumed:
+            return self._read(track=False)
+        self._consumed = True
+        head, self._head = self._head, []
+        return itertools.chain(head, self._reader)
+
+    def __bool__(self):
+        self._start()
+        return self._first is not None
+
+    def __len__(self):
+        self._finish()
+        return self._count
+
+def _first_column(row):
+    return row[0]
+
+def _split(order):
+    """(column expression, descending) for an ``expr.asc()``/``expr.desc()`` clause"""
+    modifier = getattr(order, 'modifier', None)
+    if modifier is operators.desc_op:
+        return order.element, True
+    if modifier is operators.asc_op:
+        return order.element, False
+    return order, False
+
+def _encode(value):
+    if isinstance(value, datetime):
+        return {'dt': value.isoformat()}
+    return value
+
+def _decode(value):
+    if isinstance(value, dict) and 'dt' in value:
+        return datetime.fromisoformat(value['dt'])
+    return value
+
+def _serializer():
+    return URLSafeSerializer(current_app.config['SECRET_KEY'], salt='keyset-pagination')
+
+def _seek(keys, values, forward):
+    """WHERE clause selecting rows after (forward) or before the given key values"""
+    clauses = []
+    for i, (column, descending) in enumerate(keys):
+        after = (column < values[i]) if descending == forward else (column > values[i])
+        clauses.append(and_(*[keys[j][0] == values[j] for j in range(i)], after))
+    return or_(*clauses)
+
+def keyset_paginate(query, order_by, per_page=20, cursor=None, with_total=False, stream=False,
+                    row_factory=None, total=None):
+    """Paginate ``query`` by seeking on its sort keys instead of OFFSET.
+
+    ``order_by`` is a list of ``column.asc()``/``column.desc()`` clauses whose
+    last entry must be unique (usually the primary key); key columns must not
+    be NULL. ``cursor`` is a token from a previous page's
+    ``prev_cursor``/``next_cursor``; invalid or foreign tokens fall back to
+    the first page. ``with_total`` adds one COUNT query; a ``total`` known
+    without one (see app.core.totals) is passed through as is. With ``stream``,
+    forward pages are a ``KeysetStream`` whose rows are fetched while the
+    template renders. ``row_factory`` builds each item from its result row
+    (keyset columns last); by default the item is the row's first entity.
+    """
+    keys = [_split(order) for order in order_by]
+    row_factory = row_factory or _first_column
+    fingerprint = zlib.crc32(' '.join(str(order) for order in order_by).encode('utf-8'))
+    serializer = _serializer()
+
+    position = None
+    if cursor:
+        try:
+            token = serializer.loads(cursor)
+            if token.get('o') == fingerprint and len(token.get('k', [])) == len(keys):
+                position = ([_decode(value) for value in token['k']], token.get('d') == 'n')
+        except (BadSignature, AttributeError, TypeError, ValueError):
+            position = None
+
+    if with_total:
+        total = query.order_by(None).count()
+
+    forward = position is None or position[1]
+    ordering = [column.desc() if descending == forward else column.asc() for column, descending in keys]
+    page_query = query.order_by(None)\
+        .add_columns(*[column.label(f'_keyset_{i}') for i, (column, _) in enumerate(keys)])
+    if position is not None:
+        page_query = page_query.filter(_seek(keys, position[0], forward))
+    page_query = page_query.order_by(*ordering).limit(per_page + 1)
+
+    def token(row, direction):
+        values = [_encode(value) for value in row[len(row) - len(keys):]]
+        return serializer.dumps({'o': fingerprint, 'k': values, 'd': direction})
+
+    if stream and forward:
+        # Backward pages are read in reverse and flipped, so they can't stream
+        return KeysetStream(page_query, per_page, token, total, is_first=position is None,
+                            row_factory=row_factory)
+
+    rows = page_query.all()
+    more = len(rows) > per_page
+    rows = rows[:per_page]
+    if not forward:
+        rows.reverse()
+
+    prev_cursor = next_cursor = None
+    if rows:
+        if forward:
+            if more:
+                next_cursor = token(rows[-1], 'n')
+            if position is not None:
+                prev_cursor = token(rows[0], 'p')
+        else:
+            next_cursor = token(rows[-1], 'n')
+            if more:
+                prev_cursor = token(rows[0], 'p')
+
+    return KeysetPage([row_factory(row) for row in rows], per_page, prev_cursor, next_cursor, total,
+                      is_first=position is None)
+
+def get_per_page(default=20):
+    """Rows per page from the ``per_page`` argument, capped at LISTING_MAX_PER_PAGE"""
+    per_page = request.args.get('per_page', default, type=int)
+    return max(1, min(per_page, current_app.config.get('LISTING_MAX_PER_PAGE', 500)))
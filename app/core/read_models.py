@@ -0,0 +1,72 @@
+from collections import namedtuple
+
+# Staff listings and dashboards show a handful of columns per row. Instead of
+# full Content entities (body, metadata JSON and rendered HTML included) they
+# read column-only projections into these read-only rows, which templates use
+# like the entities: item.title, item.author.full_name, item.category.color.
+
+ROW_FIELDS = ('id', 'title', 'slug', 'status', 'excerpt', 'cover_image', 'youtube_url', 'view_count',
+              'word_count', 'review_comment', 'created_at', 'updated_at', 'published_at',
+              'author_id', 'category_id', 'reviewer_id')
+
+RoleName = namedtuple('RoleName', 'name')
+
+class PersonRow(namedtuple('PersonRow', 'id username full_name role')):
+    """Author or reviewer of a listed row; ``role`` is a RoleName or None"""
+    __slots__ = ()
+
+CategoryRow = namedtuple('CategoryRow', 'id name slug color')
+
+class ContentRow(namedtuple('ContentRow', ROW_FIELDS + ('author', 'category', 'reviewer'))):
+    """Read-only listing row of a Content item"""
+    __slots__ = ()
+
+    @classmethod
+    def from_row(cls, row):
+        """Build from a row of a project_content() query (extra trailing columns are ignored)"""
+        values = row[:len(ROW_FIELDS)]
+        (author_username, author_name, author_role, category_name, category_slug, category_color,
+         reviewer_username, reviewer_name) = row[len(ROW_FIELDS):len(ROW_FIELDS) + 8]
+        author_id, category_id, reviewer_id = values[-3:]
+        return cls(
+            *values,
+            author=PersonRow(author_id, author_username, author_name,
+                             RoleName(author_role) if author_role else None) if author_id else None,
+            category=CategoryRow(category_id, category_name, category_slug, category_color)
+                if category_id else None,
+            reviewer=PersonRow(reviewer_id, reviewer_username, reviewer_name, None) if reviewer_id else None
+        )
+
+_aliases = None
+
+def _get_aliases():
+    # Building an alias costs about a millisecond; make them once per process
+    global _aliases
+    if _aliases is None:
+        from sqlalchemy.orm import aliased
+        from app.models.content import Category
+        from app.models.user import User, Role
+        _aliases = (aliased(User, name='row_author'), aliased(Role, name='row_author_role'),
+                    aliased(User, name='row_reviewer'), aliased(Category, name='row_category'))
+    return _aliases
+
+def project_content(query):
+    """Turn a (filtered, sorted) Content query into a column-only query for ContentRow"""
+    from app.models.content import Content
+    author, role, reviewer, category = _get_aliases()
+    return query.with_entities(
+        *[getattr(Content, name) for name in ROW_FIELDS],
+        author.username, author.full_name, role.name,
+        category.name, category.slug, category.color,
+        reviewer.username, reviewer.full_name
+    ).outerjoin(author, Content.author_id == author.id)\
+        .outerjoin(role, author.role_id == role.id)\
+        .outerjoin(category, Content.category_id == category.id)\
+        .outerjoin(reviewer, Content.reviewer_id == reviewer.id)
+
+def content_rows(query, limit=None):
+    """[ContentRow] of a Content query, optionally only the first ``limit``"""
+    query = project_content(query)
+    if limit is not None:
+        query = query.limit(limit)
+    return [ContentRow.from_row(row) for row in query]
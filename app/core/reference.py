@@ -0,0 +1,223 @@
+from collections import namedtuple
+from collections.abc import Mapping
+from flask import current_app
+import os
+import threading
+
+# Small, rarely changing tables every page or form needs. Each worker keeps a
+# copy and reloads it when the shared reference version changes; the version
+# is bumped after commits that change settings, categories or users.
+
+DEFAULT_PUBLIC_SETTINGS = {
+    'site_name': 'Portal Desa Digital',
+    'site_description': 'Sistem Informasi dan Layanan Desa',
+    'contact_email': 'info@desa.go.id',
+    'contact_phone': '021-12345678',
+    'address': 'Jl. Raya Desa No. 123'
+}
+
+STAFF_ROLES = ('admin', 'editor', 'publisher')
+
+class CategoryRef(namedtuple('CategoryRef', 'id name slug description color sort_order')):
+    """Read-only snapshot of an active category"""
+    __slots__ = ()
+
+    @property
+    def published_count(self):
+        return get_category_counts().get(self.id, 0)
+
+RoleRef = namedtuple('RoleRef', 'id name description permissions is_active')
+AuthorRef = namedtuple('AuthorRef', 'id username full_name role_name')
+
+class ReferenceCache:
+    """Per-worker cache of reference data, keyed by a version token"""
+
+    def __init__(self, app):
+        self._entries = {}
+        self._lock = threading.Lock()
+        app.extensions['reference_data'] = self
+
+    def get(self, name, version, loader):
+        entry = self._entries.get(name)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is not None and entry[0] == version:
+                return entry[1]
+            value = loader()
+            self._entries[name] = (version, value)
+            return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+def get_reference_version():
+    """Shared reference data version"""
+    return current_app.extensions['reference_version'].get()
+
+def bump_reference_version():
+    """Make every worker reload reference data; call after the change is committed"""
+    return current_app.extensions['reference_version'].bump()
+
+def _cached(name, loader, version=None):
+    return current_app.extensions['reference_data'].get(
+        name, version if version is not None else get_reference_version(), loader
+    )
+
+# ---------------------------------------------------------------------------
+# Loaders
+# ---------------------------------------------------------------------------
+
+def _load_settings():
+    from app.models.setting import Setting
+    return {setting.key: (Setting.parse_value(setting.value, setting.type), setting.is_public)
+            for setting in Setting.query.all()}
+
+def _load_categories():
+    from app.models.content import Category
+    categories = Category.query.filter_by(is_active=True).order_by(Category.sort_order, Category.name).all()
+    return [CategoryRef(c.id, c.name, c.slug, c.description, c.color, c.sort_order) for c in categories]
+
+def _load_category_counts():
+    from app.core.counters import get_counts
+    return get_counts(('category', None)).by_key('category', status='published')
+
+def _load_roles():
+    from app.models.user import Role
+    return [RoleRef(r.id, r.name, r.description, r.permissions or {}, bool(r.is_active))
+            for r in Role.query.order_by(Role.id).all()]
+
+def _load_authors():
+    from app import db
+    from app.models.user import User, Role
+    rows = db.session.query(User.id, User.username, User.full_name, Role.name)\
+        .join(Role, User.role_id == Role.id)\
+        .filter(Role.name.in_(STAFF_ROLES))\
+        .order_by(User.full_name, User.id).all()
+    return [AuthorRef(*row) for row in rows]
+
+# ---------------------------------------------------------------------------
+# Accessors
+# ---------------------------------------------------------------------------
+
+def get_settings():
+    """{key: value} of all settings, loaded with one query"""
+    return {key: value for key, (value, _public) in _cached('settings', _load_settings).items()}
+
+def get_public_settings():
+    """{key: value} of public settings; defaults while the database is not set up"""
+    try:
+        settings = _cached('settings', _load_settings)
+    except Exception:
+        from app import db
+        db.session.rollback()
+        return dict(DEFAULT_PUBLIC_SETTINGS)
+    return {key: value for key, (value, public) in settings.items() if public}
+
+def get_nav_categories():
+    """Active categories ordered for navigation"""
+    return _cached('categories', _load_categories)
+
+def _template_nav_categories():
+    try:
+        return get_nav_categories()
+    except Exception:
+        from app import db
+        db.session.rollback()
+        return []
+
+def get_category_counts():
+    """{category id: published content count}; follows the content version instead"""
+    from app.core.cache import get_content_version
+    return _cached('category_counts', _load_category_counts, version=get_content_version())
+
+def get_roles(active_only=False):
+    roles = _cached('roles', _load_roles)
+    return [role for role in roles if role.is_active] if active_only else roles
+
+def get_authors():
+    """Staff who can author content, ordered by name"""
+    return _cached('authors', _load_authors)
+
+# ---------------------------------------------------------------------------
+# Lazy template values
+# ---------------------------------------------------------------------------
+
+class LazyDict(Mapping):
+    """Mapping loaded on first use, so templates that never read it cost nothing"""
+
+    def __init__(self, loader):
+        self._loader = loader
+        self._value = None
+
+    def _load(self):
+        if self._value is None:
+            self._value = dict(self._loader())
+        return self._value
+
+    def __getitem__(self, key):
+        return self._load()[key]
+
+    def __iter__(self):
+        return iter(self._load())
+
+    def __len__(self):
+        return len(self._load())
+
+class LazyList:
+    """Sequence loaded on first use"""
+
+    def __init__(self, loader):
+        self._loader = loader
+        self._value = None
+
+    def _load(self):
+        if self._value is None:
+            self._value = list(self._loader())
+        return self._value
+
+    def __iter__(self):
+        return iter(self._load())
+
+    def __len__(self):
+        return len(self._load())
+
+    def __getitem__(self, index):
+        return self._load()[index]
+
+    def __bool__(self):
+        return bool(self._load())
+
+def _on_public_content_changed(sender, content_ids=(), settings_changed=False, **kwargs):
+    # Settings and category changes are the events without content ids
+    if sender is not None and (settings_changed or not content_ids):
+        sender.extensions['reference_version'].bump()
+
+def init_reference(app):
+    """Set up the reference data cache and its template values"""
+    from app.core.cache import ContentVersion
+    from app.core.signals import public_content_changed
+    ReferenceCache(app)
+    app.extensions['reference_version'] = ContentVersion(
+        os.path.join(app.config['CACHE_DIR'], 'reference_version')
+    )
+    public_content_changed.connect(_on_public_content_changed, weak=False)
+
+    # Let the tojson filter serialize lazy values
+    json_default = app.json.default
+    def default(value):
+        if isinstance(value, LazyDict):
+            return value._load()
+        if isinstance(value, LazyList):
+            return value._load()
+        return json_default(value)
+    app.json.default = default
+
+    @app.context_processor
+    def inject_reference_data():
+        return {
+            'site_settings': LazyDict(get_public_settings),
+            'nav_categories': LazyList(_template_nav_categories)
+        }
@@ -0,0 +1,265 @@
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from collections import Counter, defaultdict
+from datetime import datetime
+import hashlib
+import heapq
+import operator
+import random
+import struct
+import zlib
+
+from app.core.search import analyze
+
+# MinHash with NUM_HASHES permutations split into BANDS bands of ROWS rows:
+# two articles become candidates when any band matches, which happens with
+# probability 1 - (1 - J^ROWS)^BANDS for Jaccard similarity J (~50% at J=0.18).
+NUM_HASHES = 64
+BANDS = 32
+ROWS = NUM_HASHES // BANDS
+TOP_K = 6
+MIN_SCORE = 0.05
+MAX_BUCKET_SIZE = 500
+MAX_CANDIDATES = 200
+
+_PRIME = (1 << 61) - 1
+_rng = random.Random(8017)
+_COEFFICIENTS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_HASHES)]
+_SIGNATURE_FORMAT = f'<{NUM_HASHES}I'
+
+def _token_hash(token):
+    return int.from_bytes(hashlib.blake2b(token.encode('utf-8'), digest_size=8).digest(), 'little')
+
+def signature(title, excerpt, body):
+    """MinHash signature (tuple of NUM_HASHES ints) of an article's analyzed word set"""
+    tokens = {_token_hash(token) for token in analyze(' '.join(filter(None, [title, excerpt, body])))}
+    if not tokens:
+        return None
+    return tuple(min([(a * x + b) % _PRIME for x in tokens]) & 0xFFFFFFFF for a, b in _COEFFICIENTS)
+
+def _signature_row(row):
+    content_id, title, excerpt, body = row
+    return content_id, signature(title, excerpt, body)
+
+def bands(sig):
+    """[(band, bucket)] of a signature"""
+    return [(band, zlib.crc32(struct.pack(f'<{ROWS}I', *sig[band * ROWS:(band + 1) * ROWS])) & 0x7FFFFFFF)
+            for band in range(BANDS)]
+
+def similarity(first, second):
+    """Estimated Jaccard similarity of two signatures"""
+    return sum(map(operator.eq, first, second)) / NUM_HASHES
+
+def pack(sig):
+    return struct.pack(_SIGNATURE_FORMAT, *sig)
+
+def unpack(data):
+    return struct.unpack(_SIGNATURE_FORMAT, data)
+
+def _tables():
+    from app.models.content import Content
+    from app.models.related import RelatedContent, ContentSignature, ContentLshBand
+    return (Content.__table__, RelatedContent.__table__,
+            ContentSignature.__table__, ContentLshBand.__table__)
+
+def _neighbours(content_id, sig, candidates, top_k=TOP_K):
+    """Top-k (score, id) among {id: signature} candidates"""
+    scored = [(similarity(sig, other), other_id) for other_id, other in candidates.items()
+              if other_id != content_id]
+    return heapq.nlargest(top_k, [item for item in scored if item[0] >= MIN_SCORE])
+
+def _related_rows(content_id, neighbours, now):
+    return [{'content_id': content_id, 'rank': rank, 'related_id': related_id,
+             'score': score, 'computed_at': now}
+            for rank, (score, related_id) in enumerate(neighbours)]
+
+# ---------------------------------------------------------------------------
+# Batch job
+# ---------------------------------------------------------------------------
+
+def rebuild_related(batch_size=1000, processes=None, top_k=TOP_K):
+    """Recompute signatures and neighbour lists of all published content"""
+    from app import db
+    content, related, signatures, lsh_bands = _tables()
+
+    with db.engine.connect() as connection:
+        rows = [tuple(row) for row in connection.execute(
+            db.select(content.c.id, content.c.title, content.c.excerpt, content.c.content)
+            .where(content.c.status == 'published').order_by(content.c.id)
+        )]
+
+    # MinHash is CPU bound pure Python, so fan it out over processes
+    if processes == 1 or len(rows) < batch_size:
+        computed = list(map(_signature_row, rows))
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            computed = list(executor.map(_signature_row, rows, chunksize=max(1, batch_size // 4)))
+    sigs = {content_id: sig for content_id, sig in computed if sig is not None}
+    del rows, computed
+
+    buckets = defaultdict(list)
+    for content_id, sig in sigs.items():
+        for key in bands(sig):
+            buckets[key].append(content_id)
+
+    now = datetime.utcnow()
+    with db.engine.begin() as connection:
+        connection.execute(related.delete())
+        connection.execute(lsh_bands.delete())
+        connection.execute(signatures.delete())
+
+        ids = sorted(sigs)
+        for start in range(0, len(ids), batch_size):
+            chunk = ids[start:start + batch_size]
+            connection.execute(signatures.insert(),
+                               [{'content_id': i, 'signature': pack(sigs[i])} for i in chunk])
+            connection.execute(lsh_bands.insert(),
+                               [{'band': band, 'bucket': bucket, 'content_id': i}
+                                for i in chunk for band, bucket in bands(sigs[i])])
+            related_rows = []
+            for content_id in chunk:
+                # Articles sharing more bands are more similar; only score the best of them
+                shared = Counter()
+                for key in bands(sigs[content_id]):
+                    members = buckets[key]
+                    if len(members) <= MAX_BUCKET_SIZE:
+                        shared.update(members)
+                candidates = [i for i, _ in shared.most_common(MAX_CANDIDATES + 1)]
+                neighbours = _neighbours(content_id, sigs[content_id],
+                                         {i: sigs[i] for i in candidates}, top_k)
+                related_rows += _related_rows(content_id, neighbours, now)
+            if related_rows:
+                connection.execute(related.insert(), related_rows)
+    return len(sigs)
+
+# ---------------------------------------------------------------------------
+# Incremental updates
+# ---------------------------------------------------------------------------
+
+def _candidate_signatures(connection, content_id):
+    from app import db
+    _content, _related, signatures, lsh_bands = _tables()
+    own = lsh_bands.alias('own')
+    other = lsh_bands.alias('other')
+    shared = db.func.count().label('shared')
+    candidate_ids = connection.execute(
+        db.select(other.c.content_id)
+        .join(own, db.and_(own.c.band == other.c.band, own.c.bucket == other.c.bucket))
+        .where(own.c.content_id == content_id, other.c.content_id != content_id)
+        .group_by(other.c.content_id)
+        .order_by(shared.desc())
+        .limit(MAX_CANDIDATES)
+    ).scalars().all()
+    if not candidate_ids:
+        return {}
+    rows = connection.execute(
+        db.select(signatures.c.content_id, signatures.c.signature)
+        .where(signatures.c.content_id.in_(candidate_ids))
+    )
+    return {row.content_id: unpack(row.signature) for row in rows}
+
+def _recompute(connection, content_id, sig, top_k, now):
+    _content, related, _signatures, _bands = _tables()
+    neighbours = _neighbours(content_id, sig, _candidate_signatures(connection, content_id), top_k)
+    connection.execute(related.delete().where(related.c.content_id == content_id))
+    rows = _related_rows(content_id, neighbours, now)
+    if rows:
+        connection.execute(related.insert(), rows)
+
+def update_related(content_ids, top_k=TOP_K):
+    """Refresh the given articles and only those neighbour lists they can affect"""
+    from app import db
+    content, related, signatures, lsh_bands = _tables()
+    content_ids = set(content_ids)
+    if not content_ids:
+        return 0
+    now = datetime.utcnow()
+
+    with db.engine.begin() as connection:
+        # Lists that pointed at a changed article may lose or reorder it
+        affected = set(connection.execute(
+            db.select(related.c.content_id).where(related.c.related_id.in_(content_ids))
+        ).scalars())
+        connection.execute(lsh_bands.delete().where(lsh_bands.c.content_id.in_(content_ids)))
+        connection.execute(signatures.delete().where(signatures.c.content_id.in_(content_ids)))
+        connection.execute(related.delete().where(related.c.content_id.in_(content_ids)))
+
+        rows = connection.execute(
+            db.select(content.c.id, content.c.title, content.c.excerpt, content.c.content)
+            .where(content.c.id.in_(content_ids), content.c.status == 'published')
+        ).all()
+        sigs = {}
+        for row in rows:
+            sig = signature(row.title, row.excerpt, row.content)
+            if sig is None:
+                continue
+            sigs[row.id] = sig
+            connection.execute(signatures.insert(), {'content_id': row.id, 'signature': pack(sig)})
+            connection.execute(lsh_bands.insert(), [{'band': band, 'bucket': bucket, 'content_id': row.id}
+                                                    for band, bucket in bands(sig)])
+
+        for content_id, sig in sigs.items():
+            candidates = _candidate_signatures(connection, content_id)
+            neighbours = _neighbours(content_id, sig, candidates, top_k)
+            rows = _related_rows(content_id, neighbours, now)
+            if rows:
+                connection.execute(related.insert(), rows)
+
+            # A candidate's list changes only if the new score beats its current k-th entry
+            scores = {other_id: similarity(sig, other) for other_id, other in candidates.items()}
+            lists = connection.execute(
+                db.select(related.c.content_id, db.func.count(), db.func.min(related.c.score))
+                .where(related.c.content_id.in_(list(scores)))
+                .group_by(related.c.content_id)
+            ).all()
+            current = {row[0]: (row[1], row[2]) for row in lists}
+            for other_id, score in scores.items():
+                if score < MIN_SCORE:
+                    continue
+                count, lowest = current.get(other_id, (0, 0.0))
+                if count < top_k or score > lowest:
+                    affected.add(other_id)
+
+        affected -= content_ids
+        if affected:
+            stored = connection.execute(
+                db.select(signatures.c.content_id, signatures.c.signature)
+                .where(signatures.c.content_id.in_(affected))
+            ).all()
+            found = {row.content_id for row in stored}
+            for row in stored:
+                _recompute(connection, row.content_id, unpack(row.signature), top_k, now)
+            # Lists of articles without a signature (no longer published) are just cleared
+            stale = affected - found
+            if stale:
+                connection.execute(related.delete().where(related.c.content_id.in_(stale)))
+    return len(affected) + len(content_ids)
+
+def _on_public_content_changed(sender, content_ids=(), **kwargs):
+    if sender is None or not content_ids:
+        return
+    content_ids = set(content_ids)
+
+    def run():
+        with sender.app_context():
+            try:
+                update_related(content_ids)
+            except Exception as e:
+                sender.logger.error(f'Related content update failed: {str(e)}')
+                return
+            # Pages cached since the change was committed still show the old lists
+            if 'content_version' in sender.extensions:
+                sender.extensions['content_version'].bump()
+
+    if sender.config.get('RELATED_CONTENT_ASYNC', True):
+        # Off the request thread; a single worker keeps updates ordered
+        sender.extensions['related_content_executor'].submit(run)
+    else:
+        run()
+
+def init_related(app):
+    """Keep related content lists up to date when public content changes"""
+    from app.core.signals import public_content_changed
+    app.extensions['related_content_executor'] = ThreadPoolExecutor(
+        max_workers=1, thread_name_prefix='related-content'
+    )
+    public_content_changed.connect(_on_public_content_changed, weak=False)
@@ -0,0 +1,172 @@
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+import hashlib
+import html
+import math
+import re
+
+# Values templates used to derive from Content on every page view are worked
+# out once when content is saved and stored next to it, keyed by a hash of the
+# inputs. Bump RENDER_VERSION when the sanitizer rules or any derived field
+# change, then run `flask rerender`; until then stale rows are rendered on the
+# fly instead of being served from their stored copy.
+RENDER_VERSION = 1
+EXCERPT_WORDS = 50
+WORDS_PER_MINUTE = 200
+
+_IMG_TAG = re.compile(r'<img(?![^>]*\sloading=)', re.IGNORECASE)
+_TAG = re.compile(r'<[^>]+>')
+_SPACE = re.compile(r'\s+')
+
+class Rendered(namedtuple('Rendered', 'body_html excerpt_text word_count reading_time youtube_id')):
+    """Output of the render pipeline for one content item"""
+    __slots__ = ()
+
+    @property
+    def youtube_embed_url(self):
+        return f'https://www.youtube.com/embed/{self.youtube_id}' if self.youtube_id else None
+
+_cleaner = None
+
+def _get_cleaner():
+    # Building a Cleaner compiles the html5lib filters; keep one per process
+    global _cleaner
+    if _cleaner is None:
+        import bleach
+        from app.core.security import SecurityManager
+        _cleaner = bleach.Cleaner(tags=SecurityManager.ALLOWED_TAGS,
+                                  attributes=SecurityManager.ALLOWED_ATTRIBUTES, strip=True)
+    return _cleaner
+
+def render_hash(body, excerpt, youtube_url):
+    """Hash of everything the rendered fields depend on"""
+    key = '\0'.join([str(RENDER_VERSION), body or '', excerpt or '', youtube_url or ''])
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+def _plain_text(value):
+    return _SPACE.sub(' ', html.unescape(_TAG.sub(' ', value or ''))).strip()
+
+def render_fields(body, excerpt, youtube_url):
+    """Run the pipeline on raw field values; needs no app context"""
+    from app.core.security import SecurityManager
+    body_html = _get_cleaner().clean(body or '')
+    # Images in the article body load only when scrolled into view
+    body_html = _IMG_TAG.sub('<img loading="lazy" decoding="async"', body_html)
+
+    words = _plain_text(body_html).split()
+    excerpt_text = _plain_text(excerpt)
+    if not excerpt_text:
+        excerpt_text = ' '.join(words[:EXCERPT_WORDS]) + ('...' if len(words) > EXCERPT_WORDS else '')
+
+    return Rendered(
+        body_html=body_html,
+        excerpt_text=excerpt_text,
+        word_count=len(words),
+        reading_time=max(1, math.ceil(len(words) / WORDS_PER_MINUTE)),
+        youtube_id=SecurityManager.extract_youtube_id(youtube_url) if youtube_url else None
+    )
+
+def render_content(content, force=False):
+    """Refresh the stored render of a Content before it is saved; returns True if it changed"""
+    digest = render_hash(content.content, content.excerpt, content.youtube_url)
+    if content.render_hash == digest and not force:
+        return False
+    for name, value in render_fields(content.content, content.excerpt, content.youtube_url)._asdict().items():
+        setattr(content, name, value)
+    content.render_hash = digest
+    return True
+
+def get_rendered(content):
+    """Stored render of a Content, or a fresh one when it is missing or stale"""
+    inputs = (content.content, content.excerpt, content.youtube_url)
+    cached = content.__dict__.get('_rendered')
+    if cached is not None and all(a is b for a, b in zip(cached[0], inputs)):
+        return cached[1]
+
+    if content.render_hash == render_hash(*inputs):
+        rendered = Rendered(content.body_html, content.excerpt_text, content.word_count,
+                            content.reading_time, content.youtube_id)
+    else:
+        rendered = render_fields(*inputs)
+    content.__dict__['_rendered'] = (inputs, rendered)
+    return rendered
+
+# ---------------------------------------------------------------------------
+# Batch job
+# ---------------------------------------------------------------------------
+
+def _render_row(row):
+    content_id, body, excerpt, youtube_url, stored_hash, force = row
+    digest = render_hash(body, excerpt, youtube_url)
+    if stored_hash == digest and not force:
+        return None
+    return dict(render_fields(body, excerpt, youtube_url)._asdict(), _id=content_id, render_hash=digest)
+
+def ensure_render_columns(connection):
+    """Add the render columns to a content table created before they existed"""
+    from sqlalchemy import inspect
+    from app.models.content import Content
+    existing = {column['name'] for column in inspect(connection).get_columns('content')}
+    preparer = connection.dialect.identifier_preparer
+    for name in ('body_html', 'excerpt_text', 'word_count', 'reading_time', 'youtube_id', 'render_hash'):
+        if name not in existing:
+            column = Content.__table__.c[name]
+            connection.exec_driver_sql(
+                f'ALTER TABLE content ADD COLUMN {preparer.quote(name)} '
+                f'{column.type.compile(dialect=connection.dialect)}'
+            )
+
+def rerender_all(batch_size=500, processes=None, force=False):
+    """Re-run the pipeline over all content whose stored render is stale; returns rows updated"""
+    from flask import current_app
+    from app import db
+    from app.core.signals import public_content_changed
+    content = db.Model.metadata.tables['content']
+
+    with db.engine.begin() as connection:
+        ensure_render_columns(connection)
+
+    updated = 0
+    published = set()
+    last_id = 0
+    executor = ProcessPoolExecutor(max_workers=processes) if processes != 1 else None
+    try:
+        while True:
+            with db.engine.connect() as connection:
+                rows = connection.execute(
+                    db.select(content.c.id, content.c.content, content.c.excerpt, content.c.youtube_url,
+                              content.c.render_hash, content.c.status)
+                    .where(content.c.id > last_id).order_by(content.c.id).limit(batch_size)
+                ).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+            jobs = [(row.id, row.content, row.excerpt, row.youtube_url, row.render_hash, force) for row in rows]
+            # bleach is pure Python and CPU bound, so fan it out over processes
+            if executor is None:
+                results = map(_render_row, jobs)
+            else:
+                results = executor.map(_render_row, jobs, chunksize=max(1, batch_size // 16))
+            values = [result for result in results if result is not None]
+            if not values:
+                continue
+
+            with db.engine.begin() as connection:
+                # Keep updated_at: the editorial content did not change
+                connection.execute(
+                    content.update().where(content.c.id == db.bindparam('_id'))
+                    .values(updated_at=content.c.updated_at),
+                    values
+                )
+            updated += len(values)
+            statuses = {row.id: row.status for row in rows}
+            published.update(value['_id'] for value in values if statuses[value['_id']] == 'published')
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    if published:
+        # Drop cached and pre-rendered pages that embed the old body
+        public_content_changed.send(current_app._get_current_object(),
+                                    content_ids=published, settings_changed=False)
+    return updated
@@ -0,0 +1,278 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+from sqlalchemy import event, inspect, func, cast, String
+
+# Daily aggregates behind the analytics pages: content created, published and
+# rejected per category and author, reviews per reviewer, and views per
+# content item. Mapper events on Content add to them in the flush's own
+# transaction and the view counter adds its batches when it flushes, so the
+# pages only run range queries over these small tables. Days are UTC, like
+# the timestamps on content. `flask rollups-backfill` rebuilds the history.
+STAT_VALUES = ('created', 'published', 'rejected')
+REVIEW_VALUES = ('published', 'rejected')
+
+_BUCKET_FORMATS = {
+    'day': ('%Y-%m-%d', 'YYYY-MM-DD', 10),
+    'month': ('%Y-%m', 'YYYY-MM', 7),
+    'year': ('%Y', 'YYYY', 4),
+}
+
+def time_bucket(column, unit='month', dialect=None):
+    """Date or datetime expression truncated to its day, month or year as sortable text.
+
+    MySQL's date_format does not exist on PostgreSQL or SQLite, so pick the
+    equivalent function of the dialect in use.
+    """
+    from app import db
+    strftime_format, pg_format, length = _BUCKET_FORMATS[unit]
+    dialect = dialect or db.engine.dialect.name
+    if dialect == 'postgresql':
+        return func.to_char(column, pg_format)
+    if dialect in ('mysql', 'mariadb'):
+        return func.date_format(column, strftime_format)
+    if dialect == 'sqlite':
+        return func.strftime(strftime_format, column)
+    # ISO formatted dates start with the bucket
+    return func.substr(cast(column, String), 1, length)
+
+def _tables():
+    from app.models.rollup import DailyContentStat, DailyReviewStat, DailyContentViews
+    return DailyContentStat.__table__, DailyReviewStat.__table__, DailyContentViews.__table__
+
+def _day(value):
+    return (value or datetime.utcnow()).date()
+
+class _Deltas:
+    """Rollup increments collected before they are written"""
+
+    def __init__(self):
+        self.stats = defaultdict(lambda: dict.fromkeys(STAT_VALUES, 0))
+        self.reviews = defaultdict(lambda: dict.fromkeys(REVIEW_VALUES, 0))
+        self.views = defaultdict(int)
+
+    def add_status(self, status, day, category_id, author_id, reviewer_id):
+        if status not in REVIEW_VALUES:
+            return
+        self.stats[(day, category_id or 0, author_id)][status] += 1
+        if reviewer_id is not None:
+            self.reviews[(day, reviewer_id)][status] += 1
+
+    def write(self, connection):
+        from app.core.counters import increment_rows
+        stats, reviews, views = _tables()
+        increment_rows(connection, stats, ('day', 'category_id', 'author_id'), [
+            dict(values, day=day, category_id=category_id, author_id=author_id)
+            for (day, category_id, author_id), values in self.stats.items()
+        ])
+        increment_rows(connection, reviews, ('day', 'reviewer_id'), [
+            dict(values, day=day, reviewer_id=reviewer_id)
+            for (day, reviewer_id), values in self.reviews.items()
+        ])
+        increment_rows(connection, views, ('day', 'content_id'), [
+            {'day': day, 'content_id': content_id, 'views': count}
+            for (day, content_id), count in self.views.items() if count
+        ])
+
+def _status_day(target):
+    return _day(target.published_at) if target.status == 'published' else _day(None)
+
+def _after_insert(mapper, connection, target):
+    deltas = _Deltas()
+    deltas.stats[(_day(target.created_at), target.category_id or 0, target.author_id)]['created'] += 1
+    deltas.add_status(target.status, _status_day(target), target.category_id, target.author_id, target.reviewer_id)
+    deltas.write(connection)
+
+def _after_update(mapper, connection, target):
+    state = inspect(target)
+    status, reviewer = state.attrs.status.history, state.attrs.reviewer_id.history
+    deltas = _Deltas()
+    if status.deleted and status.deleted[0] != target.status:
+        deltas.add_status(target.status, _status_day(target), target.category_id, target.author_id,
+                          target.reviewer_id)
+    elif reviewer.deleted == [None] and target.reviewer_id is not None and target.status in REVIEW_VALUES:
+        # The reviewer was assigned in a later flush than the status change
+        deltas.reviews[(_status_day(target), target.reviewer_id)][target.status] += 1
+    deltas.write(connection)
+
+def _keep_history(target, value, oldvalue, initiator):
+    return value
+
+def record_daily_views(connection, views, day=None):
+    """Add {content id: views} to today's view rollup on the given connection"""
+    deltas = _Deltas()
+    day = day or _day(None)
+    for content_id, count in views.items():
+        deltas.views[(day, content_id)] += count
+    deltas.write(connection)
+
+def record_status_changes(connection, changes, day=None):
+    """Add [(status, category id, author id, reviewer id)] set outside the ORM to today's rollups"""
+    deltas = _Deltas()
+    day = day or _day(None)
+    for status, category_id, author_id, reviewer_id in changes:
+        deltas.add_status(status, day, category_id, author_id, reviewer_id)
+    deltas.write(connection)
+
+def _register_events():
+    from app.models.content import Content
+    if event.contains(Content, 'after_insert', _after_insert):
+        return
+    event.listen(Content, 'after_insert', _after_insert)
+    event.listen(Content, 'after_update', _after_update)
+    # Load the previous values when they are assigned on an expired object
+    event.listen(Content.status, 'set', _keep_history, active_history=True)
+    event.listen(Content.reviewer_id, 'set', _keep_history, active_history=True)
+
+# ---------------------------------------------------------------------------
+# Reading
+# ---------------------------------------------------------------------------
+
+def get_analytics_days():
+    """Range of the analytics pages from ?days=, limited to ANALYTICS_RANGES"""
+    from flask import current_app, request
+    ranges = current_app.config.get('ANALYTICS_RANGES', (7, 30, 90, 365))
+    days = request.args.get('days', ranges[-1], type=int)
+    return days if days in ranges else ranges[-1]
+
+def get_since(days):
+    """First day of a range of ``days`` days ending today"""
+    return _day(None) - timedelta(days=max(1, days) - 1)
+
+def get_created_by_month(since, author_id=None):
+    """[(YYYY-MM, content created)] from ``since`` on"""
+    from app import db
+    stats, _, _ = _tables()
+    month = time_bucket(stats.c.day, 'month').label('month')
+    query = db.select(month, func.sum(stats.c.created)).where(stats.c.day >= since)
+    if author_id is not None:
+        query = query.where(stats.c.author_id == author_id)
+    return [tuple(row) for row in db.session.execute(query.group_by(month).order_by(month))]
+
+def _views_by(column, since, author_id=None):
+    from app import db
+    from app.models.content import Content
+    _, _, views = _tables()
+    query = db.select(column, func.sum(views.c.views))\
+        .join(Content.__table__, Content.__table__.c.id == views.c.content_id)\
+        .where(views.c.day >= since)
+    if author_id is not None:
+        query = query.where(Content.__table__.c.author_id == author_id)
+    return dict(db.session.execute(query.group_by(column)).all())
+
+def get_total_views(since, author_id=None):
+    from app import db
+    from app.models.content import Content
+    _, _, views = _tables()
+    query = db.select(func.sum(views.c.views)).where(views.c.day >= since)
+    if author_id is not None:
+        query = query.where(views.c.content_id.in_(
+            db.select(Content.id).where(Content.author_id == author_id)
+        ))
+    return db.session.execute(query).scalar() or 0
+
+def get_category_activity(since, author_id=None):
+    """[(category name, content created, views)] from ``since`` on, busiest first"""
+    from app import db
+    from app.models.content import Content, Category
+    stats, _, _ = _tables()
+    query = db.select(stats.c.category_id, func.sum(stats.c.created)).where(stats.c.day >= since)
+    if author_id is not None:
+        query = query.where(stats.c.author_id == author_id)
+    created = dict(db.session.execute(query.group_by(stats.c.category_id)).all())
+    views = _views_by(Content.__table__.c.category_id, since, author_id)
+
+    names = dict(db.session.query(Category.id, Category.name).all())
+    rows = [(names[category_id], created.get(category_id, 0), views.get(category_id, 0))
+            for category_id in set(created) | set(views) if category_id in names]
+    return sorted(rows, key=lambda row: (-row[1], -row[2], row[0]))
+
+def get_author_activity(since, limit=10):
+    """[(author name, content created, views)] of the most productive authors from ``since`` on"""
+    from app import db
+    from app.models.content import Content
+    from app.models.user import User
+    stats, _, _ = _tables()
+    created = func.sum(stats.c.created)
+    top = db.session.execute(
+        db.select(stats.c.author_id, created).where(stats.c.day >= since)
+        .group_by(stats.c.author_id).having(created > 0).order_by(created.desc()).limit(limit)
+    ).all()
+    if not top:
+        return []
+    views = _views_by(Content.__table__.c.author_id, since)
+    names = dict(db.session.query(User.id, User.full_name).filter(User.id.in_([row[0] for row in top])).all())
+    return [(names.get(author_id), count, views.get(author_id, 0)) for author_id, count in top]
+
+def get_published_count(since):
+    """Content published from ``since`` on"""
+    from app import db
+    stats, _, _ = _tables()
+    return db.session.execute(
+        db.select(func.sum(stats.c.published)).where(stats.c.day >= since)
+    ).scalar() or 0
+
+def get_review_count(reviewer_id, since):
+    """Approvals plus rejections by a reviewer from ``since`` on"""
+    from app import db
+    _, reviews, _ = _tables()
+    return db.session.execute(
+        db.select(func.sum(reviews.c.published + reviews.c.rejected))
+        .where(reviews.c.reviewer_id == reviewer_id, reviews.c.day >= since)
+    ).scalar() or 0
+
+# ---------------------------------------------------------------------------
+# Backfill
+# ---------------------------------------------------------------------------
+
+def rebuild_rollups(batch_size=1000):
+    """Rebuild the content and review rollups from the content table; returns rows read.
+
+    Rejections carry no timestamp of their own, so they are dated by
+    updated_at. Views are only known per day from the moment rollups exist;
+    views counted before that are dated on the publish day, so each
+    content's rollup views add up to its view_count.
+    """
+    from app import db
+    content = db.Model.metadata.tables['content']
+    stats, reviews, views = _tables()
+    processed = 0
+    last_id = 0
+    with db.engine.begin() as connection:
+        connection.execute(stats.delete())
+        connection.execute(reviews.delete())
+        while True:
+            rows = connection.execute(
+                db.select(content.c.id, content.c.status, content.c.category_id, content.c.author_id,
+                          content.c.reviewer_id, content.c.created_at, content.c.published_at,
+                          content.c.updated_at, content.c.view_count)
+                .where(content.c.id > last_id).order_by(content.c.id).limit(batch_size)
+            ).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+            rolled_views = dict(connection.execute(
+                db.select(views.c.content_id, func.sum(views.c.views))
+                .where(views.c.content_id.in_([row.id for row in rows])).group_by(views.c.content_id)
+            ).all())
+
+            deltas = _Deltas()
+            for row in rows:
+                deltas.stats[(_day(row.created_at), row.category_id or 0, row.author_id)]['created'] += 1
+                if row.status == 'published':
+                    day = _day(row.published_at or row.created_at)
+                elif row.status == 'rejected':
+                    day = _day(row.updated_at or row.created_at)
+                else:
+                    day = None
+                if day is not None:
+                    deltas.add_status(row.status, day, row.category_id, row.author_id, row.reviewer_id)
+                legacy = (row.view_count or 0) - rolled_views.get(row.id, 0)
+                if legacy > 0:
+                    deltas.views[(_day(row.published_at or row.created_at), row.id)] += legacy
+            deltas.write(connection)
+            processed += len(rows)
+    return processed
+
+def init_rollups(app):
+    """Feed the daily rollups from content writes"""
+    _register_events()
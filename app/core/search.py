@@ -0,0 +1,382 @@
+from flask import current_app, has_app_context
+from markupsafe import Markup, escape
+from sqlalchemy import event, text, func, Float, Integer
+from sqlalchemy.orm import Session
+import re
+
+# ---------------------------------------------------------------------------
+# Indonesian text analysis
+# ---------------------------------------------------------------------------
+
+INDONESIAN_STOPWORDS = frozenset('''
+ada adalah adanya agar akan akankah akhirnya aku akulah amat anda andalah antara apa
+apabila apakah apalagi atau ataupun bagai bagaimana bagi bagian bahkan bahwa banyak
+baru beberapa begini begitu belum berapa berbagai bisa boleh bukan bukankah cukup
+dahulu dalam dan dapat dari daripada dengan di dia dialah dini diri dulu guna hal
+hanya hari harus hingga ia ialah ini inilah itu itulah jadi jika jikalau juga justru
+kalau kalian kami kamilah kamu kamulah kan kapan karena kata ke kecuali kembali kemudian
+kenapa kepada ketika kita kitalah lagi lain lalu maka masih mau melainkan memang mereka
+merekalah meski mungkin nah namun nanti oleh pada padahal para pernah pula pun saat saja
+saling sambil sampai sang sangat saya sayalah se sebab sebagai sebelum sebuah secara
+sedang sedangkan sehingga sejak sekali sekarang selain selalu seluruh semua sementara
+sendiri seorang seperti sering serta setelah setiap siapa sini situ suatu sudah supaya
+tadi tanpa tapi telah tentang terhadap tersebut tetapi tiap toh untuk walau walaupun
+ya yaitu yakni yang
+'''.split())
+
+_WORD_RE = re.compile(r'[0-9a-zA-ZÀ-ɏ]+')
+_TAG_RE = re.compile(r'<[^>]+>')
+_VOWELS = 'aeiou'
+
+def _strip_suffix(word, suffixes, min_length=4):
+    for suffix in suffixes:
+        if word.endswith(suffix) and len(word) - len(suffix) >= min_length:
+            return word[:-len(suffix)]
+    return word
+
+def _strip_prefix(word, min_length=4):
+    if len(word) - 4 >= min_length and word.startswith(('meng', 'peng')):
+        return word[4:]
+    if len(word) - 4 >= min_length - 1 and word.startswith(('meny', 'peny')):
+        return 's' + word[4:]
+    if len(word) - 3 >= min_length and word.startswith(('mem', 'pem')):
+        rest = word[3:]
+        return 'p' + rest if rest[0] in _VOWELS else rest
+    if len(word) - 3 >= min_length and word.startswith(('men', 'pen')):
+        rest = word[3:]
+        return 't' + rest if rest[0] in _VOWELS else rest
+    if len(word) - 3 >= min_length and word.startswith(('ber', 'ter', 'per')):
+        return word[3:]
+    if len(word) - 2 >= min_length and word.startswith(('di', 'ke', 'se', 'me', 'pe', 'be', 'te')):
+        return word[2:]
+    return word
+
+def stem(word):
+    """Simple rule-based Indonesian stemmer (particles, possessives, affixes).
+
+    This is a dictionary-free approximation of Nazief-Adriani; it only has to
+    map a word and its inflections to the same key consistently.
+    """
+    word = word.lower()
+    if len(word) <= 4 or not word.isalpha():
+        return word
+    word = _strip_suffix(word, ('lah', 'kah', 'tah', 'pun'))
+    word = _strip_suffix(word, ('nya', 'ku', 'mu'))
+    word = _strip_suffix(word, ('kan', 'an', 'i'))
+    stripped = _strip_prefix(word)
+    if stripped != word and stripped.startswith(('per', 'ber')):
+        stripped = _strip_prefix(stripped)
+    return stripped
+
+def tokenize(value):
+    """Lowercase word tokens of value with HTML tags removed"""
+    if not value:
+        return []
+    return [w.lower() for w in _WORD_RE.findall(_TAG_RE.sub(' ', str(value)))]
+
+def analyze(value):
+    """Stemmed tokens of value without stopwords"""
+    return [stem(w) for w in tokenize(value) if w not in INDONESIAN_STOPWORDS]
+
+def parse_query(query):
+    """Split a user query into stemmed terms and quoted phrases"""
+    phrases = []
+    for phrase in re.findall(r'"([^"]+)"', query or ''):
+        tokens = analyze(phrase)
+        if tokens:
+            phrases.append(tokens)
+    remainder = re.sub(r'"[^"]*"', ' ', query or '')
+    terms = []
+    for token in analyze(remainder):
+        if token not in terms:
+            terms.append(token)
+    return terms, phrases
+
+def query_stems(query):
+    terms, phrases = parse_query(query)
+    stems = set(terms)
+    for phrase in phrases:
+        stems.update(phrase)
+    return stems
+
+def highlight(value, query, length=30):
+    """Return an HTML-safe snippet of value around the first match, matches wrapped in <mark>"""
+    stems = query_stems(query)
+    plain = re.sub(r'\s+', ' ', _TAG_RE.sub(' ', str(value or ''))).strip()
+    if not plain:
+        return Markup('')
+
+    words = plain.split(' ')
+    matched = [i for i, w in enumerate(words)
+               if any(stem(t) in stems for t in _WORD_RE.findall(w.lower()))]
+    start = max(0, matched[0] - length // 3) if matched else 0
+    end = min(len(words), start + length)
+
+    parts = []
+    for i in range(start, end):
+        word = escape(words[i])
+        parts.append(Markup('<mark>%s</mark>') % word if i in matched else word)
+    snippet = Markup(' ').join(parts)
+    if start > 0:
+        snippet = Markup('&hellip; ') + snippet
+    if end < len(words):
+        snippet = snippet + Markup(' &hellip;')
+    return snippet
+
+def _document_fields(content):
+    """Analyzed (title, body) strings stored in the index"""
+    title = ' '.join(analyze(content.title))
+    body = ' '.join(analyze(' '.join(filter(None, [content.excerpt, content.content]))))
+    return title, body
+
+def _safe_token(token):
+    return re.sub(r'[^0-9a-z]', '', token)
+
+# ---------------------------------------------------------------------------
+# Backends
+# ---------------------------------------------------------------------------
+
+class LikeSearchBackend:
+    """Fallback for databases without a full-text index: substring match, no ranking"""
+
+    name = 'like'
+
+    def apply(self, query, search, rank=True):
+        from app import db
+        from app.models.content import Content
+        for token in tokenize(search):
+            query = query.filter(db.or_(
+                Content.title.contains(token),
+                Content.content.contains(token),
+                Content.excerpt.contains(token)
+            ))
+        return query
+
+    def index(self, connection, contents):
+        pass
+
+    def remove(self, connection, content_ids):
+        pass
+
+    def create_index(self, connection):
+        pass
+
+class SqliteSearchBackend(LikeSearchBackend):
+    """FTS5 shadow table ``content_fts`` keyed by content id (rowid)"""
+
+    name = 'sqlite_fts5'
+
+    def _match_expression(self, search):
+        terms, phrases = parse_query(search)
+        clauses = [f'"{t}"*' for t in (_safe_token(t) for t in terms) if t]
+        for phrase in phrases:
+            tokens = [t for t in (_safe_token(t) for t in phrase) if t]
+            if tokens:
+                clauses.append('"' + ' '.join(tokens) + '"')
+        return ' AND '.join(clauses)
+
+    def apply(self, query, search, rank=True):
+        from app.models.content import Content
+        match = self._match_expression(search)
+        if not match:
+            return query.filter(text('1 = 0'))
+        matches = text(
+            'SELECT rowid AS id, bm25(content_fts, 10.0, 1.0) AS rank '
+            'FROM content_fts WHERE content_fts MATCH :fts_match'
+        ).bindparams(fts_match=match).columns(id=Integer, rank=Float).subquery('fts_matches')
+        query = query.join(matches, matches.c.id == Content.id)
+        if rank:
+            query = query.order_by(None).order_by(matches.c.rank.asc(), Content.published_at.desc())
+        return query
+
+    def create_index(self, connection):
+        connection.execute(text(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS content_fts USING fts5(title, body, tokenize='unicode61')"
+        ))
+
+    def index(self, connection, contents):
+        rows = []
+        for content in contents:
+            title, body = _document_fields(content)
+            rows.append({'id': content.id, 'title': title, 'body': body})
+        if not rows:
+            return
+        connection.execute(text('DELETE FROM content_fts WHERE rowid = :id'), [{'id': r['id']} for r in rows])
+        connection.execute(text('INSERT INTO content_fts (rowid, title, body) VALUES (:id, :title, :body)'), rows)
+
+    def remove(self, connection, content_ids):
+        if content_ids:
+            connection.execute(text('DELETE FROM content_fts WHERE rowid = :id'), [{'id': i} for i in content_ids])
+
+class PostgresSearchBackend(LikeSearchBackend):
+    """``content.search_vector`` tsvector column with a GIN index, ranked by ts_rank"""
+
+    name = 'postgresql_tsvector'
+
+    def _tsquery(self, search):
+        terms, phrases = parse_query(search)
+        clauses = [f'{t}:*' for t in (_safe_token(t) for t in terms) if t]
+        for phrase in phrases:
+            tokens = [t for t in (_safe_token(t) for t in phrase) if t]
+            if tokens:
+                clauses.append('(' + ' <-> '.join(tokens) + ')')
+        return ' & '.join(clauses)
+
+    def apply(self, query, search, rank=True):
+        from app.models.content import Content
+        tsquery = self._tsquery(search)
+        if not tsquery:
+            return query.filter(text('1 = 0'))
+        query = query.filter(
+            text("content.search_vector @@ to_tsquery('simple', :tsquery)").bindparams(tsquery=tsquery)
+        )
+        if rank:
+            ts_rank = text(
+                "ts_rank(content.search_vector, to_tsquery('simple', :rank_tsquery)) DESC"
+            ).bindparams(rank_tsquery=tsquery)
+            query = query.order_by(None).order_by(ts_rank, Content.published_at.desc())
+        return query
+
+    def create_index(self, connection):
+        connection.execute(text('ALTER TABLE content ADD COLUMN IF NOT EXISTS search_vector tsvector'))
+        connection.execute(text(
+            'CREATE INDEX IF NOT EXISTS ix_content_search_vector ON content USING GIN (search_vector)'
+        ))
+
+    def index(self, connection, contents):
+        rows = []
+        for content in contents:
+            title, body = _document_fields(content)
+            rows.append({'id': content.id, 'title': title, 'body': body})
+        if rows:
+            connection.execute(text(
+                "UPDATE content SET search_vector = "
+                "setweight(to_tsvector('simple', :title), 'A') || to_tsvector('simple', :body) "
+                "WHERE id = :id"
+            ), rows)
+
+    def remove(self, connection, content_ids):
+        # The vector lives on the content row and goes away with it
+        pass
+
+_BACKENDS = {
+    'sqlite': SqliteSearchBackend,
+    'postgresql': PostgresSearchBackend,
+}
+
+def get_backend(bind=None):
+    """Search backend for the configured database (SEARCH_BACKEND=auto|like|bm25)"""
+    from app import db
+    config = current_app.config if has_app_context() else {}
+    if config.get('SEARCH_BACKEND', 'auto') == 'like':
+        return LikeSearchBackend()
+    if config.get('SEARCH_BACKEND') == 'bm25':
+        from app.core.bm25 import Bm25SearchBackend
+        return Bm25SearchBackend()
+    dialect = (bind or db.engine).dialect.name
+    return _BACKENDS.get(dialect, LikeSearchBackend)()
+
+# ---------------------------------------------------------------------------
+# Public API
+# ---------------------------------------------------------------------------
+
+def apply_search(query, search, rank=True):
+    """Restrict a Content query to full-text matches; rank=True orders by relevance"""
+    if not search or not search.strip():
+        return query
+    return get_backend().apply(query, search, rank=rank)
+
+def category_facets(search, base_query=None):
+    """[(category, count)] of published matches per active category"""
+    from app import db
+    from app.models.content import Content, Category
+    query = base_query if base_query is not None else Content.query.filter(Content.status == 'published')
+    query = apply_search(query, search, rank=False)
+    counts = query.with_entities(Content.category_id, func.count(Content.id))\
+        .group_by(Content.category_id).order_by(None).all()
+    counts = {category_id: count for category_id, count in counts if category_id}
+    if not counts:
+        return []
+    categories = Category.query.filter(Category.id.in_(counts.keys()), Category.is_active == True)\
+        .order_by(Category.sort_order, Category.name).all()
+    return [(category, counts[category.id]) for category in categories]
+
+def rebuild_index(batch_size=500):
+    """Create the index structures and (re)index every Content row"""
+    from app import db
+    from app.models.content import Content
+    backend = get_backend()
+    if hasattr(backend, 'rebuild'):
+        return backend.rebuild(batch_size=batch_size)
+    with db.engine.begin() as connection:
+        backend.create_index(connection)
+        if isinstance(backend, SqliteSearchBackend):
+            connection.execute(text('DELETE FROM content_fts'))
+    indexed = 0
+    last_id = 0
+    while True:
+        batch = Content.query.filter(Content.id > last_id).order_by(Content.id).limit(batch_size).all()
+        if not batch:
+            break
+        with db.engine.begin() as connection:
+            backend.index(connection, batch)
+        indexed += len(batch)
+        last_id = batch[-1].id
+        db.session.expunge_all()
+    return indexed
+
+# ---------------------------------------------------------------------------
+# Index maintenance
+# ---------------------------------------------------------------------------
+
+_INDEXED_FIELDS = ('title', 'content', 'excerpt')
+
+@event.listens_for(Session, 'after_flush')
+def _sync_search_index(session, flush_context):
+    from app.models.content import Content
+    from sqlalchemy import inspect as sa_inspect
+
+    changed = []
+    for obj in list(session.new) + list(session.dirty):
+        if not isinstance(obj, Content):
+            continue
+        state = sa_inspect(obj)
+        if obj in session.new or any(state.attrs[f].history.has_changes() for f in _INDEXED_FIELDS):
+            changed.append(obj)
+    removed = [obj.id for obj in session.deleted if isinstance(obj, Content) and obj.id]
+    if not changed and not removed:
+        return
+
+    connection = session.connection()
+    backend = get_backend(connection)
+    try:
+        if connection.dialect.name == 'postgresql':
+            # A failed statement would abort the whole transaction on PostgreSQL
+            with connection.begin_nested():
+                backend.index(connection, changed)
+                backend.remove(connection, removed)
+        else:
+            backend.index(connection, changed)
+            backend.remove(connection, removed)
+    except Exception as e:
+        # A missing index must not block saving content; run `flask search-reindex`
+        if has_app_context():
+            current_app.logger.warning(f'Search index update skipped: {str(e)}')
+
+def _create_index(target, connection, **kwargs):
+    get_backend(connection).create_index(connection)
+
+def _drop_index(target, connection, **kwargs):
+    if connection.dialect.name == 'sqlite':
+        connection.execute(text('DROP TABLE IF EXISTS content_fts'))
+
+def init_search(app):
+    """Create the search index structures whenever the content table is created"""
+    from app.models.content import Content
+    from app.core.bm25 import init_bm25
+
+    init_bm25(app)
+
+    if not event.contains(Content.__table__, 'after_create', _create_index):
+        event.listen(Content.__table__, 'after_create', _create_index)
+        event.listen(Content.__table__, 'before_drop', _drop_index)
@@ -7,6 +7,16 @@ import bleach
 
 class SecurityManager:
     
+    # HTML allowed in content bodies (see also app.core.render)
+    ALLOWED_TAGS = ['p', 'br', 'strong', 'em', 'u', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
+                    'ul', 'ol', 'li', 'a', 'img', 'blockquote', 'code', 'pre', 'div', 'span']
+    ALLOWED_ATTRIBUTES = {
+        'a': ['href', 'title'],
+        'img': ['src', 'alt', 'width', 'height', 'class'],
+        'div': ['class'],
+        'span': ['class'],
+    }
+    
     @staticmethod
     def hash_password(password):
         """Hash password menggunakan werkzeug"""
@@ -32,15 +42,8 @@ class SecurityManager:
     @staticmethod
     def sanitize_html(content):
         """Sanitasi HTML untuk mencegah XSS"""
-        allowed_tags = ['p', 'br', 'strong', 'em', 'u', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
-                       'ul', 'ol', 'li', 'a', 'img', 'blockquote', 'code', 'pre', 'div', 'span']
-        allowed_attributes = {
-            'a': ['href', 'title'],
-            'img': ['src', 'alt', 'width', 'height', 'class'],
-            'div': ['class'],
-            'span': ['class'],
-        }
-        return bleach.clean(content, tags=allowed_tags, attributes=allowed_attributes)
+        return bleach.clean(content, tags=SecurityManager.ALLOWED_TAGS,
+                            attributes=SecurityManager.ALLOWED_ATTRIBUTES)
     
     @staticmethod
     def validate_youtube_url(url):
@@ -0,0 +1,71 @@
+from blinker import Namespace
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+_signals = Namespace()
+
+# Sent after a commit that changed what anonymous visitors can see.
+# Receivers get content_ids (set of Content ids) and settings_changed (bool).
+public_content_changed = _signals.signal('public-content-changed')
+
+_PENDING_KEY = 'public_content_changes'
+
+def mark_public_content_changed(contents=None, settings_changed=False, session=None):
+    """Record a public-facing change; the signal is sent once the transaction commits.
+
+    ``contents`` may mix Content instances (resolved to ids at flush time, so
+    new rows work too) and plain integer ids.
+    """
+    if session is None:
+        from app import db
+        session = db.session
+
+    pending = session.info.setdefault(
+        _PENDING_KEY, {'content_ids': set(), 'objects': [], 'settings_changed': False}
+    )
+    if contents is not None:
+        if not isinstance(contents, (list, tuple, set)):
+            contents = [contents]
+        for item in contents:
+            if isinstance(item, int):
+                pending['content_ids'].add(item)
+            elif item is not None:
+                pending['objects'].append(item)
+    if settings_changed:
+        pending['settings_changed'] = True
+
+@event.listens_for(Session, 'after_flush_postexec')
+def _resolve_pending_objects(session, flush_context):
+    pending = session.info.get(_PENDING_KEY)
+    if not pending or not pending['objects']:
+        return
+    unresolved = []
+    for obj in pending['objects']:
+        if obj.id is not None:
+            pending['content_ids'].add(obj.id)
+        else:
+            unresolved.append(obj)
+    pending['objects'] = unresolved
+
+@event.listens_for(Session, 'after_commit')
+def _send_pending_changes(session):
+    pending = session.info.pop(_PENDING_KEY, None)
+    if pending is None:
+        return
+
+    sender = current_app._get_current_object() if has_app_context() else None
+    try:
+        public_content_changed.send(
+            sender,
+            content_ids=pending['content_ids'],
+            settings_changed=pending['settings_changed']
+        )
+    except Exception as e:
+        # A failing receiver must never break the request that committed
+        if sender is not None:
+            sender.logger.error(f'public_content_changed receiver failed: {str(e)}')
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_pending_changes(session):
+    session.info.pop(_PENDING_KEY, None)
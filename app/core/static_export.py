@@ -0,0 +1,265 @@
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+from urllib.parse import urlsplit, parse_qs
+from flask import current_app, url_for, request, has_request_context
+import fcntl
+import json
+import os
+
+# Set in the WSGI environ of export requests; such requests skip the page
+# cache and view counting, and pages add a beacon to count views instead
+EXPORT_ENVIRON_KEY = 'cms.static_export'
+MANIFEST_NAME = '.manifest.json'
+LOCK_NAME = '.lock'
+
+def is_static_export():
+    return has_request_context() and bool(request.environ.get(EXPORT_ENVIRON_KEY))
+
+def get_export_dir(app=None):
+    app = app or current_app
+    return app.config.get('STATIC_EXPORT_DIR') or os.path.join(app.instance_path, 'static_site')
+
+def output_file(directory, path):
+    """File an exported URL is written to; must match the try_files rule in docker/nginx.conf"""
+    parts = urlsplit(path)
+    base = parts.path.strip('/')
+    cursor = parse_qs(parts.query).get('cursor')
+    if cursor:
+        return os.path.join(directory, base, 'cursor', f'{cursor[0]}.html')
+    if os.path.splitext(base)[1]:
+        # sitemap.xml, feeds: served as-is so nginx picks the type from the extension
+        return os.path.join(directory, base)
+    return os.path.join(directory, base, 'index.html')
+
+# ---------------------------------------------------------------------------
+# Page lists
+# ---------------------------------------------------------------------------
+
+def _category_urls(category):
+    """Every page of a category listing, at its own URL and its shortcut route"""
+    from app.models.content import Content
+    bases = [url_for('public.category_content', slug=category.slug)]
+    if f'public.{category.slug}' in current_app.view_functions:
+        bases.append(url_for(f'public.{category.slug}'))
+
+    # The pages link to each other with both forward and backward cursors
+    cursors = []
+    page = Content.get_category_page(category.id)
+    while True:
+        cursors += [c for c in (page.prev_cursor, page.next_cursor) if c and c not in cursors]
+        if not page.has_next:
+            break
+        page = Content.get_category_page(category.id, cursor=page.next_cursor)
+    return bases + [f'{base}?cursor={cursor}' for base in bases for cursor in cursors] + \
+        [url_for('public.category_feed', slug=category.slug)]
+
+def _site_urls():
+    """Homepage, about page, feed and sitemaps"""
+    from app.core.feeds import sitemap_shard_count
+    urls = [url_for('public.index'), url_for('public.about'), url_for('public.feed'), url_for('public.sitemap')]
+    urls += [url_for('public.sitemap_shard', shard=shard) for shard in range(sitemap_shard_count() + 1)]
+    return urls
+
+def _article_url(slug):
+    return url_for('public.content_detail', slug=slug)
+
+# ---------------------------------------------------------------------------
+# Rendering
+# ---------------------------------------------------------------------------
+
+def _base_url(app):
+    return app.config.get('STATIC_EXPORT_BASE_URL') or 'http://localhost'
+
+def render_urls(app, urls):
+    """[(url, body or None)] rendered through the app as an anonymous visitor"""
+    client = app.test_client(use_cookies=False)
+    rendered = []
+    for url in urls:
+        response = client.get(url, base_url=_base_url(app), environ_base={EXPORT_ENVIRON_KEY: True})
+        rendered.append((url, response.get_data() if response.status_code == 200 else None))
+    return rendered
+
+_worker_app = None
+
+def _init_worker(config_name):
+    global _worker_app
+    from app import create_app
+    _worker_app = create_app(config_name)
+    _worker_app.config['STATIC_EXPORT_ON_PUBLISH'] = False
+
+def _render_chunk(urls):
+    with _worker_app.app_context():
+        return render_urls(_worker_app, urls)
+
+def _render(urls, processes=None, chunk_size=50):
+    app = current_app._get_current_object()
+    if processes == 1 or len(urls) <= chunk_size:
+        return render_urls(app, urls)
+    chunks = [urls[i:i + chunk_size] for i in range(0, len(urls), chunk_size)]
+    rendered = []
+    # Jinja rendering is CPU bound, so fan it out over processes
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker,
+                             initargs=(app.config.get('CONFIG_NAME', 'default'),)) as executor:
+        for chunk in executor.map(_render_chunk, chunks):
+            rendered += chunk
+    return rendered
+
+# ---------------------------------------------------------------------------
+# Output directory
+# ---------------------------------------------------------------------------
+
+@contextmanager
+def _locked(directory):
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, LOCK_NAME), 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def _load_manifest(directory):
+    try:
+        with open(os.path.join(directory, MANIFEST_NAME)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {'site': [], 'categories': {}, 'articles': {}}
+
+def _write_file(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+def _remove_file(directory, url):
+    try:
+        os.remove(output_file(directory, url))
+    except OSError:
+        pass
+
+def _write(directory, rendered):
+    """Write rendered pages; returns the urls that rendered"""
+    written = set()
+    for url, body in rendered:
+        if body is None:
+            _remove_file(directory, url)
+            continue
+        _write_file(output_file(directory, url), body)
+        written.add(url)
+    return written
+
+def _save_manifest(directory, manifest):
+    _write_file(os.path.join(directory, MANIFEST_NAME), json.dumps(manifest).encode('utf-8'))
+
+def _manifest_urls(manifest):
+    urls = set(manifest['site'])
+    for category_urls in manifest['categories'].values():
+        urls.update(category_urls)
+    urls.update(article['url'] for article in manifest['articles'].values())
+    return urls
+
+# ---------------------------------------------------------------------------
+# Export
+# ---------------------------------------------------------------------------
+
+def export_site(directory=None, processes=None):
+    """Pre-render every public page into directory; returns the number of files written"""
+    from app.models.content import Content, Category
+    directory = directory or get_export_dir()
+
+    categories = Category.query.filter_by(is_active=True).order_by(Category.id).all()
+    articles = Content.query.with_entities(Content.id, Content.slug, Content.category_id)\
+        .filter(Content.status == 'published').order_by(Content.id).all()
+    with current_app.test_request_context(base_url=_base_url(current_app)):
+        manifest = {
+            'site': _site_urls(),
+            'categories': {str(category.id): _category_urls(category) for category in categories},
+            'articles': {str(row.id): {'url': _article_url(row.slug), 'category_id': row.category_id}
+                         for row in articles}
+        }
+    urls = sorted(_manifest_urls(manifest))
+
+    rendered = _render(urls, processes=processes)
+    with _locked(directory):
+        stale = _manifest_urls(_load_manifest(directory)) - set(urls)
+        written = _write(directory, rendered)
+        for url in stale:
+            _remove_file(directory, url)
+        _save_manifest(directory, manifest)
+    return len(written)
+
+def export_changes(content_ids, directory=None):
+    """Re-render the given articles, their category listings and the site pages"""
+    from app.models.content import Content, Category
+    directory = directory or get_export_dir()
+    if not os.path.exists(os.path.join(directory, MANIFEST_NAME)):
+        # Nothing exported yet; `flask export-static` builds the first copy
+        return 0
+
+    with _locked(directory), current_app.test_request_context(base_url=_base_url(current_app)):
+        manifest = _load_manifest(directory)
+        ids = {str(content_id) for content_id in content_ids}
+        rows = Content.query.with_entities(Content.id, Content.slug, Content.category_id, Content.status)\
+            .filter(Content.id.in_([int(i) for i in ids])).all()
+
+        remove = set()
+        category_ids = set()
+        for content_id in ids:
+            previous = manifest['articles'].pop(content_id, None)
+            if previous:
+                remove.add(previous['url'])
+                category_ids.add(previous['category_id'])
+        urls = set(manifest['site'])
+        for row in rows:
+            category_ids.add(row.category_id)
+            if row.status == 'published':
+                url = _article_url(row.slug)
+                manifest['articles'][str(row.id)] = {'url': url, 'category_id': row.category_id}
+                urls.add(url)
+
+        # Publishing shifts every later page of the listing, so redo all of them
+        for category in Category.query.filter(Category.id.in_([i for i in category_ids if i])).all():
+            remove.update(manifest['categories'].pop(str(category.id), []))
+            if category.is_active:
+                manifest['categories'][str(category.id)] = _category_urls(category)
+                urls.update(manifest['categories'][str(category.id)])
+
+        written = _write(directory, render_urls(current_app._get_current_object(), sorted(urls)))
+        for url in remove - urls:
+            _remove_file(directory, url)
+        _save_manifest(directory, manifest)
+    return len(written)
+
+def _on_public_content_changed(sender, content_ids=(), settings_changed=False, **kwargs):
+    if sender is None or not sender.config.get('STATIC_EXPORT_ON_PUBLISH'):
+        return
+    content_ids = set(content_ids)
+
+    def run():
+        with sender.app_context():
+            try:
+                if settings_changed or not content_ids:
+                    # Settings and categories appear on every page
+                    export_site(processes=sender.config.get('STATIC_EXPORT_PROCESSES'))
+                else:
+                    export_changes(content_ids)
+            except Exception as e:
+                sender.logger.error(f'Static export failed: {str(e)}')
+
+    if sender.config.get('STATIC_EXPORT_ASYNC', True):
+        sender.extensions['static_export_executor'].submit(run)
+    else:
+        run()
+
+def init_static_export(app):
+    """Keep the pre-rendered copy of the public site up to date on publish"""
+    from app.core.signals import public_content_changed
+    app.extensions['static_export_executor'] = ThreadPoolExecutor(
+        max_workers=1, thread_name_prefix='static-export'
+    )
+    public_content_changed.connect(_on_public_content_changed, weak=False)
+
+    @app.context_processor
+    def inject_static_export():
+        return {'static_export': is_static_export()}
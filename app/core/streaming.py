@@ -0,0 +1,53 @@
+from flask import current_app, render_template, get_flashed_messages, stream_with_context
+from flask.signals import before_render_template, template_rendered
+import itertools
+
+def _chunks(template, context, size):
+    """Template output joined into chunks of about ``size`` characters"""
+    buffer, length = [], 0
+    for part in template.generate(context):
+        buffer.append(part)
+        length += len(part)
+        if length >= size:
+            yield ''.join(buffer)
+            buffer, length = [], 0
+    if buffer:
+        yield ''.join(buffer)
+
+def render_streamed(template_name, **context):
+    """Render a long listing page, sending the layout while its rows are fetched.
+
+    Like ``flask.stream_template`` but in chunks of STREAM_BUFFER_SIZE
+    characters. Pair it with ``keyset_paginate(..., stream=True)`` so the
+    rows come from a server-side cursor and never sit in memory as a whole
+    page. Falls back to ``render_template`` when STREAM_LISTINGS is off.
+    """
+    app = current_app._get_current_object()
+    if not app.config.get('STREAM_LISTINGS', False):
+        return render_template(template_name, **context)
+
+    # The session cookie is sent with the headers, before the template runs,
+    # so consume flashed messages and create the CSRF token now
+    get_flashed_messages()
+    if 'csrf' in app.extensions:
+        from flask_wtf.csrf import generate_csrf
+        generate_csrf()
+
+    template = app.jinja_env.get_or_select_template(template_name)
+    app.update_template_context(context)
+    before_render_template.send(app, template=template, context=context)
+
+    chunks = _chunks(template, context, app.config.get('STREAM_BUFFER_SIZE', 8192))
+    # Render the first chunk here so errors in the layout still get the normal error page
+    first = list(itertools.islice(chunks, 1))
+
+    def generate():
+        try:
+            yield from itertools.chain(first, chunks)
+        except Exception as e:
+            # Headers are gone already; all we can do is log and cut the response short
+            app.logger.error(f'Streaming {template_name} failed: {str(e)}')
+            raise
+        template_rendered.send(app, template=template, context=context)
+
+    return app.response_class(stream_with_context(generate()), mimetype='text/html')
@@ -0,0 +1,251 @@
+from flask import current_app
+from collections import defaultdict
+from datetime import timedelta
+import bisect
+import heapq
+import math
+import re
+import threading
+import unicodedata
+
+_WORD_RE = re.compile(r'[0-9a-z]+')
+SYNC_OVERLAP = timedelta(seconds=60)
+
+def normalize(value):
+    """Lowercase ASCII-folded text used for suggestion keys"""
+    value = unicodedata.normalize('NFKD', value or '')
+    return value.encode('ascii', 'ignore').decode('ascii').lower()
+
+def words(value):
+    return _WORD_RE.findall(normalize(value))
+
+def trigrams(word):
+    padded = f'  {word} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class SuggestionIndex:
+    """In-memory prefix index over published titles and category names.
+
+    Every word of every title is kept in a sorted list, so a prefix lookup is
+    one bisect plus a short scan. Words also get trigram postings; when the
+    prefix scan finds fewer than ``limit`` entries, the last query word is
+    matched by trigram similarity to tolerate typos.
+    """
+
+    def __init__(self, min_similarity=0.4):
+        self.min_similarity = min_similarity
+        self._lock = threading.RLock()
+        self._entries = {}
+        self._sorted_words = []
+        self._word_entries = defaultdict(set)
+        self._trigram_words = defaultdict(set)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def add(self, key, title, url, weight=0.0, _sorted=True, **extra):
+        """Add or replace an entry; key is e.g. ('content', id)"""
+        with self._lock:
+            self.remove(key)
+            title_words = words(title)
+            entry_words = set(title_words)
+            self._entries[key] = {'title': title, 'url': url, 'weight': weight, 'words': entry_words,
+                                  'normalized': ' '.join(title_words), 'extra': extra}
+            for word in entry_words:
+                if not self._word_entries[word]:
+                    if _sorted:
+                        bisect.insort(self._sorted_words, word)
+                    else:
+                        self._sorted_words.append(word)
+                    for trigram in trigrams(word):
+                        self._trigram_words[trigram].add(word)
+                self._word_entries[word].add(key)
+
+    def build(self, entries):
+        """Replace the index with (key, title, url, weight, extra) tuples"""
+        with self._lock:
+            self._entries.clear()
+            self._sorted_words = []
+            self._word_entries.clear()
+            self._trigram_words.clear()
+            for key, title, url, weight, extra in entries:
+                self.add(key, title, url, weight, _sorted=False, **extra)
+            self._sorted_words.sort()
+
+    def remove(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return
+            for word in entry['words']:
+                keys = self._word_entries[word]
+                keys.discard(key)
+                if not keys:
+                    del self._word_entries[word]
+                    index = bisect.bisect_left(self._sorted_words, word)
+                    if index < len(self._sorted_words) and self._sorted_words[index] == word:
+                        del self._sorted_words[index]
+                    for trigram in trigrams(word):
+                        self._trigram_words[trigram].discard(word)
+
+    def keys(self):
+        return set(self._entries)
+
+    def _prefix_words(self, prefix, max_words=200):
+        index = bisect.bisect_left(self._sorted_words, prefix)
+        matches = []
+        while index < len(self._sorted_words) and len(matches) < max_words:
+            word = self._sorted_words[index]
+            if not word.startswith(prefix):
+                break
+            matches.append(word)
+            index += 1
+        return matches
+
+    def _similar_words(self, word, max_words=20):
+        query_trigrams = trigrams(word)
+        # A word with similarity >= s shares at least ceil(s * n) of the query's n trigrams,
+        # so candidates only need to come from the n - ceil(s * n) + 1 rarest ones
+        required = math.ceil(self.min_similarity * len(query_trigrams))
+        postings = sorted((self._trigram_words.get(trigram, ()) for trigram in query_trigrams), key=len)
+        candidates = set()
+        for posting in postings[:len(query_trigrams) - required + 1]:
+            candidates.update(posting)
+
+        # ...and has between s * n and n / s trigrams of its own (a word has at most len + 2)
+        shortest = self.min_similarity * len(query_trigrams) - 2
+        longest = len(query_trigrams) / self.min_similarity
+        scored = []
+        for candidate in candidates:
+            if not shortest <= len(candidate) <= longest:
+                continue
+            candidate_trigrams = trigrams(candidate)
+            shared = len(query_trigrams & candidate_trigrams)
+            similarity = shared / (len(query_trigrams) + len(candidate_trigrams) - shared)
+            if similarity >= self.min_similarity:
+                scored.append((similarity, candidate))
+        return [candidate for _, candidate in heapq.nlargest(max_words, scored)]
+
+    def suggest(self, query, limit=8, max_candidates=500):
+        """[entry dict] for a partially typed query, best first"""
+        query_words = words(query)
+        if not query_words:
+            return []
+        *complete, last = query_words
+        normalized_query = ' '.join(query_words)
+
+        with self._lock:
+            def matches_complete(key):
+                entry_words = self._entries[key]['words']
+                return all(any(w.startswith(c) for w in entry_words) for c in complete)
+
+            def rank(key, quality):
+                entry = self._entries[key]
+                starts = entry['normalized'].startswith(normalized_query)
+                return (quality, starts, entry['weight'])
+
+            found = {}
+            for word in self._prefix_words(last):
+                for key in self._word_entries[word]:
+                    if key not in found and matches_complete(key):
+                        found[key] = rank(key, 2)
+                if len(found) >= max_candidates:
+                    break
+
+            if len(found) < limit and len(last) >= 3:
+                for word in self._similar_words(last):
+                    for key in self._word_entries[word]:
+                        if key not in found and matches_complete(key):
+                            found[key] = rank(key, 1)
+
+            best = heapq.nlargest(limit, found.items(), key=lambda item: item[1])
+            return [dict(self._entries[key]['extra'], title=self._entries[key]['title'],
+                         url=self._entries[key]['url']) for key, _ in best]
+
+class SuggestionService:
+    """Keeps a worker's SuggestionIndex in sync with the database.
+
+    Workers notice publish events through the shared content version and
+    then apply only what changed: rows updated since the last sync are
+    re-added and ids that are no longer published are dropped.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.index = SuggestionIndex()
+        self._lock = threading.Lock()
+        self._version = None
+        self._watermark = None
+        app.extensions['search_suggestions'] = self
+
+    def _entries(self, rows, categories):
+        from flask import url_for
+        for row in rows:
+            weight = row.published_at.timestamp() if row.published_at else 0.0
+            yield (('content', row.id), row.title, url_for('public.content_detail', slug=row.slug),
+                   weight, {'type': 'content', 'slug': row.slug})
+        for category in categories:
+            # Categories rank above articles with the same match quality
+            yield (('category', category.id), category.name,
+                   url_for('public.category_content', slug=category.slug),
+                   float('inf'), {'type': 'category', 'slug': category.slug})
+
+    def sync(self):
+        """Bring the index up to date with the current content version"""
+        from app.core.cache import get_content_version
+        version = get_content_version()
+        if version == self._version:
+            return
+        with self._lock:
+            if version == self._version:
+                return
+            self._sync(version)
+
+    def _sync(self, version):
+        from app import db
+        from app.models.content import Content, Category
+        table = Content.__table__
+        category_table = Category.__table__
+        columns = (table.c.id, table.c.title, table.c.slug, table.c.published_at, table.c.updated_at)
+        published = table.c.status == 'published'
+
+        with db.engine.connect() as connection:
+            changed = db.select(*columns).where(published)
+            if self._watermark is not None:
+                # Allow for transactions that committed after a later updated_at was synced
+                changed = changed.where(table.c.updated_at >= self._watermark - SYNC_OVERLAP)
+            rows = connection.execute(changed).all()
+            live_ids = set(connection.execute(db.select(table.c.id).where(published)).scalars())
+            categories = connection.execute(
+                db.select(category_table.c.id, category_table.c.name, category_table.c.slug)
+                .where(category_table.c.is_active == True)
+            ).all()
+
+        entries = list(self._entries(rows, categories))
+        if self._watermark is None:
+            self.index.build(entries)
+        else:
+            for key, title, url, weight, extra in entries:
+                self.index.add(key, title, url, weight, **extra)
+            live_categories = {('category', category.id) for category in categories}
+            for key in self.index.keys():
+                kind, item_id = key
+                if (kind == 'content' and item_id not in live_ids) or \
+                        (kind == 'category' and key not in live_categories):
+                    self.index.remove(key)
+
+        updated = [row.updated_at for row in rows if row.updated_at]
+        if updated:
+            self._watermark = max(updated + ([self._watermark] if self._watermark else []))
+        self._version = version
+
+    def suggest(self, query, limit=8):
+        self.sync()
+        return self.index.suggest(query, limit=limit)
+
+def get_suggestions(query, limit=8):
+    """Title and category suggestions for a partially typed search query"""
+    service = current_app.extensions.get('search_suggestions')
+    if service is None:
+        service = SuggestionService(current_app._get_current_object())
+    return service.suggest(query, limit=limit)
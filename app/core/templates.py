@@ -0,0 +1,31 @@
+from jinja2 import FileSystemBytecodeCache, TemplateError
+import os
+import time
+
+def get_bytecode_cache_dir(app):
+    return app.config.get('JINJA_BYTECODE_CACHE_DIR') or os.path.join(app.config['CACHE_DIR'], 'jinja')
+
+def init_templates(app):
+    """Keep compiled templates on disk so new workers skip the Jinja compiler"""
+    if app.config.get('JINJA_BYTECODE_CACHE', True):
+        directory = get_bytecode_cache_dir(app)
+        os.makedirs(directory, exist_ok=True)
+        # Entries are keyed by template name and source checksum, so edits never serve stale code
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(directory)
+
+def prewarm_templates(app):
+    """Compile every template into the environment's cache; returns (count, seconds).
+
+    Run it once per worker at boot, or in the gunicorn master with
+    preload_app so forked workers inherit the compiled templates.
+    """
+    env = app.jinja_env
+    start = time.perf_counter()
+    compiled = 0
+    for name in env.list_templates(extensions=['html', 'xml', 'txt']):
+        try:
+            env.get_template(name)
+            compiled += 1
+        except TemplateError as e:
+            app.logger.error(f'Template {name} failed to compile: {str(e)}')
+    return compiled, time.perf_counter() - start
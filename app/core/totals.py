@@ -0,0 +1,152 @@
+import threading
+import time
+
+# Listing totals without an exact COUNT(*) per page view. Content counts by
+# status, category, author or reviewer come from the counter table; whole
+# tables on PostgreSQL use the planner's row estimate (pg_class.reltuples);
+# any other filtered count runs once and is reused for
+# PAGINATION_COUNT_CACHE_TIMEOUT seconds under a key of its filters. Totals
+# that may be off are flagged ``approximate`` and shown as "sekitar N";
+# ?exact=1 on a listing asks for a fresh COUNT instead. Planner estimates
+# only feed totals that are displayed; an OFFSET listing given a cached count
+# settles it against the rows it read, so its has_next is always exact.
+
+class Total(int):
+    """Row count of a listing; ``approximate`` when it is an estimate or a cached count"""
+
+    approximate = False
+
+    def __new__(cls, value, approximate=False):
+        total = super().__new__(cls, value)
+        total.approximate = approximate
+        return total
+
+    def __repr__(self):
+        return f'Total({int(self)}, approximate={self.approximate})'
+
+def wants_exact_total():
+    """Whether the listing was asked for an exact count (?exact=1)"""
+    from flask import request
+    return request.args.get('exact', '') in ('1', 'true', 'on')
+
+def content_total(status=None, category_id=None, author_id=None, reviewer_id=None):
+    """Content count of one status and at most one owner, from the counters, or None.
+
+    Counters are kept in the same transaction as the content they count, so
+    the total is exact. Owner ids may be the raw filter strings of a request
+    ('' for no filter). Returns None for more than one owner or an id that is
+    not a number, which the counters do not hold; count those with
+    cached_count.
+    """
+    from app.core.counters import get_counts
+    owners = []
+    for scope, key_id in (('category', category_id), ('author', author_id), ('reviewer', reviewer_id)):
+        if key_id in (None, ''):
+            continue
+        try:
+            owners.append((scope, int(key_id)))
+        except (TypeError, ValueError):
+            return None
+    if len(owners) > 1:
+        return None
+    scope, key_id = owners[0] if owners else ('status', 0)
+    return Total(get_counts((scope, key_id)).get(scope, key_id, status))
+
+def _cache(app):
+    return app.extensions.setdefault('pagination_totals', ({}, threading.Lock()))
+
+def cached_count(query, key, exact=False):
+    """COUNT of a query, reused for a short while under ``key`` (a tuple of its filters).
+
+    A reused count may miss the changes of the last few seconds and is
+    returned as approximate; ``exact`` always counts and refreshes the entry.
+    """
+    from flask import current_app
+    app = current_app._get_current_object()
+    timeout = app.config.get('PAGINATION_COUNT_CACHE_TIMEOUT', 30)
+    entries, lock = _cache(app)
+    now = time.monotonic()
+    if not exact and timeout > 0:
+        with lock:
+            entry = entries.get(key)
+        if entry is not None and now - entry[0] < timeout:
+            return Total(entry[1], approximate=True)
+
+    count = query.order_by(None).count()
+    if timeout > 0:
+        with lock:
+            if len(entries) >= app.config.get('PAGINATION_COUNT_CACHE_MAX_ENTRIES', 1024):
+                for old_key in [k for k, (created, _) in entries.items() if now - created >= timeout]:
+                    del entries[old_key]
+                if len(entries) >= app.config.get('PAGINATION_COUNT_CACHE_MAX_ENTRIES', 1024):
+                    entries.clear()
+            entries[key] = (now, count)
+    return Total(count)
+
+def table_estimate(table):
+    """Planner estimate of a table's rows on PostgreSQL, or None.
+
+    None on other databases and for tables that were never vacuumed or
+    analyzed, which have no estimate yet.
+    """
+    from app import db
+    if db.engine.dialect.name != 'postgresql':
+        return None
+    estimate = db.session.execute(
+        db.text('SELECT reltuples FROM pg_class WHERE oid = to_regclass(:name)'), {'name': table.name}
+    ).scalar()
+    if estimate is None or estimate < 0:
+        return None
+    return Total(int(estimate), approximate=True)
+
+def table_total(query, table, exact=False):
+    """Total of an unfiltered listing of ``table``: the planner estimate, else a cached count"""
+    if not exact:
+        estimate = table_estimate(table)
+        if estimate is not None:
+            return estimate
+    return cached_count(query, (table.name,), exact=exact)
+
+def paginate(query, page, per_page, total):
+    """Flask-SQLAlchemy OFFSET pagination that takes its total instead of counting.
+
+    An approximate total is corrected by the page it paginates: a short page
+    gives the exact total, and a full one checks for a row after it, so
+    ``has_next`` and the next page number never come from a stale count.
+    """
+    pagination = query.paginate(page=page, per_page=per_page, error_out=False, count=False)
+    if getattr(total, 'approximate', False):
+        total = _settled_total(query, pagination, total)
+    pagination.total = total
+    return pagination
+
+def _settled_total(query, pagination, total):
+    offset = (pagination.page - 1) * pagination.per_page
+    if len(pagination.items) < pagination.per_page:
+        if pagination.items or pagination.page == 1:
+            return Total(offset + len(pagination.items))
+        # Past the last page; the rows that do exist are further back
+        return Total(min(int(total), offset), approximate=True)
+    seen = offset + len(pagination.items)
+    if query.order_by(None).offset(seen).limit(1).count():
+        return Total(max(int(total), seen + 1), approximate=True)
+    return Total(seen)
+
+def total_label(total):
+    """'N', or 'sekitar N' for an approximate total"""
+    if total is None:
+        return ''
+    if getattr(total, 'approximate', False):
+        return f'sekitar {int(total)}'
+    return str(int(total))
+
+def clear_count_cache(app):
+    """Forget the cached counts of this app"""
+    entries, lock = _cache(app)
+    with lock:
+        entries.clear()
+
+def init_totals(app):
+    """Show listing totals as 'sekitar N' when they are not exact"""
+    app.add_template_filter(total_label)
+    app.add_template_global(wants_exact_total)
@@ -0,0 +1,151 @@
+from flask import current_app
+from sqlalchemy import bindparam
+from sqlalchemy.orm.attributes import set_committed_value
+import atexit
+import gc
+import threading
+import weakref
+
+# Counters of every app in this process; one exit handler writes what they
+# still hold, without keeping apps alive that are otherwise gone (tests)
+_counters = weakref.WeakSet()
+
+class ViewCounter:
+    """Write-behind view counter.
+
+    Views are accumulated per content id in memory and written in one batched
+    ``UPDATE content SET view_count = view_count + :delta WHERE id = :id``
+    when the buffer reaches a size threshold or the flush interval passes.
+    A final flush runs when the worker shuts down.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self._pending = {}
+        self._pending_total = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        self.flush_interval = 10
+        self.flush_threshold = 500
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.flush_interval = app.config.get('VIEW_COUNTER_FLUSH_INTERVAL', 10)
+        self.flush_threshold = app.config.get('VIEW_COUNTER_FLUSH_THRESHOLD', 500)
+        app.extensions['view_counter'] = self
+        _counters.add(self)
+
+    def increment(self, content_id, amount=1):
+        """Buffer a view; returns the number of views not yet written for content_id"""
+        with self._lock:
+            pending = self._pending.get(content_id, 0) + amount
+            self._pending[content_id] = pending
+            self._pending_total += amount
+            should_flush = self._pending_total >= self.flush_threshold
+
+        if should_flush:
+            self.flush()
+        else:
+            self._ensure_thread()
+        return self._pending.get(content_id, 0)
+
+    def pending(self, content_id):
+        """Views buffered in this worker but not yet written"""
+        return self._pending.get(content_id, 0)
+
+    def apply_pending(self, content):
+        """Show buffered views on a loaded Content without marking it dirty"""
+        pending = self.pending(content.id)
+        if pending:
+            set_committed_value(content, 'view_count', (content.view_count or 0) + pending)
+        return content
+
+    def flush(self):
+        """Write all buffered views in one batched UPDATE"""
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return 0
+                batch = self._pending
+                self._pending = {}
+                self._pending_total = 0
+
+            app = self.app
+            try:
+                with app.app_context():
+                    from app import db
+                    from app.models.content import Content
+                    table = Content.__table__
+                    # updated_at is set to itself so its onupdate default does not fire
+                    statement = table.update()\
+                        .where(table.c.id == bindparam('b_id'))\
+                        .values(view_count=table.c.view_count + bindparam('b_delta'),
+                                updated_at=table.c.updated_at)
+                    with db.engine.begin() as connection:
+                        connection.execute(statement, [
+                            {'b_id': content_id, 'b_delta': delta}
+                            for content_id, delta in sorted(batch.items())
+                        ])
+                        # Same transaction, so the daily rollup never disagrees with view_count
+                        from app.core.rollups import record_daily_views
+                        record_daily_views(connection, batch)
+            except Exception as e:
+                # Put the views back so the next flush retries them
+                with self._lock:
+                    for content_id, delta in batch.items():
+                        self._pending[content_id] = self._pending.get(content_id, 0) + delta
+                        self._pending_total += delta
+                if app is not None:
+                    app.logger.error(f'View counter flush failed: {str(e)}')
+                return 0
+            return len(batch)
+
+    def shutdown(self):
+        """Stop the flush thread and write whatever is left"""
+        self._stop.set()
+        if self._pending:
+            self.flush()
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=_run, args=(weakref.ref(self), self._stop),
+                                            name='view-counter-flush', daemon=True)
+            self._thread.start()
+
+def _run(counter_ref, stop):
+    # Only a weak reference between flushes, so the thread ends with its counter
+    while True:
+        counter = counter_ref()
+        if counter is None:
+            return
+        interval = counter.flush_interval
+        del counter
+        if stop.wait(interval):
+            return
+        counter = counter_ref()
+        if counter is None:
+            return
+        counter.flush()
+        del counter
+
+@atexit.register
+def _shutdown_counters():
+    # Apps dropped without their reference cycles collected yet are gone too
+    gc.collect()
+    for counter in list(_counters):
+        counter.shutdown()
+
+def record_view(content):
+    """Count a view of content; returns content with an approximately fresh view_count"""
+    counter = current_app.extensions['view_counter']
+    counter.increment(content.id)
+    return counter.apply_pending(content)
@@ -2,5 +2,9 @@ from app.models.user import User, Role
 from app.models.content import Content, Category, ContentRevision
 from app.models.audit import AuditLog
 from app.models.setting import Setting
+from app.models.related import RelatedContent
+from app.models.counter import ContentCounter
+from app.models.rollup import DailyContentStat, DailyReviewStat, DailyContentViews
 
-__all__ = ['User', 'Role', 'Content', 'Category', 'ContentRevision', 'AuditLog', 'Setting']
\ No newline at end of file
+__all__ = ['User', 'Role', 'Content', 'Category', 'ContentRevision', 'AuditLog', 'Setting', 'RelatedContent', 'ContentCounter',
+           'DailyContentStat', 'DailyReviewStat', 'DailyContentViews']
\ No newline at end of file
@@ -4,6 +4,10 @@ from app import db
 
 class AuditLog(db.Model):
     __tablename__ = 'audit_logs'
+    __table_args__ = (
+        db.Index('ix_audit_logs_action_created_at', 'action', 'created_at', 'id'),
+        db.Index('ix_audit_logs_created_at', 'created_at', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'))
@@ -23,33 +27,13 @@ class AuditLog(db.Model):
         return f'<AuditLog {self.action} on {self.table_name}>'
     
     @staticmethod
-    def log_action(user_id, action, table_name, record_id=None, old_values=None, new_values=None, ip_address=None, user_agent=None):
+    def log_action(user_id, action, table_name, record_id=None, old_values=None, new_values=None, ip_address=None, user_agent=None,
+                   session=None):
         """Create audit log entry with safe serialization"""
         from app.core.security import SecurityManager
         
-        # Safely serialize values to prevent unicode errors
-        safe_old_values = None
-        safe_new_values = None
-        
-        if old_values:
-            try:
-                # Ensure all values are safely converted to strings
-                safe_old_values = {
-                    key: SecurityManager.safe_str(value) for key, value in old_values.items()
-                }
-            except Exception as e:
-                # Fallback: store error info
-                safe_old_values = {'serialization_error': str(e)}
-        
-        if new_values:
-            try:
-                # Ensure all values are safely converted to strings
-                safe_new_values = {
-                    key: SecurityManager.safe_str(value) for key, value in new_values.items()
-                }
-            except Exception as e:
-                # Fallback: store error info
-                safe_new_values = {'serialization_error': str(e)}
+        safe_old_values = AuditLog._safe_values(old_values)
+        safe_new_values = AuditLog._safe_values(new_values)
         
         log = AuditLog(
             user_id=user_id,
@@ -61,9 +45,48 @@ class AuditLog(db.Model):
             ip_address=SecurityManager.safe_str(ip_address) if ip_address else None,
             user_agent=SecurityManager.safe_str(user_agent) if user_agent else None
         )
-        db.session.add(log)
+        (session or db.session).add(log)
         return log
     
+    @staticmethod
+    def _safe_values(values):
+        """Safely serialize values to prevent unicode errors"""
+        from app.core.security import SecurityManager
+        
+        if not values:
+            return None
+        try:
+            # Ensure all values are safely converted to strings
+            return {key: SecurityManager.safe_str(value) for key, value in values.items()}
+        except Exception as e:
+            # Fallback: store error info
+            return {'serialization_error': str(e)}
+    
+    @staticmethod
+    def audit_rows(entries):
+        """Table rows of audit entries (dicts of log_action arguments, optionally created_at)"""
+        from app.core.security import SecurityManager
+        
+        now = datetime.utcnow()
+        return [{
+            'user_id': entry.get('user_id'),
+            'action': SecurityManager.safe_str(entry['action']),
+            'table_name': SecurityManager.safe_str(entry['table_name']),
+            'record_id': entry.get('record_id'),
+            'old_values': AuditLog._safe_values(entry.get('old_values')),
+            'new_values': AuditLog._safe_values(entry.get('new_values')),
+            'ip_address': SecurityManager.safe_str(entry['ip_address']) if entry.get('ip_address') else None,
+            'user_agent': SecurityManager.safe_str(entry['user_agent']) if entry.get('user_agent') else None,
+            'created_at': entry.get('created_at') or now,
+        } for entry in entries]
+    
+    @staticmethod
+    def log_actions(entries):
+        """Write many audit entries (dicts of log_action arguments) with one INSERT"""
+        if not entries:
+            return
+        db.session.execute(AuditLog.__table__.insert(), AuditLog.audit_rows(entries))
+    
     def to_dict(self):
         """Convert audit log to dictionary with safe string handling"""
         from app.core.security import SecurityManager
@@ -1,6 +1,8 @@
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
 from slugify import slugify
+from sqlalchemy import func, and_, or_
+from sqlalchemy.orm import contains_eager, joinedload, defer
 from app import db
 
 class Category(db.Model):
@@ -25,6 +27,7 @@ class Category(db.Model):
         """Convert category to dictionary with safe string handling"""
         try:
             from app.core.security import SecurityManager
+            from app.core.reference import get_category_counts
             return {
                 'id': self.id,
                 'name': SecurityManager.safe_str(self.name),
@@ -32,7 +35,7 @@ class Category(db.Model):
                 'description': SecurityManager.safe_str(self.description),
                 'color': SecurityManager.safe_str(self.color) if self.color else '#28a745',
                 'is_active': bool(self.is_active),
-                'content_count': self.content.filter_by(status='published').count()
+                'content_count': get_category_counts().get(self.id, 0)
             }
         except Exception as e:
             # Fallback dictionary with minimal safe data
@@ -45,6 +48,20 @@ class Category(db.Model):
 
 class Content(db.Model):
     __tablename__ = 'content'
+    __table_args__ = (
+        # Public pages and feeds: published, newest first
+        db.Index('ix_content_status_published_at', 'status', 'published_at', 'id'),
+        # Category pages
+        db.Index('ix_content_category_status_published_at', 'category_id', 'status', 'published_at', 'id'),
+        # Publisher views: own content by status, newest first
+        db.Index('ix_content_author_status_created_at', 'author_id', 'status', 'created_at'),
+        # Editor review history and stats
+        db.Index('ix_content_reviewer_updated_at', 'reviewer_id', 'updated_at'),
+        # Review queue and status-filtered staff listings
+        db.Index('ix_content_status_created_at', 'status', 'created_at', 'id'),
+        # Unfiltered staff listings, newest first
+        db.Index('ix_content_created_at', 'created_at', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(255), nullable=False)
@@ -64,6 +81,14 @@ class Content(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    # Written by the render pipeline on save (see app.core.render); use Content.rendered
+    body_html = db.Column(db.Text)
+    excerpt_text = db.Column(db.Text)
+    word_count = db.Column(db.Integer)
+    reading_time = db.Column(db.Integer)
+    youtube_id = db.Column(db.String(32))
+    render_hash = db.Column(db.String(64))
+    
     # Relationships
     revisions = db.relationship('ContentRevision', backref='content', lazy='dynamic', cascade='all, delete-orphan')
     
@@ -145,9 +170,11 @@ class Content(db.Model):
     def approve(self, reviewer):
         """Approve content for publishing"""
         if self.status == 'pending_review':
+            from app.core.signals import mark_public_content_changed
             self.status = 'published'
             self.reviewer_id = reviewer.id
             self.published_at = datetime.utcnow()
+            mark_public_content_changed(self)
             return True
         return False
     
@@ -160,18 +187,174 @@ class Content(db.Model):
             return True
         return False
     
-    def get_youtube_embed_id(self):
-        """Extract YouTube video ID for embedding"""
-        if not self.youtube_url:
-            return None
+    @staticmethod
+    def load_options(profile):
+        """Loader options of a named eager-loading profile.
         
-        import re
-        youtube_regex = re.compile(
-            r'(https?://)?(www\.)?(youtube|youtu|youtube-nocookie)\.(com|be)/'
-            r'(watch\?v=|embed/|v/|.+\?v=)?([^&=%\?]{11})'
+        ``list_view`` loads what dashboard lists show per row (author and
+        role, category, reviewer) in the same SELECT as the rows and leaves
+        the body, rendered HTML and metadata unloaded until read; paginated
+        listings use the projections in app.core.read_models instead.
+        ``detail_view`` adds the reviewer's role for the single-item pages.
+        """
+        from app.models.user import User
+        options = [joinedload(Content.author).joinedload(User.role), joinedload(Content.category)]
+        if profile == 'list_view':
+            return options + [joinedload(Content.reviewer), defer(Content.content),
+                              defer(Content.body_html), defer(Content.content_metadata)]
+        if profile == 'detail_view':
+            return options + [joinedload(Content.reviewer).joinedload(User.role)]
+        raise ValueError(f'Unknown loading profile: {profile}')
+    
+    @staticmethod
+    def query_for(profile):
+        """Content.query with a named eager-loading profile applied"""
+        return Content.query.options(*Content.load_options(profile))
+    
+    @staticmethod
+    def get_homepage_content(featured_limit=6, per_category=3):
+        """Build homepage data (featured list and latest per category) in one query"""
+        ranked = db.session.query(
+            Content.id.label('id'),
+            func.row_number().over(
+                order_by=(Content.published_at.desc(), Content.id.desc())
+            ).label('overall_rank'),
+            func.row_number().over(
+                partition_by=Content.category_id,
+                order_by=(Content.published_at.desc(), Content.id.desc())
+            ).label('category_rank')
+        ).filter(Content.status == 'published').subquery()
+        
+        rows = db.session.query(Content, ranked.c.overall_rank, ranked.c.category_rank)\
+            .join(ranked, Content.id == ranked.c.id)\
+            .outerjoin(Category, Content.category_id == Category.id)\
+            .options(contains_eager(Content.category))\
+            .filter(or_(
+                ranked.c.overall_rank <= featured_limit,
+                and_(ranked.c.category_rank <= per_category, Category.is_active == True)
+            ))\
+            .order_by(Content.published_at.desc(), Content.id.desc())\
+            .all()
+        
+        featured_content = []
+        content_by_category = {}
+        categories = {}
+        for content, overall_rank, category_rank in rows:
+            if overall_rank <= featured_limit:
+                featured_content.append(content)
+            category = content.category
+            if category is not None and category.is_active and category_rank <= per_category:
+                categories[category.id] = category
+                content_by_category.setdefault(category.slug, []).append(content)
+        
+        return {
+            'featured_content': featured_content,
+            'categories': sorted(categories.values(), key=lambda c: (c.sort_order or 0, c.name)),
+            'content_by_category': content_by_category
+        }
+    
+    @staticmethod
+    def get_published_state():
+        """(latest published_at, latest updated_at, count) of published content"""
+        return db.session.query(
+            func.max(Content.published_at), func.max(Content.updated_at), func.count(Content.id)
+        ).filter(Content.status == 'published').one()
+    
+    @staticmethod
+    def get_detail_state(slug, related_limit=3):
+        """Validators of a published article and its related block, or None.
+
+        (id, updated_at, published_at, related lists computed_at, latest
+        updated_at of the listed neighbours, latest updated_at and
+        published_at in the category). The category pair is only set when
+        fewer than ``related_limit`` neighbours are precomputed, since only
+        then does get_related top the list up from the category.
+        """
+        from sqlalchemy import case
+        from sqlalchemy.orm import aliased
+        from app.models.related import RelatedContent
+        neighbour = aliased(Content)
+        related_at = db.session.query(func.max(RelatedContent.computed_at))\
+            .filter(RelatedContent.content_id == Content.id).scalar_subquery()
+        related_count = db.session.query(func.count(RelatedContent.related_id))\
+            .filter(RelatedContent.content_id == Content.id).scalar_subquery()
+        neighbours_updated = db.session.query(func.max(neighbour.updated_at))\
+            .join(RelatedContent, RelatedContent.related_id == neighbour.id)\
+            .filter(RelatedContent.content_id == Content.id).scalar_subquery()
+        
+        def category_latest(column):
+            latest = db.session.query(func.max(column))\
+                .filter(neighbour.category_id == Content.category_id, neighbour.status == 'published',
+                        neighbour.id != Content.id).scalar_subquery()
+            return case((related_count < related_limit, latest), else_=None)
+        
+        return db.session.query(
+            Content.id, Content.updated_at, Content.published_at, related_at, neighbours_updated,
+            category_latest(neighbour.updated_at), category_latest(neighbour.published_at)
+        ).filter(Content.slug == slug, Content.status == 'published').first()
+    
+    @staticmethod
+    def get_category_state(slug):
+        """(category id, latest updated_at, latest published_at, count) of an active category's published content, or None"""
+        return db.session.query(
+            Category.id, func.max(Content.updated_at), func.max(Content.published_at), func.count(Content.id)
+        ).outerjoin(Content, and_(Content.category_id == Category.id, Content.status == 'published'))\
+            .filter(Category.slug == slug, Category.is_active == True)\
+            .group_by(Category.id).first()
+    
+    @staticmethod
+    def get_latest_summaries(limit=10):
+        """Newest published items as plain dicts, without loading ORM objects"""
+        rows = db.session.query(
+            Content.id, Content.title, Content.slug, Content.published_at,
+            Category.name.label('category_name'), Category.slug.label('category_slug')
+        ).outerjoin(Category, Content.category_id == Category.id)\
+            .filter(Content.status == 'published')\
+            .order_by(Content.published_at.desc(), Content.id.desc())\
+            .limit(limit).all()
+        return [{
+            'id': row.id,
+            'title': row.title,
+            'slug': row.slug,
+            'published_at': row.published_at.isoformat() if row.published_at else None,
+            'category': {'name': row.category_name, 'slug': row.category_slug} if row.category_slug else None
+        } for row in rows]
+    
+    @staticmethod
+    def get_category_page(category_id, cursor=None, per_page=10):
+        """One keyset page of a category's published content, newest first"""
+        from app.core.pagination import keyset_paginate
+        return keyset_paginate(
+            Content.query.filter_by(category_id=category_id, status='published'),
+            [Content.published_at.desc(), Content.id.desc()],
+            per_page=per_page, cursor=cursor
         )
-        match = youtube_regex.match(self.youtube_url)
-        return match.group(6) if match else None
+    
+    def get_related(self, limit=3):
+        """Precomputed related articles (see app.core.related), topped up with the
+        latest of the same category when the list is short or not computed yet"""
+        from app.models.related import RelatedContent
+        related = Content.query.join(RelatedContent, RelatedContent.related_id == Content.id)\
+            .filter(RelatedContent.content_id == self.id, Content.status == 'published')\
+            .order_by(RelatedContent.rank)\
+            .limit(limit).all()
+        if len(related) < limit and self.category_id is not None:
+            exclude = [self.id] + [item.id for item in related]
+            related += Content.query.filter(Content.category_id == self.category_id,
+                                            Content.status == 'published', Content.id.notin_(exclude))\
+                .order_by(Content.published_at.desc(), Content.id.desc())\
+                .limit(limit - len(related)).all()
+        return related
+    
+    @property
+    def rendered(self):
+        """Sanitized body, plain-text excerpt, word count, reading time and YouTube ID"""
+        from app.core.render import get_rendered
+        return get_rendered(self)
+    
+    def get_youtube_embed_id(self):
+        """Extract YouTube video ID for embedding"""
+        return self.rendered.youtube_id
     
     def to_dict(self):
         """Convert content to dictionary with safe string handling"""
@@ -0,0 +1,17 @@
+from app import db
+
+class ContentCounter(db.Model):
+    """Number of content rows per status, kept up to date on every write (see app.core.counters)
+
+    scope is 'status' (key_id 0), 'category', 'author' or 'reviewer' (key_id
+    is then the category or user id).
+    """
+    __tablename__ = 'content_counters'
+
+    scope = db.Column(db.String(16), primary_key=True)
+    key_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    status = db.Column(db.String(20), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<ContentCounter {self.scope}:{self.key_id}:{self.status}={self.count}>'
@@ -0,0 +1,32 @@
+from datetime import datetime
+from app import db
+
+class RelatedContent(db.Model):
+    """Precomputed nearest neighbours of a published article (see app.core.related)"""
+    __tablename__ = 'related_content'
+
+    content_id = db.Column(db.Integer, db.ForeignKey('content.id', ondelete='CASCADE'), primary_key=True)
+    rank = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    # No foreign key: rows pointing at a deleted article are how its neighbours are found again
+    related_id = db.Column(db.Integer, nullable=False, index=True)
+    score = db.Column(db.Float, nullable=False)
+    computed_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<RelatedContent {self.content_id}#{self.rank} -> {self.related_id}>'
+
+class ContentSignature(db.Model):
+    """MinHash signature of a published article"""
+    __tablename__ = 'content_signatures'
+
+    content_id = db.Column(db.Integer, db.ForeignKey('content.id', ondelete='CASCADE'), primary_key=True)
+    signature = db.Column(db.LargeBinary, nullable=False)
+
+class ContentLshBand(db.Model):
+    """Locality-sensitive hashing bucket of one signature band, used to find candidates"""
+    __tablename__ = 'content_lsh_bands'
+
+    band = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    bucket = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    content_id = db.Column(db.Integer, db.ForeignKey('content.id', ondelete='CASCADE'),
+                           primary_key=True, index=True)
@@ -0,0 +1,30 @@
+from app import db
+
+class DailyContentStat(db.Model):
+    """Content created, published and rejected per day, category and author (see app.core.rollups)"""
+    __tablename__ = 'daily_content_stats'
+
+    day = db.Column(db.Date, primary_key=True)
+    # 0 for content without a category
+    category_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    author_id = db.Column(db.Integer, primary_key=True, autoincrement=False, index=True)
+    created = db.Column(db.Integer, nullable=False, default=0)
+    published = db.Column(db.Integer, nullable=False, default=0)
+    rejected = db.Column(db.Integer, nullable=False, default=0)
+
+class DailyReviewStat(db.Model):
+    """Reviews (approvals and rejections) per day and reviewer"""
+    __tablename__ = 'daily_review_stats'
+
+    day = db.Column(db.Date, primary_key=True)
+    reviewer_id = db.Column(db.Integer, primary_key=True, autoincrement=False, index=True)
+    published = db.Column(db.Integer, nullable=False, default=0)
+    rejected = db.Column(db.Integer, nullable=False, default=0)
+
+class DailyContentViews(db.Model):
+    """Views per day and content item"""
+    __tablename__ = 'daily_content_views'
+
+    day = db.Column(db.Date, primary_key=True)
+    content_id = db.Column(db.Integer, primary_key=True, autoincrement=False, index=True)
+    views = db.Column(db.Integer, nullable=False, default=0)
@@ -16,32 +16,39 @@ class Setting(db.Model):
     def __repr__(self):
         return f'<Setting {self.key}>'
     
+    @staticmethod
+    def parse_value(value, type, default=None):
+        """Convert a stored value based on its type"""
+        if type == 'integer':
+            try:
+                return int(value)
+            except (ValueError, TypeError):
+                return default
+        elif type == 'boolean':
+            return (value or '').lower() in ['true', '1', 'yes', 'on']
+        elif type == 'json':
+            try:
+                import json
+                return json.loads(value)
+            except (ValueError, TypeError):
+                return default
+        else:
+            return value
+    
     @staticmethod
     def get_value(key, default=None):
         """Get setting value by key"""
         setting = Setting.query.filter_by(key=key).first()
         if setting:
-            # Convert value based on type
-            if setting.type == 'integer':
-                try:
-                    return int(setting.value)
-                except (ValueError, TypeError):
-                    return default
-            elif setting.type == 'boolean':
-                return setting.value.lower() in ['true', '1', 'yes', 'on']
-            elif setting.type == 'json':
-                try:
-                    import json
-                    return json.loads(setting.value)
-                except (ValueError, TypeError):
-                    return default
-            else:
-                return setting.value
+            return Setting.parse_value(setting.value, setting.type, default)
         return default
     
     @staticmethod
     def set_value(key, value, type='string', description=None, is_public=False):
         """Set setting value"""
+        from app.core.signals import mark_public_content_changed
+        mark_public_content_changed(settings_changed=True)
+        
         setting = Setting.query.filter_by(key=key).first()
         if setting:
             setting.value = str(value)
@@ -62,11 +69,37 @@ class Setting(db.Model):
         
         return setting
     
+    @staticmethod
+    def set_values(values):
+        """Set several settings at once: {key: (value, type, description, is_public)}"""
+        from app.core.signals import mark_public_content_changed
+        mark_public_content_changed(settings_changed=True)
+        
+        existing = {s.key: s for s in Setting.query.filter(Setting.key.in_(list(values))).all()}
+        now = datetime.utcnow()
+        for key, (value, type, description, is_public) in values.items():
+            setting = existing.get(key)
+            if setting:
+                setting.value = str(value)
+                setting.type = type
+                if description:
+                    setting.description = description
+                setting.is_public = is_public
+                setting.updated_at = now
+            else:
+                db.session.add(Setting(
+                    key=key,
+                    value=str(value),
+                    type=type,
+                    description=description,
+                    is_public=is_public
+                ))
+    
     @staticmethod
     def get_public_settings():
         """Get all public settings"""
         settings = Setting.query.filter_by(is_public=True).all()
-        return {s.key: Setting.get_value(s.key) for s in settings}
+        return {s.key: Setting.parse_value(s.value, s.type) for s in settings}
     
     @staticmethod
     def insert_default_settings():
@@ -236,19 +236,20 @@ function getSearchSuggestions(query) {
         q: query
     }).done(function(data) {
         if (data.suggestions && data.suggestions.length > 0) {
-            let suggestions = '<ul class="list-group">';
+            // Titles and names are set as text, never parsed as HTML
+            const list = $('<ul class="list-group"></ul>');
             data.suggestions.forEach(function(suggestion) {
-                suggestions += `
-                    <li class="list-group-item list-group-item-action">
-                        <a href="/content/${suggestion.slug}" class="text-decoration-none">
-                            ${suggestion.title}
-                        </a>
-                    </li>
-                `;
+                let href = suggestion.url || '/content/' + encodeURIComponent(suggestion.slug);
+                if (href.charAt(0) !== '/' || href.charAt(1) === '/') {
+                    href = '#';
+                }
+                const link = $('<a class="text-decoration-none"></a>')
+                    .attr('href', href)
+                    .text(suggestion.title);
+                list.append($('<li class="list-group-item list-group-item-action"></li>').append(link));
             });
-            suggestions += '</ul>';
             
-            $('#search-suggestions').html(suggestions).show();
+            $('#search-suggestions').empty().append(list).show();
         } else {
             $('#search-suggestions').hide();
         }
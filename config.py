@@ -12,7 +12,18 @@ class Config:
     # File upload settings
     UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app', 'static', 'uploads')
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
-    ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'pdf', 'doc', 'docx'}
+    ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp', 'pdf', 'doc', 'docx'}
+    
+    # Uploaded images: checked before saving, then resized in a process pool
+    # into card/hero widths (JPEG + WebP) and a cropped link preview image
+    IMAGE_MAX_BYTES = 10 * 1024 * 1024
+    IMAGE_MAX_PIXELS = 40_000_000  # larger images are refused before decoding
+    IMAGE_WIDTHS = {'card': 480, 'hero': 1280}
+    IMAGE_OG_SIZE = (1200, 630)
+    IMAGE_QUALITY = 82
+    IMAGE_ORIGINAL_QUALITY = 90  # uploads are re-encoded without their EXIF
+    IMAGE_PROCESSES = int(os.environ.get('IMAGE_PROCESSES') or 2)
+    IMAGE_PROCESSING_ASYNC = True
     
     # Security settings
     WTF_CSRF_TIME_LIMIT = None
@@ -31,6 +42,77 @@ class Config:
     
     # Rate limiting
     RATELIMIT_STORAGE_URL = os.environ.get('REDIS_URL') or 'redis://localhost:6379'
+    
+    # Caching (shared by all workers on this host)
+    CACHE_DIR = os.environ.get('CACHE_DIR')  # defaults to <instance>/cache
+    PUBLIC_PAGE_CACHE = os.environ.get('PUBLIC_PAGE_CACHE', 'false').lower() in ['true', 'on', '1']
+    PUBLIC_PAGE_CACHE_TIMEOUT = int(os.environ.get('PUBLIC_PAGE_CACHE_TIMEOUT') or 300)
+    PUBLIC_PAGE_CACHE_STALE_TIMEOUT = int(os.environ.get('PUBLIC_PAGE_CACHE_STALE_TIMEOUT') or 3600)
+    PUBLIC_PAGE_CACHE_MAX_ENTRIES = 512
+    MEMO_MAX_ENTRIES = 1024  # memoized page states (ETags) per worker, least recently used dropped
+    # Cache-Control of pages answering conditional requests (app.core.http_cache)
+    PUBLIC_CACHE_CONTROL = os.environ.get('PUBLIC_CACHE_CONTROL') or 'public, no-cache'
+    STAFF_CACHE_CONTROL = 'private, no-cache'
+    
+    # Full-text search: 'auto' picks tsvector (PostgreSQL) or FTS5 (SQLite), 'like' disables it,
+    # 'bm25' uses the in-process index under BM25_INDEX_DIR (build it with `flask search-reindex`)
+    SEARCH_BACKEND = os.environ.get('SEARCH_BACKEND') or 'auto'
+    BM25_INDEX_DIR = os.environ.get('BM25_INDEX_DIR')  # defaults to <CACHE_DIR>/bm25
+    BM25_COMPACT_THRESHOLD = 1000  # journal entries before a background compaction
+    BM25_COMPACT_ASYNC = True
+    BM25_MAX_RESULTS = 200  # ranked in SQL with a CASE, so keep it modest
+    SEARCH_SUGGESTIONS_MAX_AGE = 60
+    
+    # Related content lists are refreshed on a background thread after publish events
+    RELATED_CONTENT_ASYNC = True
+    
+    # Feeds and sitemaps (cached under <CACHE_DIR>/feeds)
+    FEED_SIZE = 20
+    SITEMAP_SHARD_SIZE = 10000  # articles per sitemap-N.xml, by id range
+    
+    # Pre-rendered public site served by nginx (`flask export-static`); with
+    # STATIC_EXPORT_ON_PUBLISH, publish events re-render the affected pages
+    STATIC_EXPORT_DIR = os.environ.get('STATIC_EXPORT_DIR')  # defaults to <instance>/static_site
+    STATIC_EXPORT_BASE_URL = os.environ.get('STATIC_EXPORT_BASE_URL') or 'http://localhost'
+    STATIC_EXPORT_ON_PUBLISH = os.environ.get('STATIC_EXPORT_ON_PUBLISH', 'false').lower() in ['true', 'on', '1']
+    STATIC_EXPORT_PROCESSES = None
+    STATIC_EXPORT_ASYNC = True
+    
+    # Long staff listings (content, audit log) can be streamed while their
+    # rows are fetched (opt-in: buffering proxies must pass chunks through);
+    # per_page can be raised up to LISTING_MAX_PER_PAGE
+    STREAM_LISTINGS = os.environ.get('STREAM_LISTINGS', 'false').lower() in ['true', 'on', '1']
+    STREAM_BUFFER_SIZE = 8192  # characters per chunk sent to the client
+    LISTING_MAX_PER_PAGE = 500
+    # Filtered listing counts are reused for this many seconds (0 counts every time)
+    PAGINATION_COUNT_CACHE_TIMEOUT = int(os.environ.get('PAGINATION_COUNT_CACHE_TIMEOUT') or 30)
+    PAGINATION_COUNT_CACHE_MAX_ENTRIES = 1024
+    
+    # Bulk actions on content run one statement per chunk of ids; files of
+    # deleted content are removed on a background thread
+    BULK_ACTION_CHUNK_SIZE = 500
+    FILE_CLEANUP_ASYNC = True
+    
+    # Day ranges offered on the analytics pages (read from the daily rollups);
+    # the last one is the default
+    ANALYTICS_RANGES = (7, 30, 90, 365)
+    
+    # Compiled templates are cached on disk (<CACHE_DIR>/jinja by default);
+    # TEMPLATE_PREWARM compiles all of them when a gunicorn worker boots
+    JINJA_BYTECODE_CACHE = True
+    JINJA_BYTECODE_CACHE_DIR = os.environ.get('JINJA_BYTECODE_CACHE_DIR')
+    TEMPLATE_PREWARM = os.environ.get('TEMPLATE_PREWARM', 'true').lower() in ['true', 'on', '1']
+    
+    # Audit events: 'async' queues them after the commit for a background
+    # writer; 'transaction' writes them in the transaction of the change
+    AUDIT_LOG_MODE = os.environ.get('AUDIT_LOG_MODE') or 'async'
+    AUDIT_LOG_QUEUE_SIZE = int(os.environ.get('AUDIT_LOG_QUEUE_SIZE') or 10000)
+    AUDIT_LOG_BATCH_SIZE = 200
+    AUDIT_LOG_FLUSH_INTERVAL = int(os.environ.get('AUDIT_LOG_FLUSH_INTERVAL') or 2)
+    
+    # Buffered view counts are written every N seconds or after N views
+    VIEW_COUNTER_FLUSH_INTERVAL = int(os.environ.get('VIEW_COUNTER_FLUSH_INTERVAL') or 10)
+    VIEW_COUNTER_FLUSH_THRESHOLD = int(os.environ.get('VIEW_COUNTER_FLUSH_THRESHOLD') or 500)
 
 class DevelopmentConfig(Config):
     """Development configuration"""
@@ -48,6 +130,9 @@ class ProductionConfig(Config):
     SESSION_COOKIE_HTTPONLY = True
     SESSION_COOKIE_SAMESITE = 'Lax'
     
+    # Templates only change on deploy; skip the per-render source mtime check
+    TEMPLATES_AUTO_RELOAD = False
+    
     # Logging
     LOG_TO_STDOUT = os.environ.get('LOG_TO_STDOUT')
 
@@ -55,6 +140,12 @@ class TestingConfig(Config):
     """Testing configuration"""
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    RELATED_CONTENT_ASYNC = False
+    STATIC_EXPORT_ASYNC = False
+    IMAGE_PROCESSING_ASYNC = False
+    FILE_CLEANUP_ASYNC = False
+    BM25_COMPACT_ASYNC = False
+    AUDIT_LOG_MODE = 'transaction'
     WTF_CSRF_ENABLED = False
 
 config = {
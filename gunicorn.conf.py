@@ -0,0 +1,44 @@
+# Gunicorn settings for CMS Desa (loaded automatically from the project root)
+import os
+
+# With GUNICORN_PRELOAD the app is created, and its templates compiled, once in
+# the master; forked workers share that memory instead of compiling again
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'false').lower() in ['true', 'on', '1']
+
+def _prewarm(app, log):
+    if app is None or not app.config.get('TEMPLATE_PREWARM'):
+        return
+    from app.core.templates import prewarm_templates
+    compiled, seconds = prewarm_templates(app)
+    log.info(f'Compiled {compiled} templates in {seconds:.2f}s')
+
+def when_ready(server):
+    """Compile templates in the master before the first fork"""
+    if server.cfg.preload_app:
+        _prewarm(server.app.wsgi(), server.log)
+
+def post_fork(server, worker):
+    """Don't share database connections opened in the master"""
+    if server.cfg.preload_app:
+        app = server.app.wsgi()
+        from app import db
+        with app.app_context():
+            db.engine.dispose(close=False)
+
+def post_worker_init(worker):
+    """Compile templates before the worker accepts its first request"""
+    if not worker.cfg.preload_app:
+        _prewarm(getattr(worker, 'wsgi', None), worker.log)
+
+def worker_exit(server, worker):
+    """Write buffered data before a worker goes away"""
+    app = getattr(worker, 'wsgi', None)
+    extensions = getattr(app, 'extensions', {})
+    
+    view_counter = extensions.get('view_counter')
+    if view_counter is not None:
+        view_counter.shutdown()
+    
+    audit_writer = extensions.get('audit_writer')
+    if audit_writer is not None:
+        audit_writer.shutdown()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Helper bersama untuk script benchmark CMS Desa
+"""
+
+import os
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event
+from app import create_app, db
+from app.models.user import User, Role
+from app.models.content import Content, Category
+
+def make_app(database_url=None):
+    """Create a testing app backed by a temporary SQLite file (or DATABASE_URL)"""
+    app = create_app('testing')
+    if database_url:
+        app.config['SQLALCHEMY_DATABASE_URI'] = database_url
+    else:
+        db_fd, db_path = tempfile.mkstemp(suffix='.db')
+        os.close(db_fd)
+        app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
+    return app
+
+def seed_content(categories=5, per_category=10, body_words=200):
+    """Seed roles, one author, categories and published content"""
+    db.create_all()
+    
+    role = Role.query.filter_by(name='publisher').first()
+    if not role:
+        role = Role(name='publisher', description='Publisher', permissions={'content': ['create', 'read', 'update']})
+        db.session.add(role)
+        db.session.flush()
+    
+    author = User.query.filter_by(username='bench_author').first()
+    if not author:
+        author = User(username='bench_author', email='bench@test.com', full_name='Bench Author', role_id=role.id)
+        author.set_password('password123')
+        db.session.add(author)
+        db.session.flush()
+    
+    words = ('desa pembangunan warga kegiatan gotong royong posyandu jalan irigasi '
+             'pertanian musyawarah dana bantuan sosial kesehatan pendidikan').split()
+    start = Category.query.count()
+    now = datetime.utcnow()
+    rows = []
+    for c in range(start, start + categories):
+        category = Category(name=f'Kategori {c}', slug=f'kategori-{c}', sort_order=c)
+        db.session.add(category)
+        db.session.flush()
+        for i in range(per_category):
+            body = ' '.join(words[(i + j) % len(words)] for j in range(body_words))
+            rows.append({
+                'title': f'Artikel {c}-{i} {words[i % len(words)]}',
+                'slug': f'artikel-{c}-{i}',
+                'content': f'<p>{body}</p>',
+                'excerpt': body[:150],
+                'status': 'published',
+                'author_id': author.id,
+                'category_id': category.id,
+                'view_count': 0,
+                'content_metadata': {},
+                'published_at': now - timedelta(minutes=c * per_category + i),
+                'created_at': now - timedelta(minutes=c * per_category + i),
+                'updated_at': now - timedelta(minutes=c * per_category + i)
+            })
+    if rows:
+        db.session.execute(Content.__table__.insert(), rows)
+    db.session.commit()
+
+@contextmanager
+def count_queries():
+    """Count SQL statements executed inside the block"""
+    counter = {'count': 0}
+    
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        counter['count'] += 1
+    
+    engine = db.engine
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+def timed(func, repeat=20):
+    """Return average milliseconds per call"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) * 1000 / repeat
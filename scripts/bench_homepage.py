@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+"""
+Benchmark halaman beranda: jumlah query dan waktu render saat kategori bertambah
+"""
+
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from bench_common import make_app, seed_content, count_queries, timed
+
+def main():
+    app = make_app(os.environ.get('BENCH_DATABASE_URL'))
+    client = app.test_client()
+    
+    with app.app_context():
+        print(f"{'categories':>10} {'queries':>8} {'ms/request':>11}")
+        total = 0
+        for step in (1, 4, 5, 10, 20):
+            seed_content(categories=step, per_category=10)
+            total += step
+            with count_queries() as counter:
+                response = client.get('/')
+            assert response.status_code == 200
+            ms = timed(lambda: client.get('/'))
+            print(f"{total:>10} {counter['count']:>8} {ms:>11.2f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Benchmark halaman daftar konten staf: entitas ORM penuh dibandingkan proyeksi kolom
+"""
+
+import argparse
+import os
+import sys
+import tracemalloc
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from bench_common import make_app, seed_content, timed
+from sqlalchemy.orm import joinedload
+from app import db
+from app.models.content import Content
+from app.models.user import User
+from app.core.read_models import content_rows
+
+def orm_page(rows):
+    """Before: full entities with their author, role, category and reviewer"""
+    return Content.query.options(
+        joinedload(Content.author).joinedload(User.role), joinedload(Content.category),
+        joinedload(Content.reviewer)
+    ).order_by(Content.created_at.desc(), Content.id.desc()).limit(rows).all()
+
+def projected_page(rows):
+    """After: ContentRow projections"""
+    return content_rows(Content.query.order_by(Content.created_at.desc(), Content.id.desc()), limit=rows)
+
+def peak_kib(func):
+    """Peak memory allocated while building a page, with an empty identity map"""
+    db.session.expunge_all()
+    tracemalloc.start()
+    page = func()
+    _current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del page
+    return peak / 1024
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--body-words', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    app = make_app(os.environ.get('BENCH_DATABASE_URL'))
+    with app.app_context():
+        seed_content(categories=10, per_category=100, body_words=args.body_words)
+
+        print(f"{'rows':>6} {'orm ms':>9} {'rows ms':>9} {'orm KiB':>10} {'rows KiB':>10}")
+        for rows in (20, 100, 1000):
+            # Compile both statements before timing
+            orm_page(rows), projected_page(rows)
+            orm_ms = timed(lambda: (db.session.expunge_all(), orm_page(rows)), repeat=args.repeat)
+            rows_ms = timed(lambda: (db.session.expunge_all(), projected_page(rows)), repeat=args.repeat)
+            orm_kib = peak_kib(lambda: orm_page(rows))
+            rows_kib = peak_kib(lambda: projected_page(rows))
+            print(f'{rows:>6} {orm_ms:>9.2f} {rows_ms:>9.2f} {orm_kib:>10.0f} {rows_kib:>10.0f}')
+
+if __name__ == '__main__':
+    main()
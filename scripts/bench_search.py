@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Benchmark pencarian: LIKE dibandingkan indeks BM25 in-process pada korpus besar
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from bench_common import make_app, seed_content, timed
+from app import db
+from app.models.content import Content, Category
+from app.models.user import User
+from app.core.search import apply_search, rebuild_index
+from app.core.bm25 import get_index
+
+QUERIES = ['pembangunan jalan', 'posyandu', 'bantuan sosial desa', 'musyawarah warga irigasi', 'kata0042']
+
+def seed_corpus(documents, body_words, batch_size=5000):
+    """Published content drawn from a Zipf-like vocabulary so posting lists vary in length"""
+    seed_content(categories=10, per_category=0)
+    rng = random.Random(42)
+    base = ('desa pembangunan warga kegiatan gotong royong posyandu jalan irigasi '
+            'pertanian musyawarah dana bantuan sosial kesehatan pendidikan').split()
+    vocabulary = base + [f'kata{i:04d}' for i in range(5000)]
+    weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+    author_id = User.query.filter_by(username='bench_author').first().id
+    category_ids = [category.id for category in Category.query.all()]
+    now = datetime.utcnow()
+
+    for start in range(0, documents, batch_size):
+        rows = []
+        for i in range(start, min(start + batch_size, documents)):
+            body = ' '.join(rng.choices(vocabulary, weights, k=body_words))
+            rows.append({
+                'title': ' '.join(rng.choices(vocabulary, weights, k=6)),
+                'slug': f'bench-{i}',
+                'content': f'<p>{body}</p>',
+                'excerpt': body[:150],
+                'status': 'published',
+                'author_id': author_id,
+                'category_id': category_ids[i % len(category_ids)],
+                'view_count': 0,
+                'content_metadata': {},
+                'published_at': now - timedelta(minutes=i),
+                'created_at': now - timedelta(minutes=i),
+                'updated_at': now - timedelta(minutes=i)
+            })
+        db.session.execute(Content.__table__.insert(), rows)
+        db.session.commit()
+
+def search_page(query):
+    published = Content.query.filter(Content.status == 'published')
+    results = apply_search(published, query)
+    return results.count(), results.limit(10).all()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--docs', type=int, default=100000)
+    parser.add_argument('--body-words', type=int, default=120)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    app = make_app(os.environ.get('BENCH_DATABASE_URL'))
+    app.config['CACHE_DIR'] = tempfile.mkdtemp(prefix='bench-search-')
+
+    with app.app_context():
+        print(f'Seeding {args.docs} documents...')
+        seed_corpus(args.docs, args.body_words)
+
+        app.config['SEARCH_BACKEND'] = 'bm25'
+        start = time.perf_counter()
+        rebuild_index()
+        build_seconds = time.perf_counter() - start
+        index = get_index()
+        size_mb = os.path.getsize(index.segment_path) / 1024 / 1024
+        print(f'BM25 build: {build_seconds:.1f}s, segment {size_mb:.1f} MB')
+
+        print(f"{'query':<28} {'like ms':>9} {'bm25 ms':>9} {'engine ms':>10} {'hits':>7}")
+        for query in QUERIES:
+            app.config['SEARCH_BACKEND'] = 'like'
+            like_ms = timed(lambda: search_page(query), repeat=args.repeat)
+            app.config['SEARCH_BACKEND'] = 'bm25'
+            bm25_ms = timed(lambda: search_page(query), repeat=args.repeat)
+            engine_ms = timed(lambda: (index._results.clear(), index.search(query)), repeat=args.repeat)
+            hits = search_page(query)[0]
+            print(f'{query:<28} {like_ms:>9.1f} {bm25_ms:>9.1f} {engine_ms:>10.1f} {hits:>7}')
+
+        # Incremental update: one journal append, no rebuild
+        from app.core.signals import mark_public_content_changed
+        content = Content.query.order_by(Content.id).first()
+        content.title = 'Peresmian jembatan gantung'
+        mark_public_content_changed(content)
+        start = time.perf_counter()
+        db.session.commit()
+        print(f'Incremental update: {(time.perf_counter() - start) * 1000:.1f} ms, '
+              f'found={any(doc_id == content.id for doc_id, _ in index.search("jembatan"))}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Benchmark worker dingin: waktu boot dan time-to-first-byte halaman utama tiap blueprint
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# (blueprint, url, user logged in for the request)
+PAGES = [
+    ('public', '/', None),
+    ('auth', '/auth/login', None),
+    ('admin', '/admin/dashboard', 'bench_admin'),
+    ('editor', '/editor/dashboard', 'bench_editor'),
+    ('publisher', '/publisher/dashboard', 'bench_author'),
+]
+
+# lazy: compile on first request (no bytecode cache); bytecode: load compiled
+# templates from disk; prewarm: bytecode cache plus compiling everything at boot
+MODES = ('lazy', 'bytecode', 'prewarm')
+
+def make_app(database_url):
+    """Testing app on a database file every benchmark process can open"""
+    from config import config
+    from app import create_app
+    # Flask-SQLAlchemy creates the engine in create_app, so set the URL beforehand
+    config['testing'].SQLALCHEMY_DATABASE_URI = database_url
+    return create_app('testing')
+
+def seed(database_url):
+    from bench_common import seed_content
+    from app import db
+    from app.models.user import User, Role
+    app = make_app(database_url)
+    with app.app_context():
+        seed_content(categories=5, per_category=20)
+        for name in ('admin', 'editor'):
+            role = Role(name=name, description=name.title(), permissions={})
+            db.session.add(role)
+            db.session.flush()
+            user = User(username=f'bench_{name}', email=f'bench_{name}@test.com',
+                        full_name=f'Bench {name.title()}', role_id=role.id)
+            user.set_password('password123')
+            db.session.add(user)
+        db.session.commit()
+
+def child(mode, url, username):
+    """Boot one app and time its first request; prints JSON for the parent"""
+    start = time.perf_counter()
+    from app.core.templates import prewarm_templates
+    app = make_app(os.environ['BENCH_DATABASE_URL'])
+    if mode == 'lazy':
+        app.jinja_env.bytecode_cache = None
+    elif mode == 'prewarm':
+        prewarm_templates(app)
+    boot_ms = (time.perf_counter() - start) * 1000
+
+    client = app.test_client()
+    with app.app_context():
+        if username:
+            client.post('/auth/login', data={'username': username, 'password': 'password123'})
+        start = time.perf_counter()
+        response = client.get(url)
+        ttfb_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        client.get(url)
+        warm_ms = (time.perf_counter() - start) * 1000
+    print(json.dumps({'boot': boot_ms, 'ttfb': ttfb_ms, 'warm': warm_ms, 'status': response.status_code}))
+
+def run_child(env, *args):
+    output = subprocess.run([sys.executable, os.path.abspath(__file__), *args],
+                            env=env, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--child', nargs=3, metavar=('MODE', 'URL', 'USER'), help=argparse.SUPPRESS)
+    parser.add_argument('--compile', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--repeat', type=int, default=3, help='Cold workers started per page and mode.')
+    args = parser.parse_args()
+
+    if args.compile:
+        from app.core.templates import prewarm_templates
+        compiled, seconds = prewarm_templates(make_app(os.environ['BENCH_DATABASE_URL']))
+        print(json.dumps({'compiled': compiled, 'seconds': seconds}))
+        return
+    if args.child:
+        mode, url, username = args.child
+        child(mode, url, None if username == '-' else username)
+        return
+
+    workdir = tempfile.mkdtemp(prefix='bench-startup-')
+    env = dict(os.environ)
+    env.setdefault('BENCH_DATABASE_URL', f"sqlite:///{os.path.join(workdir, 'bench.db')}")
+    env['CACHE_DIR'] = os.path.join(workdir, 'cache')
+    env['JINJA_BYTECODE_CACHE_DIR'] = os.path.join(workdir, 'jinja')
+    os.environ.update(env)
+    seed(env['BENCH_DATABASE_URL'])
+    compiled = run_child(env, '--compile')
+    print(f"Bytecode cache: {compiled['compiled']} templates compiled in {compiled['seconds'] * 1000:.0f} ms\n")
+
+    print(f"{'blueprint':<10} {'mode':<9} {'boot ms':>8} {'ttfb ms':>8} {'warm ms':>8} {'status':>7}")
+    for blueprint, url, username in PAGES:
+        for mode in MODES:
+            runs = [run_child(env, '--child', mode, url, username or '-') for _ in range(args.repeat)]
+            best = min(runs, key=lambda run: run['ttfb'])
+            print(f"{blueprint:<10} {mode:<9} {best['boot']:>8.1f} {best['ttfb']:>8.1f} "
+                  f"{best['warm']:>8.1f} {best['status']:>7}")
+
+if __name__ == '__main__':
+    main()
@@ -10,6 +10,14 @@ from app.models.user import User, Role
 from app.models.content import Content, Category
 from app.models.setting import Setting
 
+@pytest.fixture(autouse=True)
+def isolated_cache_dir(tmp_path, monkeypatch):
+    """Keep versions, feeds and compiled templates of each test in its own directory"""
+    from config import config
+    cache_dir = tmp_path / 'instance_cache'
+    monkeypatch.setattr(config['testing'], 'CACHE_DIR', str(cache_dir))
+    return cache_dir
+
 @pytest.fixture
 def app():
     """Create application for testing"""
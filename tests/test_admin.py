@@ -260,4 +260,602 @@ class TestDashboardStats:
         
         response = client.get('/admin/dashboard')
         assert response.status_code == 200
-        assert b'Published Content' in response.data
\ No newline at end of file
+        assert b'Published Content' in response.data
+class TestContentCounters:
+    """Test the counters table behind the dashboards"""
+    
+    def _content(self, title, status, author_id, category_id):
+        from app.models.content import Content
+        return Content(title=title, slug=title.lower().replace(' ', '-'), content='<p>Isi</p>',
+                       status=status, author_id=author_id, category_id=category_id)
+    
+    def test_counters_follow_writes(self, app, admin_user):
+        """Test inserts, status and category changes and deletes adjust the counters"""
+        from app.models.content import Content, Category
+        from app.core.counters import get_counts, reconcile_counters
+        with app.app_context():
+            author = User.query.filter_by(username='admin_test').first()
+            first = Category.query.filter_by(slug='test-category').first()
+            second = Category(name='Kedua', slug='kedua')
+            db.session.add(second)
+            db.session.flush()
+            db.session.add_all([self._content('Satu', 'draft', author.id, first.id),
+                                self._content('Dua', 'pending_review', author.id, first.id),
+                                self._content('Tiga', 'published', author.id, second.id)])
+            db.session.commit()
+            
+            # Assigned on an expired object, without loading the old values first
+            content = Content.query.filter_by(title='Dua').first()
+            db.session.commit()
+            content.status = 'published'
+            content.reviewer_id = author.id
+            content.category_id = second.id
+            db.session.commit()
+            db.session.delete(Content.query.filter_by(title='Satu').first())
+            db.session.commit()
+            
+            counts = get_counts(('status', 0), ('category', None), ('author', author.id), ('reviewer', author.id))
+            assert counts.get() == 2 and counts.get(status='published') == 2
+            assert counts.get(status='pending_review') == 0 and counts.get(status='draft') == 0
+            assert counts.by_key('category') == {first.id: 0, second.id: 2}
+            assert counts.get('author', author.id, 'published') == 2
+            assert counts.get('reviewer', author.id) == 1
+            assert reconcile_counters() == 0
+    
+    def test_endpoints_read_counters_and_reconcile_repairs(self, app, client, admin_user, runner):
+        """Test the stats endpoints and the reconcile command"""
+        from app.models.content import Category
+        from app.models.counter import ContentCounter
+        with app.app_context():
+            author = User.query.filter_by(username='admin_test').first()
+            category = Category.query.filter_by(slug='test-category').first()
+            db.session.add_all([self._content(f'Antri {i}', 'pending_review', author.id, category.id)
+                                for i in range(3)])
+            db.session.commit()
+        
+        client.post('/auth/login', data={'username': 'admin_test', 'password': 'password123'})
+        stats = client.get('/admin/api/stats').get_json()
+        assert stats['pending_content'] == 3 and stats['total_content'] == 3 and stats['total_users'] == 1
+        assert client.get('/editor/api/pending-count').get_json() == {'count': 3}
+        
+        with app.app_context():
+            ContentCounter.query.filter_by(scope='status').update({'count': 99})
+            db.session.commit()
+        assert client.get('/editor/api/pending-count').get_json() == {'count': 99}
+        assert 'Corrected 1 content counters' in runner.invoke(args=['counters-reconcile']).output
+        assert client.get('/editor/api/pending-count').get_json() == {'count': 3}
+
+    def test_update_fallback_survives_concurrent_insert(self, app):
+        """Test the UPDATE/INSERT fallback retries the UPDATE when the row appears in between"""
+        from sqlalchemy import event
+        from app.core.counters import _increment_by_update
+        from app.models.counter import ContentCounter
+        table = ContentCounter.__table__
+        rows = [{'scope': 'status', 'key_id': 0, 'status': 'draft', 'count': 2},
+                {'scope': 'status', 'key_id': 0, 'status': 'published', 'count': 3}]
+        
+        def insert_first(conn, cursor, statement, parameters, context, executemany):
+            # Another transaction inserts the draft counter right after our UPDATE missed it
+            if statement.startswith('UPDATE content_counters') and cursor.rowcount == 0 \
+                    and parameters[-1] == 'draft' and not raced:
+                raced.append(True)
+                cursor.connection.cursor().execute(
+                    "INSERT INTO content_counters (scope, key_id, status, count) VALUES ('status', 0, 'draft', 5)")
+        
+        with app.app_context():
+            ContentCounter.query.delete()
+            db.session.commit()
+            raced = []
+            event.listen(db.engine, 'after_cursor_execute', insert_first)
+            try:
+                with db.engine.begin() as connection:
+                    _increment_by_update(connection, table, ('scope', 'key_id', 'status'), ['count'], rows)
+            finally:
+                event.remove(db.engine, 'after_cursor_execute', insert_first)
+            assert raced
+            counts = {row.status: row.count for row in ContentCounter.query.filter_by(scope='status')}
+            assert counts == {'draft': 7, 'published': 3}
+
+class TestAnalyticsRollups:
+    """Test the daily rollups behind the analytics pages"""
+    
+    def _rows(self, model):
+        return sorted(tuple(getattr(row, column.name) for column in model.__table__.columns)
+                      for row in model.query.all())
+    
+    def _workflow(self, app):
+        from datetime import datetime
+        from app.models.content import Content, Category
+        with app.app_context():
+            author = User.query.filter_by(username='publisher_test').first()
+            reviewer = User.query.filter_by(username='editor_test').first()
+            category = Category.query.filter_by(slug='test-category').first()
+            items = [Content(title=f'Rollup {i}', slug=f'rollup-{i}', content='<p>Isi</p>', status='draft',
+                             author_id=author.id, category_id=category.id) for i in range(3)]
+            db.session.add_all(items)
+            db.session.commit()
+            for content in items[:2]:
+                content.status = 'pending_review'
+            db.session.commit()
+            items[0].status = 'published'
+            items[0].reviewer_id = reviewer.id
+            items[0].published_at = datetime.utcnow()
+            items[1].reject(reviewer, 'Kurang lengkap')
+            db.session.commit()
+            
+            counter = app.extensions['view_counter']
+            counter.increment(items[0].id, 5)
+            counter.flush()
+            return author.id, reviewer.id, items[0].id
+    
+    def test_rollups_follow_writes_and_drive_analytics(self, app, client, editor_user, publisher_user):
+        """Test status changes and views land in the rollups and the analytics pages read them"""
+        from datetime import datetime
+        from app.models.rollup import DailyContentStat, DailyReviewStat, DailyContentViews
+        from app.core.rollups import time_bucket, get_created_by_month, get_review_count, get_since
+        author_id, reviewer_id, content_id = self._workflow(app)
+        today = datetime.utcnow().date()
+        with app.app_context():
+            stat = DailyContentStat.query.one()
+            assert (stat.day, stat.author_id, stat.created, stat.published, stat.rejected) == (today, author_id, 3, 1, 1)
+            assert [(r.reviewer_id, r.published, r.rejected) for r in DailyReviewStat.query] == [(reviewer_id, 1, 1)]
+            assert [(r.content_id, r.views) for r in DailyContentViews.query] == [(content_id, 5)]
+            assert db.session.execute(db.select(time_bucket(db.literal(today), 'month'))).scalar() == today.strftime('%Y-%m')
+            assert get_created_by_month(get_since(30)) == [(today.strftime('%Y-%m'), 3)]
+            assert get_review_count(reviewer_id, today) == 2
+        
+        client.post('/auth/login', data={'username': 'editor_test', 'password': 'password123'})
+        response = client.get('/editor/analytics?days=30')
+        assert response.status_code == 200 and b'Test Category' in response.data
+        client.get('/auth/logout')
+        client.post('/auth/login', data={'username': 'publisher_test', 'password': 'password123'})
+        response = client.get('/publisher/analytics')
+        assert response.status_code == 200 and b'5 views' in response.data
+    
+    def test_backfill_rebuilds_history(self, app, runner, editor_user, publisher_user):
+        """Test the backfill command reproduces the incremental rollups"""
+        from app.models.content import Content
+        from app.models.rollup import DailyContentStat, DailyReviewStat, DailyContentViews
+        self._workflow(app)
+        with app.app_context():
+            expected = self._rows(DailyContentStat), self._rows(DailyReviewStat), self._rows(DailyContentViews)
+            # Views counted before the rollups existed
+            Content.query.filter_by(slug='rollup-0').update({'view_count': Content.view_count + 7})
+            DailyContentStat.query.delete()
+            db.session.commit()
+        
+        result = runner.invoke(args=['rollups-backfill', '--batch-size', '2'])
+        assert 'Rebuilt rollups from 3 content rows' in result.output
+        with app.app_context():
+            assert self._rows(DailyContentStat) == expected[0]
+            assert self._rows(DailyReviewStat) == expected[1]
+            assert sum(row.views for row in DailyContentViews.query) == 12
+
+class TestBulkActions:
+    """Test set-based bulk actions on content"""
+    
+    def _create(self, app, statuses):
+        from app.models.content import Content, Category
+        with app.app_context():
+            author = User.query.filter_by(username='admin_test').first()
+            category = Category.query.filter_by(slug='test-category').first()
+            items = [Content(title=f'Massal {i}', slug=f'massal-{i}', content='<p>Isi</p>', status=status,
+                             author_id=author.id, category_id=category.id) for i, status in enumerate(statuses)]
+            db.session.add_all(items)
+            db.session.commit()
+            return [content.id for content in items]
+    
+    def test_bulk_publish_reports_each_item(self, app, client, admin_user):
+        """Test bulk publish skips ineligible items and keeps counters, rollups and audit in step"""
+        from app.models.audit import AuditLog
+        from app.models.rollup import DailyContentStat
+        from app.core.counters import get_counts, reconcile_counters
+        ids = self._create(app, ['draft', 'pending_review', 'published'])
+        
+        client.post('/auth/login', data={'username': 'admin_test', 'password': 'password123'})
+        data = client.post('/admin/content/bulk-action',
+                           json={'action': 'publish', 'content_ids': ids + [9999]}).get_json()
+        assert data['success'] and data['message'] == 'Berhasil publish 2 konten'
+        assert [(r['id'], r['result']) for r in data['results']] == [
+            (ids[0], 'ok'), (ids[1], 'ok'), (ids[2], 'skipped'), (9999, 'not_found')]
+        
+        with app.app_context():
+            assert get_counts(('status', 0)).get(status='published') == 3
+            assert reconcile_counters() == 0
+            assert DailyContentStat.query.one().published == 3
+            logs = AuditLog.query.filter_by(action='admin_bulk_publish').order_by(AuditLog.record_id).all()
+            assert [log.record_id for log in logs] == ids[:2]
+            assert logs[0].old_values == {'status': 'draft', 'published_at': ''}
+            assert set(logs[0].new_values) == {'status', 'published_at'}
+    
+    def test_bulk_delete_in_chunks(self, app, client, admin_user, tmp_path):
+        """Test bulk delete runs a fixed number of statements per chunk and removes cover files"""
+        from sqlalchemy import event
+        from app.models.content import Content, ContentRevision
+        from app.core.counters import reconcile_counters
+        app.config['UPLOAD_FOLDER'] = str(tmp_path)
+        app.config['BULK_ACTION_CHUNK_SIZE'] = 2
+        ids = self._create(app, ['draft', 'published', 'rejected', 'pending_review'])
+        with app.app_context():
+            content = db.session.get(Content, ids[0])
+            content.cover_image = 'sampul.pdf'
+            db.session.add(ContentRevision(content_id=ids[0], title_snapshot='Lama', revised_by=content.author_id))
+            db.session.commit()
+        (tmp_path / 'sampul.pdf').write_bytes(b'%PDF')
+        
+        client.post('/auth/login', data={'username': 'admin_test', 'password': 'password123'})
+        statements = []
+        with app.app_context():
+            listener = lambda *args, **kwargs: statements.append(args[2])
+            event.listen(db.engine, 'before_cursor_execute', listener)
+            try:
+                data = client.post('/admin/content/bulk-action',
+                                   json={'action': 'delete', 'content_ids': ids}).get_json()
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', listener)
+        
+        assert data['success'] and [r['result'] for r in data['results']] == ['ok'] * 4
+        assert sum(1 for sql in statements if sql.startswith('DELETE FROM content ')) == 2
+        assert sum(1 for sql in statements if sql.startswith('INSERT INTO audit_logs')) == 2
+        assert not (tmp_path / 'sampul.pdf').exists()
+        with app.app_context():
+            assert Content.query.count() == 0 and ContentRevision.query.count() == 0
+            assert reconcile_counters() == 0
+
+class TestLoadingProfiles:
+    """Test staff listings load each row's relations without a query per row"""
+    
+    URLS = {
+        'admin_test': ['/admin/dashboard', '/admin/content', '/admin/users'],
+        'editor_test': ['/editor/dashboard', '/editor/review-queue', '/editor/content', '/editor/review-history'],
+        'publisher_test': ['/publisher/dashboard', '/publisher/content', '/publisher/pending', '/publisher/published'],
+    }
+    
+    def _add_rows(self, app, start, count):
+        """Rows with their own author and category each, half pending and half reviewed"""
+        from datetime import datetime
+        from app.models.content import Content, Category
+        with app.app_context():
+            role = Role.query.filter_by(name='publisher').first()
+            reviewer = User.query.filter_by(username='editor_test').first()
+            publisher = User.query.filter_by(username='publisher_test').first()
+            for i in range(start, start + count):
+                author = User(username=f'penulis{i}', email=f'penulis{i}@test.com', full_name=f'Penulis {i}',
+                              role_id=role.id, password_hash='-')
+                category = Category(name=f'Kategori {i}', slug=f'kategori-{i}', color='#123456')
+                db.session.add_all([author, category])
+                db.session.flush()
+                for owner in (author, publisher):
+                    db.session.add_all([
+                        Content(title=f'Antri {owner.id}-{i}', slug=f'antri-{owner.id}-{i}', content='<p>Isi</p>', excerpt='Ringkas',
+                                status='pending_review', author_id=owner.id, category_id=category.id),
+                        Content(title=f'Terbit {owner.id}-{i}', slug=f'terbit-{owner.id}-{i}', content='<p>Isi</p>', excerpt='Ringkas',
+                                status='published', author_id=owner.id, category_id=category.id,
+                                reviewer_id=reviewer.id, published_at=datetime.utcnow()),
+                    ])
+            db.session.commit()
+    
+    def _query_counts(self, app, client):
+        from sqlalchemy import event
+        counts = {}
+        for username, urls in self.URLS.items():
+            client.post('/auth/login', data={'username': username, 'password': 'password123'})
+            for url in urls:
+                assert client.get(url).status_code == 200
+                # Start from an empty identity map, as a fresh request would
+                db.session.remove()
+                statements = []
+                listener = lambda *args, **kwargs: statements.append(args[2])
+                event.listen(db.engine, 'before_cursor_execute', listener)
+                try:
+                    response = client.get(url)
+                    response.get_data()
+                finally:
+                    event.remove(db.engine, 'before_cursor_execute', listener)
+                counts[url] = len(statements)
+            client.get('/auth/logout')
+        return counts
+    
+    def test_listing_query_count_is_independent_of_rows(self, app, client, admin_user, editor_user, publisher_user):
+        """Test every staff listing and dashboard issues the same number of queries for 2 or 5 rows"""
+        self._add_rows(app, 0, 2)
+        few = self._query_counts(app, client)
+        self._add_rows(app, 2, 3)
+        many = self._query_counts(app, client)
+        assert many == few
+
+class TestReadModels:
+    """Test paginated listings read column-only projections"""
+    
+    def test_listing_skips_bodies_and_pages_by_cursor(self, app, client, editor_user):
+        """Test the editor listing never selects bodies and its cursor reaches the next page"""
+        import re
+        from sqlalchemy import event
+        from app.models.content import Content, Category
+        from app.core.read_models import ContentRow, content_rows
+        with app.app_context():
+            author = User.query.filter_by(username='editor_test').first()
+            category = Category.query.filter_by(slug='test-category').first()
+            db.session.add_all([Content(title=f'Proyeksi {i}', slug=f'proyeksi-{i}', content='<p>Isi panjang</p>',
+                                        excerpt='Ringkas', status='draft', author_id=author.id,
+                                        category_id=category.id) for i in range(3)])
+            db.session.commit()
+            rows = content_rows(Content.query.order_by(Content.id), limit=2)
+            assert [type(row) for row in rows] == [ContentRow, ContentRow]
+            assert rows[0].author.role.name == 'editor' and rows[0].category.color == '#007bff'
+            assert rows[0].reviewer is None
+        
+        client.post('/auth/login', data={'username': 'editor_test', 'password': 'password123'})
+        statements = []
+        listener = lambda *args, **kwargs: statements.append(args[2])
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            first = client.get('/editor/content?sort=oldest&per_page=2').get_data(as_text=True)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+        assert 'Proyeksi 0' in first and 'Proyeksi 1' in first and 'Proyeksi 2' not in first
+        listing = [sql for sql in statements if 'FROM content' in sql]
+        assert listing and not any(re.search(r'content\.(content|body_html|content_metadata)\b', sql)
+                                   for sql in listing)
+        
+        cursor = re.search(r'cursor=([\w.\-]+)', first).group(1)
+        second = client.get(f'/editor/content?sort=oldest&per_page=2&cursor={cursor}').get_data(as_text=True)
+        assert 'Proyeksi 2' in second and 'Proyeksi 0' not in second
+
+class TestQueryPlans:
+    """Test the key queries are answered from indexes"""
+    
+    def _seed(self, app, count=300):
+        from datetime import datetime, timedelta
+        from app.models.content import Content, Category
+        from app.models.audit import AuditLog
+        with app.app_context():
+            author = User.query.filter_by(username='admin_test').first()
+            category = Category.query.filter_by(slug='test-category').first()
+            now = datetime.utcnow()
+            statuses = ('draft', 'pending_review', 'published', 'rejected')
+            db.session.execute(Content.__table__.insert(), [{
+                'title': f'Rencana {i}', 'slug': f'rencana-{i}', 'content': '<p>Isi</p>',
+                'status': statuses[i % 4], 'author_id': author.id, 'category_id': category.id,
+                'reviewer_id': author.id if i % 2 else None,
+                'created_at': now - timedelta(hours=i), 'updated_at': now - timedelta(hours=i),
+                'published_at': now - timedelta(hours=i) if i % 4 == 2 else None,
+            } for i in range(count)])
+            db.session.execute(AuditLog.__table__.insert(), [{
+                'user_id': author.id, 'action': ('login', 'create_content')[i % 2], 'table_name': 'users',
+                'created_at': now - timedelta(minutes=i),
+            } for i in range(count)])
+            db.session.commit()
+            db.session.execute(db.text('ANALYZE'))
+    
+    def test_key_queries_use_indexes(self, app, admin_user):
+        """Test EXPLAIN shows no sequential scan for any key query"""
+        from app.core.indexes import check_query_plans
+        self._seed(app)
+        with app.app_context():
+            assert check_query_plans() == {}
+    
+    def test_missing_index_is_reported_and_recreated(self, app, runner, admin_user):
+        """Test the check catches a dropped index and indexes-create restores it"""
+        from app.core.indexes import check_query_plans
+        self._seed(app)
+        with app.app_context():
+            db.session.execute(db.text('DROP INDEX ix_audit_logs_created_at'))
+            db.session.execute(db.text('DROP INDEX ix_audit_logs_action_created_at'))
+            db.session.commit()
+            assert check_query_plans() == {'audit_by_action': ['audit_logs'], 'audit_listing': ['audit_logs']}
+        
+        result = runner.invoke(args=['indexes-check'])
+        assert result.exit_code == 1 and 'audit_listing: sequential scan on audit_logs' in result.output
+        result = runner.invoke(args=['indexes-create'])
+        assert 'Created 2 indexes: ix_audit_logs_action_created_at, ix_audit_logs_created_at.' in result.output
+        assert runner.invoke(args=['indexes-check']).exit_code == 0
+
+    def test_mysql_plans_report_full_table_scans(self, app):
+        """Test MySQL EXPLAIN rows of type ALL are reported and the session setting restored"""
+        from sqlalchemy.dialects import mysql
+        from app.core.indexes import key_queries, sequential_scans
+        
+        class Result:
+            def __init__(self, rows):
+                self.rows = rows
+            def mappings(self):
+                return self
+            def all(self):
+                return self.rows
+        
+        class Connection:
+            dialect = mysql.dialect()
+            def __init__(self, rows):
+                self.rows, self.executed = rows, []
+            def exec_driver_sql(self, sql, params=None):
+                self.executed.append(sql)
+                return Result(self.rows if sql.startswith('EXPLAIN') else [])
+        
+        with app.app_context():
+            statement = key_queries()['audit_listing'][0]
+            connection = Connection([{'table': 'audit_logs', 'type': 'ALL'}])
+            assert sequential_scans(statement, connection) == ['audit_logs']
+            assert connection.executed[1].startswith('EXPLAIN FORMAT=TRADITIONAL SELECT')
+            assert connection.executed[-1] == 'SET SESSION max_seeks_for_key = DEFAULT'
+            assert sequential_scans(statement, Connection([{'table': 'audit_logs', 'type': 'index'}])) == []
+    
+    def test_unsupported_database_is_reported(self, app, runner, monkeypatch):
+        """Test indexes-check explains instead of failing on a database it cannot EXPLAIN"""
+        with app.app_context():
+            monkeypatch.setattr(db.engine.dialect, 'name', 'mssql')
+            result = runner.invoke(args=['indexes-check'])
+        assert result.exit_code == 0
+        assert 'Query plans cannot be checked on mssql' in result.output
+
+class TestPaginationTotals:
+    """Test listing totals come from counters or a short-lived count cache"""
+    
+    def _statements(self, client, url):
+        from sqlalchemy import event
+        statements = []
+        listener = lambda *args, **kwargs: statements.append(args[2].lower())
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            response = client.get(url)
+            body = response.get_data(as_text=True)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+        assert response.status_code == 200
+        return body, [statement for statement in statements if 'count(' in statement]
+    
+    def test_review_queue_total_from_counters(self, app, client, editor_user):
+        """Test the review queue shows its size without a COUNT over content"""
+        from app.models.content import Content, Category
+        with app.app_context():
+            author = User.query.filter_by(username='editor_test').first()
+            category = Category.query.filter_by(slug='test-category').first()
+            db.session.add(Content(title='Antrian', slug='antrian', content='<p>Isi</p>', excerpt='Ringkas',
+                                   status='pending_review', author_id=author.id, category_id=category.id))
+            db.session.commit()
+        
+        client.post('/auth/login', data={'username': 'editor_test', 'password': 'password123'})
+        body, counts = self._statements(client, '/editor/review-queue')
+        assert 'Konten Menunggu Review (1 konten)' in body
+        assert not [statement for statement in counts if 'from content' in statement]
+    
+    def test_audit_log_total_is_cached_until_exact_requested(self, app, client, admin_user):
+        """Test a repeated listing reuses its count as "sekitar N" and ?exact=1 recounts"""
+        from app.models.audit import AuditLog
+        client.post('/auth/login', data={'username': 'admin_test', 'password': 'password123'})
+        with app.app_context():
+            AuditLog.query.delete()
+            db.session.commit()
+        
+        body, counts = self._statements(client, '/admin/audit-logs?action=login')
+        assert 'Riwayat Aktivitas (0 entri)' in body and len(counts) == 1
+        
+        with app.app_context():
+            admin = User.query.filter_by(username='admin_test').first()
+            AuditLog.log_action(admin.id, 'login', 'users', admin.id)
+            db.session.commit()
+        body, counts = self._statements(client, '/admin/audit-logs?action=login')
+        assert 'Riwayat Aktivitas (sekitar 0 entri)' in body and 'Hitung tepat' in body and not counts
+        
+        body, counts = self._statements(client, '/admin/audit-logs?action=login&exact=1')
+        assert 'Riwayat Aktivitas (1 entri)' in body and len(counts) == 1
+    
+    def test_stale_count_does_not_drive_page_links(self, app, admin_user):
+        """Test OFFSET pages settle a cached total against the rows they read"""
+        from app.models.content import Content
+        from app.core.totals import Total, paginate
+        with app.app_context():
+            author = User.query.filter_by(username='admin_test').first()
+            db.session.add_all([Content(title=f'Hal {i}', slug=f'hal-{i}', content='<p>Isi</p>', status='draft',
+                                        author_id=author.id) for i in range(25)])
+            db.session.commit()
+            query = Content.query.order_by(Content.id)
+            
+            # Cached before rows were added: the next page is still offered
+            first = paginate(query, 1, 10, Total(10, approximate=True))
+            assert first.has_next and first.next_num == 2 and first.total.approximate
+            # Cached before rows were removed: no empty pages are offered
+            last = paginate(query, 3, 10, Total(40, approximate=True))
+            assert len(last.items) == 5 and not last.has_next and last.pages == 3
+            assert last.total == 25 and not last.total.approximate
+            full = paginate(query.filter(Content.id <= Content.query.order_by(Content.id).offset(19).first().id),
+                            2, 10, Total(30, approximate=True))
+            assert not full.has_next and full.total == 20
+            assert not paginate(query, 5, 10, Total(60, approximate=True)).has_next
+            # Exact totals are used as they are
+            assert paginate(query, 1, 10, Total(25)).total == 25
+
+class TestAuditWriter:
+    """Test audit events written with the change or queued for the background writer"""
+    
+    def _create_user(self, client, username):
+        with client.application.app_context():
+            role_id = Role.query.filter_by(name='publisher').first().id
+        response = client.post('/admin/users/new', data={
+            'username': username, 'email': f'{username}@test.com', 'full_name': 'Pengguna Baru',
+            'role_id': role_id, 'status': 'active', 'password': 'Sandi#Desa2026', 'password2': 'Sandi#Desa2026'
+        })
+        assert response.status_code == 302
+    
+    def test_transaction_mode_commits_audit_with_change(self, app, client, admin_user):
+        """Test the audit row is written by the same single commit as the change"""
+        from app.models.audit import AuditLog
+        client.post('/auth/login', data={'username': 'admin_test', 'password': 'password123'})
+        commits = []
+        from sqlalchemy import event
+        listener = lambda session: commits.append(session)
+        event.listen(db.session, 'after_commit', listener)
+        try:
+            self._create_user(client, 'baru1')
+        finally:
+            event.remove(db.session, 'after_commit', listener)
+        assert len(commits) == 1
+        with app.app_context():
+            user = User.query.filter_by(username='baru1').one()
+            log = AuditLog.query.filter_by(action='create_user').one()
+            assert log.record_id == user.id and log.new_values['username'] == 'baru1'
+    
+    def test_async_mode_queues_until_flush(self, app, client, admin_user):
+        """Test committed events wait in the queue and rolled back ones are dropped"""
+        from app.models.audit import AuditLog
+        from app.core.audit import record_audit
+        writer = app.extensions['audit_writer']
+        writer.flush_interval = 3600
+        app.config['AUDIT_LOG_MODE'] = 'async'
+        client.post('/auth/login', data={'username': 'admin_test', 'password': 'password123'})
+        
+        self._create_user(client, 'baru2')
+        with app.app_context():
+            assert AuditLog.query.filter_by(action='create_user').count() == 0
+            assert writer.pending() == 1
+            
+            record_audit(None, 'discarded', 'users')
+            db.session.rollback()
+            assert writer.pending() == 1
+            
+            assert writer.flush() == 1
+            log = AuditLog.query.filter_by(action='create_user').one()
+            assert log.record_id == User.query.filter_by(username='baru2').one().id
+        writer.shutdown()
+    
+    def test_shutdown_writes_queue_and_stops_thread(self, app, client, admin_user):
+        """Test shutdown writes what is queued, stops the thread and later events are written at once"""
+        from app.models.audit import AuditLog
+        writer = app.extensions['audit_writer']
+        writer.flush_interval = 3600
+        app.config['AUDIT_LOG_MODE'] = 'async'
+        client.post('/auth/login', data={'username': 'admin_test', 'password': 'password123'})
+        
+        self._create_user(client, 'baru3')
+        self._create_user(client, 'baru4')
+        thread = writer._thread
+        assert writer.pending() == 2 and thread.is_alive()
+        writer.shutdown()
+        assert writer.pending() == 0 and not thread.is_alive()
+        with app.app_context():
+            assert AuditLog.query.filter_by(action='create_user').count() == 2
+        
+        self._create_user(client, 'baru5')
+        with app.app_context():
+            assert writer.pending() == 0 and writer._thread is thread
+            assert AuditLog.query.filter_by(action='create_user').count() == 3
+    
+    def test_full_queue_writes_synchronously(self, app, client, admin_user):
+        """Test events that do not fit in the queue are written by the request itself"""
+        from app.models.audit import AuditLog
+        from app.core.audit import AuditWriter
+        app.config.update(AUDIT_LOG_MODE='async', AUDIT_LOG_QUEUE_SIZE=1, AUDIT_LOG_FLUSH_INTERVAL=3600)
+        writer = AuditWriter(app)
+        assert app.extensions['audit_writer'] is writer
+        client.post('/auth/login', data={'username': 'admin_test', 'password': 'password123'})
+        
+        self._create_user(client, 'baru6')
+        self._create_user(client, 'baru7')
+        with app.app_context():
+            assert writer.pending() == 1
+            logs = AuditLog.query.filter_by(action='create_user').all()
+            assert [log.new_values['username'] for log in logs] == ['baru7']
+        
+        writer.shutdown()
+        with app.app_context():
+            assert AuditLog.query.filter_by(action='create_user').count() == 2
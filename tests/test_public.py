@@ -0,0 +1,1099 @@
+"""
+Public site tests for CMS Desa
+"""
+
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from app.models.user import User, Role
+from app.models.content import Content, Category
+from app import db
+
+def create_published(app, count=1, category_slug='test-category', prefix='Artikel'):
+    """Create published content owned by a fresh publisher and return their ids"""
+    with app.app_context():
+        role = Role.query.filter_by(name='publisher').first()
+        author = User.query.filter_by(username='public_author').first()
+        if not author:
+            author = User(username='public_author', email='public_author@test.com',
+                          full_name='Public Author', role_id=role.id)
+            author.set_password('password123')
+            db.session.add(author)
+            db.session.flush()
+        
+        category = Category.query.filter_by(slug=category_slug).first()
+        if not category:
+            category = Category(name=category_slug.replace('-', ' ').title(), slug=category_slug)
+            db.session.add(category)
+            db.session.flush()
+        
+        now = datetime.utcnow()
+        ids = []
+        for i in range(count):
+            content = Content(
+                title=f'{prefix} {category_slug} {i}',
+                slug=f'{prefix.lower()}-{category_slug}-{i}',
+                content=f'<p>Isi {prefix} {i}</p>',
+                excerpt=f'Ringkasan {prefix} {i}',
+                author_id=author.id,
+                category_id=category.id,
+                status='published',
+                published_at=now - timedelta(minutes=i)
+            )
+            db.session.add(content)
+            db.session.flush()
+            ids.append(content.id)
+        db.session.commit()
+        return ids
+
+class QueryCounter:
+    """Count SQL statements issued by the engine"""
+    
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+    
+    def _callback(self, *args, **kwargs):
+        self.count += 1
+    
+    def __enter__(self):
+        event.listen(self.engine, 'before_cursor_execute', self._callback)
+        return self
+    
+    def __exit__(self, *exc):
+        event.remove(self.engine, 'before_cursor_execute', self._callback)
+
+class TestHomepage:
+    """Test homepage assembly"""
+    
+    def test_homepage_content_structure(self, app):
+        """Test featured list and per-category top-N"""
+        create_published(app, count=5, category_slug='berita')
+        create_published(app, count=2, category_slug='kegiatan')
+        
+        with app.app_context():
+            homepage = Content.get_homepage_content(featured_limit=6, per_category=3)
+            
+            assert len(homepage['featured_content']) == 6
+            assert [c.slug for c in homepage['categories']] == ['berita', 'kegiatan']
+            assert len(homepage['content_by_category']['berita']) == 3
+            assert len(homepage['content_by_category']['kegiatan']) == 2
+            assert homepage['content_by_category']['berita'][0].slug == 'artikel-berita-0'
+    
+    def test_homepage_query_count_constant(self, app, client):
+        """Test homepage query count does not grow with categories"""
+        create_published(app, count=3, category_slug='berita')
+        # Load the cached reference data first so both requests start warm
+        client.get('/')
+        with app.app_context():
+            with QueryCounter(db.engine) as few:
+                assert client.get('/').status_code == 200
+        
+        for slug in ('kegiatan', 'pengumuman', 'layanan', 'lainnya'):
+            create_published(app, count=3, category_slug=slug)
+        with app.app_context():
+            with QueryCounter(db.engine) as many:
+                response = client.get('/')
+        
+        assert response.status_code == 200
+        assert many.count == few.count
+
+class TestPageCache:
+    """Test the public full-page cache"""
+    
+    @pytest.fixture(autouse=True)
+    def enable_cache(self, app, tmp_path):
+        from app.core.cache import init_cache
+        app.config['PUBLIC_PAGE_CACHE'] = True
+        app.config['CACHE_DIR'] = str(tmp_path)
+        init_cache(app)
+    
+    def test_anonymous_hits_are_cached(self, app, client):
+        """Test second anonymous request is served from cache"""
+        create_published(app, count=2)
+        
+        assert client.get('/').headers['X-Page-Cache'] == 'MISS'
+        response = client.get('/')
+        assert response.headers['X-Page-Cache'] == 'HIT'
+        assert b'Artikel test-category 0' in response.data
+        assert client.get('/?page=2').headers['X-Page-Cache'] == 'MISS'
+    
+    def test_approve_invalidates_cache(self, app, client):
+        """Test approving content bumps the content version"""
+        ids = create_published(app, count=1)
+        client.get('/')
+        
+        with app.app_context():
+            content = Content.query.get(ids[0])
+            content.status = 'pending_review'
+            db.session.commit()
+            reviewer = User.query.filter_by(username='public_author').first()
+            content.approve(reviewer)
+            db.session.commit()
+        
+        assert client.get('/').headers['X-Page-Cache'] == 'MISS'
+    
+    def test_cached_article_view_still_counted(self, app, client):
+        """Test views served from cache still increment the counter"""
+        ids = create_published(app, count=1)
+        client.get('/content/artikel-test-category-0')
+        response = client.get('/content/artikel-test-category-0')
+        assert response.headers['X-Page-Cache'] == 'HIT'
+        
+        app.extensions['view_counter'].flush()
+        with app.app_context():
+            assert Content.query.get(ids[0]).view_count == 2
+    
+    def test_stale_if_error(self, app, client, monkeypatch):
+        """Test a stale page is served when the database fails"""
+        from sqlalchemy.exc import OperationalError
+        from app.core.cache import bump_content_version
+        create_published(app, count=1)
+        client.get('/')
+        
+        with app.app_context():
+            bump_content_version()
+        
+        def failing_query(*args, **kwargs):
+            raise OperationalError('SELECT 1', {}, Exception('statement timeout'))
+        monkeypatch.setattr(Content, 'get_homepage_content', staticmethod(failing_query))
+        
+        response = client.get('/')
+        assert response.status_code == 200
+        assert response.headers['X-Page-Cache'] == 'STALE'
+
+class TestViewCounter:
+    """Test the write-behind view counter"""
+    
+    def test_views_are_buffered_and_flushed(self, app, client):
+        """Test article views are written in one batched flush"""
+        ids = create_published(app, count=2)
+        counter = app.extensions['view_counter']
+        
+        for _ in range(3):
+            assert client.get('/content/artikel-test-category-0').status_code == 200
+        client.get('/content/artikel-test-category-1')
+        
+        with app.app_context():
+            assert Content.query.get(ids[0]).view_count == 0
+            assert counter.pending(ids[0]) == 3
+            
+            with QueryCounter(db.engine) as queries:
+                assert counter.flush() == 2
+            # One batched UPDATE of content and one batched upsert of the daily view rollup
+            assert queries.count == 2
+            
+            assert Content.query.get(ids[0]).view_count == 3
+            assert Content.query.get(ids[1]).view_count == 1
+            assert counter.pending(ids[0]) == 0
+    
+    def test_flush_on_threshold(self, app):
+        """Test reaching the size threshold flushes immediately"""
+        ids = create_published(app, count=1)
+        counter = app.extensions['view_counter']
+        counter.flush_threshold = 5
+        
+        for _ in range(5):
+            counter.increment(ids[0])
+        
+        with app.app_context():
+            assert Content.query.get(ids[0]).view_count == 5
+    
+    def test_detail_page_shows_pending_views(self, app, client):
+        """Test the rendered count includes buffered views"""
+        create_published(app, count=1)
+        client.get('/content/artikel-test-category-0')
+        response = client.get('/content/artikel-test-category-0')
+        assert b'2 views' in response.data
+        app.extensions['view_counter'].flush()
+    
+    def test_dropped_app_is_not_kept_alive(self):
+        """Test neither the exit handler nor the flush thread holds on to a discarded app"""
+        import gc
+        import weakref
+        from app import create_app
+        from app.core.view_counter import _counters
+        app = create_app('testing')
+        counter = app.extensions['view_counter']
+        counter.flush_interval = 3600
+        counter._ensure_thread()
+        assert counter in _counters
+        
+        app_ref = weakref.ref(app)
+        del app, counter
+        gc.collect()
+        assert app_ref() is None
+
+class TestSearch:
+    """Test full-text search"""
+    
+    def test_indonesian_stemmer(self):
+        """Test affixed words share a stem"""
+        from app.core.search import stem, analyze
+        assert stem('pembangunan') == stem('membangun') == stem('bangun')
+        assert stem('kegiatannya') == stem('kegiatan')
+        assert 'yang' not in analyze('Kegiatan yang dilaksanakan di desa')
+    
+    def test_search_ranks_and_highlights(self, app, client):
+        """Test /search finds stemmed matches ranked by relevance"""
+        ids = create_published(app, count=2, category_slug='berita')
+        with app.app_context():
+            first = db.session.get(Content, ids[0])
+            first.title = 'Pembangunan jalan desa'
+            first.content = '<p>Warga membangun jalan baru bersama.</p>'
+            second = db.session.get(Content, ids[1])
+            second.content = '<p>Rapat warga membahas pembangunan posyandu.</p>'
+            db.session.commit()
+        
+        response = client.get('/search?query=bangun')
+        assert response.status_code == 200
+        body = response.data.decode()
+        assert body.index('Pembangunan jalan desa') < body.index('Artikel berita 1')
+        assert '<mark>membangun</mark>' in body
+        assert 'Hasil per Kategori' in body
+    
+    def test_unpublished_and_deleted_not_found(self, app):
+        """Test the index follows status changes and deletes"""
+        from app.core.search import apply_search
+        ids = create_published(app, count=2)
+        with app.app_context():
+            published = Content.query.filter(Content.status == 'published')
+            assert apply_search(published, 'artikel').count() == 2
+            
+            db.session.delete(db.session.get(Content, ids[0]))
+            db.session.get(Content, ids[1]).status = 'draft'
+            db.session.commit()
+            
+            published = Content.query.filter(Content.status == 'published')
+            assert apply_search(published, 'artikel').count() == 0
+            assert apply_search(Content.query, 'artikel').count() == 1
+    
+    def test_category_facets(self, app):
+        """Test facet counts per category"""
+        from app.core.search import category_facets
+        create_published(app, count=3, category_slug='berita')
+        create_published(app, count=1, category_slug='kegiatan')
+        with app.app_context():
+            facets = {category.slug: count for category, count in category_facets('artikel')}
+            assert facets == {'berita': 3, 'kegiatan': 1}
+    
+    def test_reindex_command(self, app, runner):
+        """Test the search-reindex CLI command"""
+        create_published(app, count=2)
+        result = runner.invoke(args=['search-reindex'])
+        assert 'Indexed 2 content rows' in result.output
+
+class TestBM25Search:
+    """Test the in-process BM25 search backend"""
+    
+    @pytest.fixture(autouse=True)
+    def enable_bm25(self, app, tmp_path):
+        app.config['SEARCH_BACKEND'] = 'bm25'
+        app.config['BM25_INDEX_DIR'] = str(tmp_path)
+        app.extensions.pop('bm25_index', None)
+    
+    def test_segment_shared_between_workers(self, tmp_path):
+        """Test a second index on the same files sees builds, journal updates and compaction"""
+        from app.core.bm25 import BM25Index
+        writer = BM25Index(str(tmp_path), compact_threshold=3)
+        reader = BM25Index(str(tmp_path))
+        writer.build({1: ({'banjir': 2, 'jakarta': 1}, 3), 2: ({'milu': 1, 'jakarta': 1}, 2)})
+        assert [doc_id for doc_id, _ in reader.search('banjir jakarta')] == [1, 2]
+        
+        writer.update(upserts={3: ({'banjir': 1}, 1)}, deletes=[1])
+        assert [doc_id for doc_id, _ in reader.search('banjir')] == [3]
+        
+        # Updates only append to the journal; compaction is a separate step
+        writer.update(upserts={4: ({'jakarta': 1}, 1)})
+        assert writer._segment.generation == 1 and writer.needs_compaction
+        assert writer.compact() == 3
+        assert writer._segment.generation == 2 and not writer.needs_compaction
+        assert sorted(doc_id for doc_id, _ in reader.search('jakarta')) == [2, 4]
+        assert [doc_id for doc_id, _ in reader.search('banjir')] == [3]
+        assert reader.doc_count == 3
+        assert reader.search('milu') == writer.search('milu') and reader.search('milu')[0][0] == 2
+    
+    def test_compaction_keeps_entries_written_meanwhile(self, tmp_path, monkeypatch):
+        """Test journal entries appended after the compaction snapshot survive the swap"""
+        from app.core.bm25 import BM25Index, Segment
+        writer = BM25Index(str(tmp_path))
+        other = BM25Index(str(tmp_path))
+        writer.build({1: ({'banjir': 1}, 1)})
+        writer.update(upserts={2: ({'banjir': 2}, 2)})
+        
+        write_arrays = Segment.write_arrays
+        def write_then_update(*args):
+            write_arrays(*args)
+            other.update(upserts={3: ({'banjir': 3}, 3)})
+        monkeypatch.setattr(Segment, 'write_arrays', staticmethod(write_then_update))
+        assert writer.compact() == 1
+        monkeypatch.undo()
+        
+        assert writer._segment.doc_count == 2 and writer._journal_entries == 1
+        assert sorted(doc_id for doc_id, _ in BM25Index(str(tmp_path)).search('banjir')) == [1, 2, 3]
+    
+    def test_reindex_and_incremental_updates(self, app, runner):
+        """Test search-reindex builds the index and publish changes update it"""
+        from app.core.search import apply_search
+        from app.core.signals import mark_public_content_changed
+        ids = create_published(app, count=2)
+        result = runner.invoke(args=['search-reindex'])
+        assert 'Indexed 2 content rows (bm25)' in result.output
+        
+        with app.app_context():
+            published = Content.query.filter(Content.status == 'published')
+            assert apply_search(published, 'artikel').count() == 2
+            
+            content = db.session.get(Content, ids[0])
+            content.title = 'Peresmian jembatan desa'
+            mark_public_content_changed(content)
+            unpublished = db.session.get(Content, ids[1])
+            unpublished.status = 'draft'
+            mark_public_content_changed(unpublished)
+            db.session.commit()
+            
+            published = Content.query.filter(Content.status == 'published')
+            assert [c.id for c in apply_search(published, 'jembatan')] == [ids[0]]
+            # Drafts are not in the index but admin lists still find them
+            assert [c.id for c in apply_search(published, 'artikel')] == [ids[0]]
+            assert sorted(c.id for c in apply_search(Content.query, 'artikel')) == ids
+    
+    def test_publish_schedules_compaction(self, app, runner):
+        """Test a commit that fills the journal hands compaction to the compaction executor"""
+        from app.core.bm25 import get_index
+        from app.core.signals import mark_public_content_changed
+        app.config['BM25_COMPACT_THRESHOLD'] = 2
+        ids = create_published(app, count=2)
+        runner.invoke(args=['search-reindex'])
+        
+        with app.app_context():
+            index = get_index()
+            mark_public_content_changed(ids)
+            db.session.commit()
+            assert index._segment.generation == 2 and not index.needs_compaction
+        
+        result = runner.invoke(args=['search-compact'])
+        assert 'Merged 0 journal entries into the BM25 index.' in result.output
+
+class TestSearchSuggestions:
+    """Test the search suggestion endpoint"""
+    
+    @pytest.fixture(autouse=True)
+    def cache_dir(self, app, tmp_path):
+        from app.core.cache import init_cache
+        app.config['CACHE_DIR'] = str(tmp_path)
+        init_cache(app)
+    
+    def test_prefix_and_typo_suggestions(self, app, client):
+        """Test titles match by word prefix and by trigram similarity"""
+        ids = create_published(app, count=2, category_slug='berita')
+        with app.app_context():
+            db.session.get(Content, ids[0]).title = 'Pembangunan jembatan desa'
+            db.session.commit()
+        
+        response = client.get('/api/search-suggestions?q=jemba')
+        assert response.status_code == 200
+        assert 'max-age' in response.headers['Cache-Control']
+        suggestions = response.get_json()['suggestions']
+        assert suggestions[0]['slug'] == 'artikel-berita-0'
+        assert suggestions[0]['url'] == '/content/artikel-berita-0'
+        
+        suggestions = client.get('/api/search-suggestions?q=jembtan').get_json()['suggestions']
+        assert [s['title'] for s in suggestions] == ['Pembangunan jembatan desa']
+        
+        suggestions = client.get('/api/search-suggestions?q=beri').get_json()['suggestions']
+        assert suggestions[0]['type'] == 'category'
+        assert client.get('/api/search-suggestions?q=j').get_json() == {'suggestions': []}
+    
+    def test_publish_events_update_suggestions(self, app, client):
+        """Test unpublished and newly published titles are picked up"""
+        from app.core.signals import mark_public_content_changed
+        ids = create_published(app, count=2)
+        assert len(client.get('/api/search-suggestions?q=artikel').get_json()['suggestions']) == 2
+        
+        with app.app_context():
+            unpublished = db.session.get(Content, ids[0])
+            unpublished.status = 'draft'
+            mark_public_content_changed(unpublished)
+            renamed = db.session.get(Content, ids[1])
+            renamed.title = 'Posyandu balita bulan ini'
+            mark_public_content_changed(renamed)
+            db.session.commit()
+        
+        assert client.get('/api/search-suggestions?q=artikel').get_json()['suggestions'] == []
+        suggestions = client.get('/api/search-suggestions?q=posy').get_json()['suggestions']
+        assert [s['title'] for s in suggestions] == ['Posyandu balita bulan ini']
+
+    def test_markup_in_titles_is_rendered_as_text(self, app, client):
+        """Test a title with markup comes back verbatim and the script shows it as text"""
+        import os
+        import re
+        ids = create_published(app, count=1)
+        with app.app_context():
+            db.session.get(Content, ids[0]).title = 'Jadwal <img src=x onerror=alert(1)> posyandu'
+            db.session.commit()
+        
+        response = client.get('/api/search-suggestions?q=jadwal')
+        assert response.mimetype == 'application/json'
+        assert [s['title'] for s in response.get_json()['suggestions']] == \
+            ['Jadwal <img src=x onerror=alert(1)> posyandu']
+        
+        with open(os.path.join(app.static_folder, 'js', 'public.js')) as f:
+            script = f.read()
+        body = script[script.index('function getSearchSuggestions'):script.index('function updateContentList')]
+        assert '.text(suggestion.title)' in body and ".attr('href', href)" in body
+        # No suggestion field is pasted into markup
+        assert not re.search(r'\$\{\s*suggestion\.|\.html\(', body)
+
+class TestLatestContentApi:
+    """Test the latest content polling endpoint"""
+    
+    def test_latest_content_and_etag(self, app, client):
+        """Test payload shape, 304 on unchanged ETag and a new ETag after publishing"""
+        create_published(app, count=3, category_slug='berita')
+        response = client.get('/api/latest-content')
+        assert response.status_code == 200
+        assert response.headers['Cache-Control'] == 'no-cache'
+        latest = response.get_json()['latest']
+        assert [item['slug'] for item in latest] == ['artikel-berita-0', 'artikel-berita-1', 'artikel-berita-2']
+        assert latest[0]['category'] == {'name': 'Berita', 'slug': 'berita'}
+        assert set(latest[0]) == {'id', 'title', 'slug', 'published_at', 'category'}
+        
+        etag = response.headers['ETag']
+        with QueryCounter(db.engine) as counter:
+            response = client.get('/api/latest-content', headers={'If-None-Match': etag})
+        assert response.status_code == 304
+        assert response.data == b''
+        assert counter.count == 0
+        
+        create_published(app, count=1, category_slug='kegiatan', prefix='Baru')
+        app.extensions['memo'].clear()
+        response = client.get('/api/latest-content', headers={'If-None-Match': etag})
+        assert response.status_code == 200
+        assert response.headers['ETag'] != etag
+
+class TestRelatedContent:
+    """Test precomputed related content"""
+    
+    TEXTS = [
+        ('Panen raya padi sawah', 'Petani desa memanen padi di sawah irigasi dengan hasil gabah melimpah tahun ini.'),
+        ('Harga gabah petani naik', 'Hasil panen padi sawah membuat harga gabah petani desa naik di musim panen.'),
+        ('Posyandu balita bulan Juni', 'Kader posyandu menimbang balita dan memberikan imunisasi serta vitamin.'),
+        ('Imunisasi balita di posyandu', 'Ibu membawa balita ke posyandu untuk imunisasi, vitamin dan penimbangan.'),
+    ]
+    
+    def write_texts(self, app, ids, texts):
+        with app.app_context():
+            for content_id, (title, body) in zip(ids, texts):
+                content = db.session.get(Content, content_id)
+                content.title = title
+                content.content = f'<p>{body}</p>'
+                content.excerpt = body
+            db.session.commit()
+    
+    def test_batch_rebuild_and_detail_page(self, app, client):
+        """Test the batch job pairs similar articles and the detail page shows them"""
+        from app.core.related import rebuild_related
+        ids = create_published(app, count=4, category_slug='berita')
+        self.write_texts(app, ids, self.TEXTS)
+        with app.app_context():
+            assert rebuild_related(processes=1) == 4
+            assert db.session.get(Content, ids[0]).get_related(limit=1)[0].id == ids[1]
+            assert db.session.get(Content, ids[2]).get_related(limit=1)[0].id == ids[3]
+        
+        response = client.get('/content/artikel-berita-2')
+        assert response.status_code == 200
+        assert 'Imunisasi balita di posyandu' in response.data.decode()
+        app.extensions['view_counter'].flush()
+    
+    def test_publish_events_update_neighbours(self, app):
+        """Test publishing and unpublishing update the affected lists only"""
+        from app.core.signals import mark_public_content_changed
+        ids = create_published(app, count=3, category_slug='berita')
+        self.write_texts(app, ids[:2], self.TEXTS[:2])
+        with app.app_context():
+            # Publish events recompute the changed article and its neighbours
+            mark_public_content_changed(list(ids))
+            db.session.get(Content, ids[2]).title = 'Sawah padi desa'
+            db.session.commit()
+            assert db.session.get(Content, ids[0]).get_related(limit=1)[0].id == ids[1]
+            
+            unpublished = db.session.get(Content, ids[1])
+            unpublished.status = 'draft'
+            mark_public_content_changed(unpublished)
+            db.session.commit()
+            assert ids[1] not in [c.id for c in db.session.get(Content, ids[0]).get_related(limit=5)]
+            # Its own list is cleared; only the same-category fallback is left
+            assert sorted(c.id for c in db.session.get(Content, ids[1]).get_related()) == [ids[0], ids[2]]
+    
+    def test_falls_back_to_latest_in_category(self, app, client):
+        """Test articles without (enough) precomputed neighbours show the category's latest"""
+        from app.models.related import RelatedContent
+        from app.core.cache import get_content_version
+        ids = create_published(app, count=4, category_slug='berita')
+        create_published(app, count=1, category_slug='lainnya')
+        with app.app_context():
+            RelatedContent.query.delete()
+            db.session.add(RelatedContent(content_id=ids[0], related_id=ids[1], rank=0, score=0.5))
+            db.session.commit()
+            related = [c.id for c in db.session.get(Content, ids[0]).get_related(limit=3)]
+            assert related[0] == ids[1] and len(related) == 3
+            assert set(related) == set(ids[1:])
+            
+            # Recomputed lists reach pages cached in the meantime
+            from app.core.related import _on_public_content_changed
+            version = get_content_version()
+            _on_public_content_changed(app, content_ids={ids[0]})
+            assert get_content_version() != version
+
+class TestKeysetPagination:
+    """Test cursor based pagination of listings"""
+    
+    def test_walk_forward_and_back(self, app):
+        """Test pages cover every row once, including ties on the sort key"""
+        from app.core.pagination import keyset_paginate
+        ids = create_published(app, count=25, category_slug='berita')
+        with app.test_request_context():
+            # Identical timestamps make the id tiebreaker decide the order
+            Content.query.filter(Content.id.in_(ids[10:15])).update(
+                {'published_at': datetime(2024, 1, 1)}, synchronize_session=False)
+            db.session.commit()
+            order_by = [Content.published_at.desc(), Content.id.desc()]
+            query = Content.query.filter_by(status='published')
+            expected = [c.id for c in query.order_by(*order_by).all()]
+            
+            pages = [keyset_paginate(query, order_by, per_page=10, with_total=True)]
+            while pages[-1].has_next:
+                pages.append(keyset_paginate(query, order_by, per_page=10, cursor=pages[-1].next_cursor))
+            assert [len(page) for page in pages] == [10, 10, 5]
+            assert [c.id for page in pages for c in page] == expected
+            assert pages[0].is_first and not pages[0].has_prev and pages[0].total == 25
+            assert pages[1].total is None
+            
+            back = keyset_paginate(query, order_by, per_page=10, cursor=pages[2].prev_cursor)
+            assert [c.id for c in back] == [c.id for c in pages[1]]
+            back = keyset_paginate(query, order_by, per_page=10, cursor=back.prev_cursor)
+            assert [c.id for c in back] == [c.id for c in pages[0]]
+            assert not back.has_prev and back.has_next
+    
+    def test_invalid_cursor_falls_back_to_first_page(self, app):
+        """Test tampered cursors and cursors of another ordering are ignored"""
+        from app.core.pagination import keyset_paginate
+        create_published(app, count=5, category_slug='berita')
+        with app.test_request_context():
+            query = Content.query
+            first = keyset_paginate(query, [Content.id.desc()], per_page=2)
+            for cursor in ['rusak', first.next_cursor + 'x']:
+                page = keyset_paginate(query, [Content.id.desc()], per_page=2, cursor=cursor)
+                assert page.is_first and [c.id for c in page] == [c.id for c in first]
+            other = keyset_paginate(query, [Content.id.asc()], per_page=2, cursor=first.next_cursor)
+            assert other.is_first
+    
+    def test_category_page_links(self, app, client):
+        """Test the category listing renders cursor links instead of page numbers"""
+        create_published(app, count=12, category_slug='berita')
+        response = client.get('/category/berita')
+        html = response.data.decode()
+        assert response.status_code == 200
+        assert 'artikel-berita-9' in html and 'artikel-berita-10' not in html
+        assert 'cursor=' in html and 'page=' not in html
+        
+        cursor = html.split('cursor=')[1].split('"')[0]
+        html = client.get(f'/category/berita?cursor={cursor}').data.decode()
+        assert 'artikel-berita-10' in html and 'artikel-berita-11' in html
+        assert 'artikel-berita-9' not in html
+        assert 'Sebelumnya' in html
+
+class TestConditionalRequests:
+    """Test ETag/Last-Modified validation of public pages"""
+    
+    def test_content_detail_not_modified(self, app, client):
+        """Test 304 on an unchanged article, view still counted, new ETag after an edit"""
+        ids = create_published(app, count=1, category_slug='berita')
+        response = client.get('/content/artikel-berita-0')
+        assert response.status_code == 200
+        assert response.headers['Cache-Control'] == 'public, no-cache'
+        assert response.headers['Last-Modified']
+        etag = response.headers['ETag']
+        
+        with QueryCounter(db.engine) as counter:
+            response = client.get('/content/artikel-berita-0', headers={'If-None-Match': etag})
+        assert response.status_code == 304
+        assert response.data == b''
+        assert counter.count == 0
+        app.extensions['view_counter'].flush()
+        with app.app_context():
+            assert db.session.get(Content, ids[0]).view_count == 2
+        
+        with app.app_context():
+            from app.core.signals import mark_public_content_changed
+            content = db.session.get(Content, ids[0])
+            content.title = 'Judul baru'
+            mark_public_content_changed(content)
+            db.session.commit()
+        response = client.get('/content/artikel-berita-0', headers={'If-None-Match': etag})
+        assert response.status_code == 200
+        assert 'Judul baru' in response.data.decode()
+        app.extensions['view_counter'].flush()
+    
+    def test_related_fallback_changes_etag(self, app, client):
+        """Test the category's newest articles, shown when no related list is stored, are part of the ETag"""
+        from app.models.related import RelatedContent
+        ids = create_published(app, count=2, category_slug='berita')
+        with app.app_context():
+            RelatedContent.query.delete()
+            db.session.commit()
+        etag = client.get('/content/artikel-berita-0').headers['ETag']
+        
+        create_published(app, count=1, category_slug='berita', prefix='Baru')
+        app.extensions['memo'].clear()
+        response = client.get('/content/artikel-berita-0', headers={'If-None-Match': etag})
+        assert response.status_code == 200 and 'Baru berita 0' in response.get_data(as_text=True)
+        etag = response.headers['ETag']
+        
+        with app.app_context():
+            db.session.get(Content, ids[1]).title = 'Tetangga berganti judul'
+            db.session.commit()
+        app.extensions['memo'].clear()
+        response = client.get('/content/artikel-berita-0', headers={'If-None-Match': etag})
+        assert response.status_code == 200 and 'Tetangga berganti judul' in response.get_data(as_text=True)
+        etag = response.headers['ETag']
+        
+        # A full precomputed list does not depend on the rest of the category
+        create_published(app, count=1, category_slug='berita', prefix='Lagi')
+        with app.app_context():
+            newer = Content.query.filter(Content.id != ids[0]).all()
+            db.session.add_all([RelatedContent(content_id=ids[0], related_id=item.id, rank=rank, score=0.5)
+                                for rank, item in enumerate(newer)])
+            db.session.commit()
+        app.extensions['memo'].clear()
+        etag = client.get('/content/artikel-berita-0').headers['ETag']
+        create_published(app, count=1, category_slug='berita', prefix='Lain')
+        app.extensions['memo'].clear()
+        assert client.get('/content/artikel-berita-0', headers={'If-None-Match': etag}).status_code == 304
+        app.extensions['view_counter'].flush()
+    
+    def test_category_validators(self, app, client):
+        """Test If-Modified-Since, settings changes and per-cursor ETags on listings"""
+        from app.models.setting import Setting
+        create_published(app, count=2, category_slug='berita')
+        response = client.get('/category/berita')
+        etag, last_modified = response.headers['ETag'], response.headers['Last-Modified']
+        assert client.get('/category/berita', headers={'If-Modified-Since': last_modified}).status_code == 304
+        assert client.get('/category/berita?cursor=x').headers['ETag'] != etag
+        assert client.get('/category/tidak-ada', headers={'If-None-Match': etag}).status_code == 404
+        
+        with app.app_context():
+            Setting.set_value('site_name', 'Desa Baru', is_public=True)
+            db.session.commit()
+        response = client.get('/category/berita', headers={'If-None-Match': etag})
+        assert response.status_code == 200
+        assert response.headers['ETag'] != etag
+
+    def test_unknown_slugs_do_not_grow_the_memo(self, app, client):
+        """Test page states memoized for made-up URLs stay within MEMO_MAX_ENTRIES"""
+        import threading
+        from app.core.cache import MemoCache
+        create_published(app, count=1, category_slug='berita')
+        memo = app.extensions['memo'] = MemoCache(max_entries=8)
+        assert client.get('/content/artikel-berita-0').status_code == 200
+        for i in range(20):
+            assert client.get(f'/content/acak-{i}').status_code == 404
+        assert len(memo) == 8
+        
+        # The least recently used states go first; a state in use stays
+        etag = client.get('/content/artikel-berita-0').headers['ETag']
+        for i in range(20, 27):
+            client.get(f'/content/acak-{i}')
+        with QueryCounter(db.engine) as counter:
+            response = client.get('/content/artikel-berita-0', headers={'If-None-Match': etag})
+        assert response.status_code == 304 and counter.count == 0
+        app.extensions['view_counter'].flush()
+        
+        errors = []
+        def fill(start):
+            try:
+                for i in range(start, start + 500):
+                    memo.set(('k', i), i)
+                    memo.get(('k', i - 3), 60)
+            except Exception as e:
+                errors.append(e)
+        threads = [threading.Thread(target=fill, args=(n * 1000,)) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert not errors and len(memo) == 8
+
+class TestStaticExport:
+    """Test the pre-rendered copy of the public site"""
+    
+    @pytest.fixture(autouse=True)
+    def export_dir(self, app, tmp_path):
+        app.config['STATIC_EXPORT_DIR'] = str(tmp_path / 'site')
+        return tmp_path / 'site'
+    
+    def test_export_site(self, app, runner, export_dir):
+        """Test every public page is written where nginx looks for it"""
+        ids = create_published(app, count=12, category_slug='berita')
+        result = runner.invoke(args=['export-static', '--processes', '1'])
+        assert 'Exported' in result.output
+        
+        assert (export_dir / 'index.html').exists()
+        assert (export_dir / 'about' / 'index.html').exists()
+        article = (export_dir / 'content' / 'artikel-berita-0' / 'index.html').read_text()
+        assert f'/api/content-views/{ids[0]}' in article
+        listing = (export_dir / 'category' / 'berita' / 'index.html').read_text()
+        cursor = listing.split('cursor=')[1].split('"')[0]
+        assert 'artikel-berita-10' in (export_dir / 'category' / 'berita' / 'cursor' / f'{cursor}.html').read_text()
+        
+        # Exporting did not count views; the page's beacon does
+        with app.app_context():
+            assert db.session.get(Content, ids[0]).view_count == 0
+        assert app.test_client().post(f'/api/content-views/{ids[0]}').status_code == 204
+        app.extensions['view_counter'].flush()
+        with app.app_context():
+            assert db.session.get(Content, ids[0]).view_count == 1
+    
+    def test_incremental_export_on_publish(self, app, export_dir):
+        """Test publish events re-render the article, its listing and the homepage"""
+        from app.core.static_export import export_site
+        ids = create_published(app, count=2, category_slug='berita')
+        with app.app_context():
+            export_site(processes=1)
+        app.config['STATIC_EXPORT_ON_PUBLISH'] = True
+        
+        with app.app_context():
+            content = db.session.get(Content, ids[0])
+            content.slug = 'judul-baru'
+            content.title = 'Judul Baru'
+            from app.core.signals import mark_public_content_changed
+            mark_public_content_changed(content)
+            db.session.commit()
+        assert not (export_dir / 'content' / 'artikel-berita-0').joinpath('index.html').exists()
+        assert 'Judul Baru' in (export_dir / 'content' / 'judul-baru' / 'index.html').read_text()
+        assert 'Judul Baru' in (export_dir / 'category' / 'berita' / 'index.html').read_text()
+        assert 'Judul Baru' in (export_dir / 'index.html').read_text()
+        
+        with app.app_context():
+            db.session.get(Content, ids[1]).status = 'draft'
+            mark_public_content_changed(ids[1])
+            db.session.commit()
+        assert not (export_dir / 'content' / 'artikel-berita-1' / 'index.html').exists()
+        assert 'artikel-berita-1' not in (export_dir / 'category' / 'berita' / 'index.html').read_text()
+
+class TestFeedsAndSitemaps:
+    """Test feeds and sharded sitemaps served from the disk cache"""
+    
+    @pytest.fixture(autouse=True)
+    def cache_dir(self, app, tmp_path):
+        app.config['CACHE_DIR'] = str(tmp_path)
+        app.config['SITEMAP_SHARD_SIZE'] = 2
+        return tmp_path / 'feeds'
+    
+    def test_sitemap_shards_and_last_modified(self, app, client, cache_dir):
+        """Test the index lists id-range shards and cached shards answer If-Modified-Since"""
+        ids = create_published(app, count=3, category_slug='berita')
+        index = client.get('/sitemap.xml').get_data(as_text=True)
+        assert '/sitemap-0.xml' in index and '/sitemap-2.xml' in index and '/sitemap-3.xml' not in index
+        
+        shard = (ids[2] - 1) // 2 + 1
+        response = client.get(f'/sitemap-{shard}.xml')
+        assert '/content/artikel-berita-2' in response.get_data(as_text=True)
+        assert (cache_dir / f'sitemap-{shard}.xml').exists()
+        assert client.get('/sitemap-9.xml').status_code == 404
+        assert '/category/berita' in client.get('/sitemap-0.xml').get_data(as_text=True)
+        
+        cached = client.get(f'/sitemap-{shard}.xml')
+        assert cached.headers['Last-Modified']
+        response = client.get(f'/sitemap-{shard}.xml', headers={'If-Modified-Since': cached.headers['Last-Modified']})
+        assert response.status_code == 304
+    
+    def test_feeds_invalidated_on_publish(self, app, client, cache_dir):
+        """Test global and category feeds and shard invalidation on publish events"""
+        from app.core.signals import mark_public_content_changed
+        create_published(app, count=2, category_slug='berita')
+        ids = create_published(app, count=1, category_slug='kegiatan', prefix='Acara')
+        body = client.get('/feed.xml').get_data(as_text=True)
+        assert body.count('<item>') == 3 and '<rss version="2.0"' in body
+        body = client.get('/category/kegiatan/feed.xml').get_data(as_text=True)
+        assert body.count('<item>') == 1 and 'acara-kegiatan-0' in body
+        client.get('/sitemap-1.xml').get_data()
+        assert {path.name for path in cache_dir.iterdir()} == {'feed.xml', 'feed-kegiatan.xml', 'sitemap-1.xml'}
+        
+        with app.app_context():
+            db.session.get(Content, ids[0]).title = 'Acara & Kegiatan <Baru>'
+            mark_public_content_changed(ids[0])
+            db.session.commit()
+        # Article 3 lives in shard 2, so shard 1 stays cached
+        assert {path.name for path in cache_dir.iterdir()} == {'sitemap-1.xml'}
+        assert 'Acara &amp; Kegiatan &lt;Baru&gt;' in client.get('/feed.xml').get_data(as_text=True)
+
+class TestReferenceData:
+    """Test the cached settings, categories, roles and authors"""
+    
+    def test_settings_loaded_once(self, app, client):
+        """Test public pages read settings from the cache, and changes show up after commit"""
+        from app.models.setting import Setting
+        with app.app_context():
+            Setting.insert_default_settings()
+        statements = []
+        def record(conn, cursor, statement, *args):
+            statements.append(statement)
+        
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            assert client.get('/contact').status_code == 200
+            assert len([s for s in statements if 'FROM settings' in s]) == 1
+            del statements[:]
+            response = client.get('/contact')
+            assert not [s for s in statements if 'FROM settings' in s or 'FROM categories' in s]
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+        assert '"site_name": "Portal Desa Digital"' in response.get_data(as_text=True)
+        
+        with app.app_context():
+            Setting.set_values({
+                'site_name': ('Desa Baru', 'string', 'Nama website desa', True),
+                'contact_phone': ('0800', 'string', 'Nomor telepon desa', True)
+            })
+            db.session.commit()
+            assert Setting.query.filter_by(key='site_name').count() == 1
+        body = client.get('/contact').get_data(as_text=True)
+        assert 'Desa Baru' in body and '0800' in body
+    
+    def test_lazy_template_values(self, app):
+        """Test templates that don't use the reference data don't query it"""
+        from flask import render_template_string
+        with app.test_request_context('/'):
+            with QueryCounter(db.engine) as counter:
+                assert render_template_string('ok') == 'ok'
+            assert counter.count == 0
+            assert render_template_string('{{ nav_categories|length }}') == '1'
+    
+    def test_author_list_follows_user_changes(self, app, admin_user, client, auth):
+        """Test the cached author list refreshes after a user is created"""
+        from app.core.reference import get_authors
+        auth.login()
+        with app.test_request_context('/'):
+            before = {author.username for author in get_authors()}
+        with app.app_context():
+            role_id = Role.query.filter_by(name='editor').first().id
+        response = client.post('/admin/users/new', data={
+            'username': 'editor_baru', 'email': 'editor_baru@test.com', 'full_name': 'Editor Baru',
+            'role_id': role_id, 'status': 'active', 'password': 'Rahasia#2024', 'password2': 'Rahasia#2024'
+        })
+        assert response.status_code == 302
+        with app.test_request_context('/'):
+            assert {author.username for author in get_authors()} == before | {'editor_baru'}
+
+class TestTemplatePrewarm:
+    """Test the Jinja bytecode cache and template pre-warming"""
+    
+    def test_prewarm_fills_bytecode_cache(self, app, tmp_path):
+        """Test every template compiles and lands in the bytecode cache"""
+        from jinja2 import FileSystemBytecodeCache
+        from app.core.templates import prewarm_templates
+        bytecode_dir = tmp_path / 'bytecode'
+        bytecode_dir.mkdir()
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(str(bytecode_dir))
+        app.jinja_env.cache.clear()
+        
+        compiled, _seconds = prewarm_templates(app)
+        assert compiled > 40
+        assert len(list(bytecode_dir.iterdir())) == compiled
+        assert app.jinja_env.get_template('public/index.html') is app.jinja_env.get_template('public/index.html')
+    
+    def test_production_disables_auto_reload(self):
+        """Test production templates are not re-checked on every render"""
+        from config import ProductionConfig
+        assert ProductionConfig.TEMPLATES_AUTO_RELOAD is False
+
+class TestStreamedListings:
+    """Test staff listings streamed from a server-side cursor"""
+    
+    def test_stream_matches_buffered_pages(self, app):
+        """Test streamed pages give the same rows and cursors as buffered ones"""
+        from app.core.pagination import keyset_paginate, KeysetStream
+        create_published(app, count=12, category_slug='berita')
+        with app.test_request_context():
+            query = Content.query
+            order_by = [Content.published_at.desc(), Content.id.desc()]
+            cursor = None
+            for _ in range(3):
+                buffered = keyset_paginate(query, order_by, per_page=5, cursor=cursor)
+                streamed = keyset_paginate(query, order_by, per_page=5, cursor=cursor, stream=True)
+                assert isinstance(streamed, KeysetStream)
+                assert bool(streamed.items) and [c.id for c in streamed.items] == [c.id for c in buffered]
+                # A second loop (e.g. the mobile card list) reads the rows again
+                assert [c.id for c in streamed.items] == [c.id for c in buffered]
+                assert streamed.next_cursor == buffered.next_cursor
+                assert streamed.prev_cursor == buffered.prev_cursor
+                cursor = buffered.next_cursor
+            assert cursor is None
+            
+            # Cursors read before the rows still work
+            early = keyset_paginate(query, order_by, per_page=5, stream=True)
+            assert early.has_next and len(early) == 5 and len(list(early.items)) == 5
+            empty = keyset_paginate(query.filter(Content.id < 0), order_by, per_page=5, stream=True)
+            assert not empty.items and not empty.has_next and not empty.has_prev
+    
+    def test_admin_content_list_streams(self, app, client, admin_user, auth):
+        """Test the admin listing streams its rows and honours per_page"""
+        create_published(app, count=30, category_slug='berita')
+        auth.login()
+        # Streaming is opt-in; without it the page is buffered as before
+        response = client.get('/admin/content?sort=oldest&per_page=25')
+        assert response.status_code == 200 and response.content_length is not None
+        assert 'Artikel berita 24' in response.get_data(as_text=True)
+        
+        app.config['STREAM_LISTINGS'] = True
+        response = client.get('/admin/content?sort=oldest&per_page=25')
+        assert response.status_code == 200 and response.content_length is None
+        html = response.get_data(as_text=True)
+        assert 'Artikel berita 24' in html and 'Artikel berita 25' not in html
+        
+        cursor = html.split('cursor=')[1].split('"')[0]
+        html = client.get(f'/admin/content?sort=oldest&per_page=25&cursor={cursor}').get_data(as_text=True)
+        assert 'Artikel berita 29' in html and 'Artikel berita 24' not in html
+        assert client.get('/admin/audit-logs').status_code == 200
+
+class TestImagePipeline:
+    """Test upload validation and responsive image derivatives"""
+    
+    @pytest.fixture(autouse=True)
+    def upload_folder(self, app, tmp_path):
+        app.config['UPLOAD_FOLDER'] = str(tmp_path)
+        return tmp_path
+    
+    def _jpeg(self, size=(1600, 900), exif=True):
+        import io
+        from PIL import Image
+        image = Image.new('RGB', size, (200, 120, 40))
+        data = io.BytesIO()
+        if exif:
+            tags = Image.Exif()
+            tags[0x0110] = 'Kamera Warga'  # Model
+            tags[0x0112] = 6  # Orientation: rotated 90 degrees
+            image.save(data, 'JPEG', exif=tags.tobytes())
+        else:
+            image.save(data, 'JPEG')
+        data.seek(0)
+        return data
+    
+    def test_upload_creates_derivatives(self, app, upload_folder):
+        """Test an upload gets EXIF-free JPEG/WebP derivatives and a srcset"""
+        from PIL import Image
+        from werkzeug.datastructures import FileStorage
+        from app.core.helpers import save_uploaded_file, delete_uploaded_file
+        from app.core.images import responsive_image, og_image_url
+        with app.test_request_context():
+            filename = save_uploaded_file(FileStorage(self._jpeg(), filename='foto.jpg'), 'covers')
+            stem = filename.rsplit('.', 1)[0]
+            with Image.open(upload_folder / f'{stem}-card.jpg') as card:
+                # Orientation was applied, so the portrait photo is 480 wide
+                assert card.size == (480, 853) and not card.getexif()
+            with Image.open(upload_folder / f'{stem}-hero.webp') as hero:
+                assert hero.format == 'WEBP' and hero.width == 900
+            with Image.open(upload_folder / f'{stem}-og.jpg') as og:
+                assert og.size == (1200, 630)
+            
+            content = Content(title='Foto "desa"', cover_image=filename)
+            html = str(responsive_image(content, css_class='card-img-top'))
+            assert f'/static/uploads/{stem}-card.webp 480w' in html and f'{stem}-hero.jpg 900w' in html
+            assert 'type="image/webp"' in html and 'alt="Foto &#34;desa&#34;"' in html
+            assert og_image_url(content) == f'/static/uploads/{stem}-og.jpg'
+            
+            delete_uploaded_file(filename)
+            assert list(upload_folder.rglob('*.*')) == []
+    
+    def test_original_is_saved_without_exif(self, app, upload_folder):
+        """Test the public original loses its EXIF but keeps its orientation"""
+        import io
+        from PIL import Image
+        from werkzeug.datastructures import FileStorage
+        from app.core.helpers import save_uploaded_file
+        with app.test_request_context():
+            filename = save_uploaded_file(FileStorage(self._jpeg(), filename='foto.jpg'), 'covers')
+            with Image.open(upload_folder / filename) as original:
+                assert original.format == 'JPEG' and original.size == (900, 1600)
+                assert not original.getexif() and 'exif' not in original.info
+            assert b'Kamera Warga' not in (upload_folder / filename).read_bytes()
+            
+            # Other formats are stripped too and stored as their extension says
+            png = io.BytesIO()
+            tags = Image.Exif()
+            tags[0x0110] = 'Kamera Warga'
+            Image.new('RGBA', (40, 30), (10, 20, 30, 128)).save(png, 'PNG', exif=tags.tobytes())
+            png.seek(0)
+            filename = save_uploaded_file(FileStorage(png, filename='logo.png'), 'covers')
+            with Image.open(upload_folder / filename) as original:
+                assert original.format == 'PNG' and original.mode == 'RGBA'
+                assert not original.getexif()
+    
+    def test_rejects_broken_and_oversized_images(self, app, upload_folder):
+        """Test garbage and too many pixels are refused before anything is saved"""
+        import io
+        from werkzeug.datastructures import FileStorage
+        from app.core.helpers import save_uploaded_file
+        app.config['IMAGE_MAX_PIXELS'] = 1000 * 1000
+        with app.test_request_context():
+            assert save_uploaded_file(FileStorage(io.BytesIO(b'<?php echo 1;'), filename='x.jpg')) is None
+            assert save_uploaded_file(FileStorage(self._jpeg((1200, 1000)), filename='besar.jpg')) is None
+            assert save_uploaded_file(FileStorage(self._jpeg((800, 600), exif=False), filename='kecil.png'))
+        assert len(list(upload_folder.rglob('*.png'))) == 1
+
+class TestRenderPipeline:
+    """Test derived content fields computed once at save time"""
+    
+    BODY = ('<p>Kerja bakti &amp; gotong royong</p><script>alert(1)</script>'
+            '<img src="/static/uploads/a.jpg" alt="a" onerror="x()"><table><tr><td>Data</td></tr></table>')
+    
+    def test_admin_save_renders_content(self, app, client, admin_user, auth):
+        """Test saving through the admin form stores sanitized body and derived fields"""
+        with app.app_context():
+            category = Category.query.filter_by(slug='test-category').first()
+            category_id = category.id
+            author_id = User.query.filter_by(username='admin_test').first().id
+        auth.login()
+        client.post('/admin/content/new', data={
+            'title': 'Kerja Bakti', 'excerpt': '', 'content': self.BODY, 'category_id': category_id,
+            'youtube_url': 'https://youtu.be/dQw4w9WgXcQ', 'author_id': author_id, 'status': 'published'
+        })
+        with app.app_context():
+            content = Content.query.filter_by(title='Kerja Bakti').first()
+            assert '<script>' not in content.body_html and 'onerror' not in content.body_html
+            assert '<table>' not in content.body_html and 'Data' in content.body_html
+            assert '<img loading="lazy" decoding="async"' in content.body_html
+            assert content.excerpt_text.startswith('Kerja bakti & gotong royong')
+            assert content.word_count == 7 and content.reading_time == 1
+            assert content.youtube_id == 'dQw4w9WgXcQ'
+            
+            from app.core.render import render_content
+            assert render_content(content) is False
+            
+            # Pages use the stored copy while its hash matches the source fields
+            content.body_html = '<p>Salinan tersimpan</p>'
+            db.session.commit()
+            slug = content.slug
+        html = client.get(f'/content/{slug}').get_data(as_text=True)
+        assert 'Salinan tersimpan' in html and 'youtube.com/embed/dQw4w9WgXcQ' in html
+    
+    def test_stale_rows_render_on_the_fly_until_rerender(self, app, runner):
+        """Test rows without a current render are still sanitized, and rerender stores them"""
+        content_id = create_published(app)[0]
+        with app.app_context():
+            content = db.session.get(Content, content_id)
+            content.content = self.BODY
+            db.session.commit()
+            updated_at = content.updated_at
+            assert content.render_hash is None
+            assert '<script>' not in content.rendered.body_html and content.rendered.word_count == 7
+        
+        result = runner.invoke(args=['rerender', '--processes', '1'])
+        assert 'Re-rendered 1 content rows' in result.output
+        with app.app_context():
+            content = db.session.get(Content, content_id)
+            assert content.render_hash and content.body_html == content.rendered.body_html
+            assert content.updated_at == updated_at
+        assert 'Re-rendered 0 content rows' in runner.invoke(args=['rerender', '--processes', '1']).output